@@ -4,8 +4,12 @@ Through this, aggregating TimeSeriesData is possible.
 """
 
 import copy
+import importlib.metadata
+import os
 import timeit
-from typing import Optional, List, Dict, Union, TYPE_CHECKING, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, List, Dict, Union, TYPE_CHECKING, Tuple, Literal
 import warnings
 import logging
 from collections import Counter
@@ -21,6 +25,7 @@ from .components import Storage
 from .core import TimeSeriesData
 from .structure import Element, SystemModel, ElementModel, create_variable, create_equation
 from .math_modeling import Equation, Variable, VariableTS
+from .cache import DiskCache, hash_arrays
 
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -38,7 +43,10 @@ class Aggregation:
                  nr_of_periods: int = 8,
                  weights: Optional[Dict[str, float]] = None,
                  time_series_for_high_peaks: Optional[List[str]] = None,
-                 time_series_for_low_peaks: Optional[List[str]] = None
+                 time_series_for_low_peaks: Optional[List[str]] = None,
+                 nr_of_segments: Optional[int] = None,
+                 cluster_method: Literal['k_means', 'k_medoids'] = 'k_means',
+                 clustering_backend: Literal['tsam', 'numpy'] = 'tsam'
                  ):
         """
         Write a docstring please
@@ -47,7 +55,16 @@ class Aggregation:
         ----------
         timeseries: pd.DataFrame
             timeseries of the data with a datetime index
+        nr_of_segments: int, optional
+            If given, the time steps of each typical period are merged into this number of segments of varying length.
+        cluster_method: 'k_means' or 'k_medoids'
+            The typical periods are the means of their clusters ('k_means') or their medoids ('k_medoids').
+        clustering_backend: 'tsam' or 'numpy'
+            'tsam' clusters with tsam, 'numpy' with cluster_periods() of this module. The latter does not support
+            segmentation.
         """
+        if clustering_backend == 'numpy' and nr_of_segments is not None:
+            raise ValueError('Segmentation is only supported by the clustering_backend "tsam"')
         self.original_data = copy.deepcopy(original_data)
         self.hours_per_time_step = hours_per_time_step
         self.hours_per_period = hours_per_period
@@ -56,33 +73,83 @@ class Aggregation:
         self.weights = weights
         self.time_series_for_high_peaks = time_series_for_high_peaks
         self.time_series_for_low_peaks = time_series_for_low_peaks
+        self.nr_of_segments = nr_of_segments
+        self.cluster_method = cluster_method
+        self.clustering_backend = clustering_backend
 
         self.aggregated_data: Optional[pd.DataFrame] = None
         self.clustering_duration_seconds = None
-        self.tsam: Optional[tsam.TimeSeriesAggregation] = None
+        self.tsam: Optional[Union[tsam.TimeSeriesAggregation, 'ClusteringResult']] = None
 
-    def cluster(self) -> None:
+    def cluster(self, cache: Optional[DiskCache] = None) -> None:
         """
         Durchführung der Zeitreihenaggregation
+
+        Parameters
+        ----------
+        cache : DiskCache, optional
+            Cache of clusterings. If the same data was clustered with the same parameters before, the clustering is
+            loaded from it instead of clustering again.
         """
         start_time = timeit.default_timer()
+        key = self._cache_key() if cache is not None else None
+        entry = cache.get(key) if cache is not None else None
+        if entry is not None:
+            self.tsam = ClusteringResult.from_cache_entry(*entry, index=self.original_data.index)
+            self.aggregated_data = self.tsam.predictOriginalData()
+            self.clustering_duration_seconds = timeit.default_timer() - start_time
+            logger.info(f'Loaded the clustering from the cache ({key[:12]}...)')
+            logger.info(self.describe_clusters())
+            return
+
+        if self.clustering_backend == 'numpy':
+            self.tsam = cluster_periods(self.original_data, self.time_steps_per_period, self.nr_of_periods,
+                                        weights=self.weights,
+                                        time_series_for_high_peaks=self.time_series_for_high_peaks,
+                                        time_series_for_low_peaks=self.time_series_for_low_peaks,
+                                        method=self.cluster_method)
+        else:
+            self._cluster_with_tsam()
+        self.aggregated_data = self.tsam.predictOriginalData()
+        if cache is not None:
+            cache.put(key, *ClusteringResult.to_cache_entry(self.tsam, self.aggregated_data))
+
+        self.clustering_duration_seconds = timeit.default_timer() - start_time   # Zeit messen:
+        logger.info(self.describe_clusters())
+
+    def _cluster_with_tsam(self) -> None:
         # Erstellen des aggregation objects
         self.tsam = tsam.TimeSeriesAggregation(self.original_data,
                                                       noTypicalPeriods=self.nr_of_periods,
                                                       hoursPerPeriod=self.hours_per_period,
                                                       resolution=self.hours_per_time_step,
-                                                      clusterMethod='k_means',
+                                                      clusterMethod=self.cluster_method,
                                                       extremePeriodMethod='new_cluster_center' if self.use_extreme_periods else 'None',  # Wenn Extremperioden eingebunden werden sollen, nutze die Methode 'new_cluster_center' aus tsam
                                                       weightDict=self.weights,
                                                       addPeakMax=self.time_series_for_high_peaks,
-                                                      addPeakMin=self.time_series_for_low_peaks
+                                                      addPeakMin=self.time_series_for_low_peaks,
+                                                      segmentation=self.nr_of_segments is not None,
+                                                      noSegments=self.nr_of_segments or 10
                                                       )
 
         self.tsam.createTypicalPeriods()   # Ausführen der Aggregation/Clustering
-        self.aggregated_data = self.tsam.predictOriginalData()
 
-        self.clustering_duration_seconds = timeit.default_timer() - start_time   # Zeit messen:
-        logger.info(self.describe_clusters())
+    def _cache_key(self) -> str:
+        """ Hash of the data and all parameters of the clustering. A different version of tsam changes it too """
+        return hash_arrays(self.original_data.to_numpy(dtype=float),
+                           self.original_data.index.to_numpy().astype('datetime64[ns]'),
+                           extra={'type': 'clustering',
+                                  'tsam': importlib.metadata.version('tsam'),
+                                  'columns': list(self.original_data.columns),
+                                  'hours_per_time_step': self.hours_per_time_step,
+                                  'hours_per_period': self.hours_per_period,
+                                  'nr_of_periods': self.nr_of_periods,
+                                  'weights': self.weights,
+                                  'time_series_for_high_peaks': self.time_series_for_high_peaks,
+                                  'time_series_for_low_peaks': self.time_series_for_low_peaks,
+                                  'nr_of_segments': self.nr_of_segments,
+                                  'cluster_method': self.cluster_method,
+                                  'clustering_backend': self.clustering_backend})
 
     def describe_clusters(self) -> str:
         aVisual = {}
@@ -91,10 +158,9 @@ class Aggregation:
                                 self.get_cluster_indices()[cluster]]
 
         if self.use_extreme_periods:
-            # Zeitreihe rauslöschen:
-            extremePeriods = self.tsam.extremePeriods.copy()
-            for key, val in extremePeriods.items():
-                del (extremePeriods[key]['profile'])
+            # Zeitreihe rauslöschen (ohne die Extremperioden selbst zu ändern):
+            extremePeriods = {key: {name: value for name, value in val.items() if name != 'profile'}
+                              for key, val in self.tsam.extremePeriods.items()}
         else:
             extremePeriods = {}
 
@@ -115,6 +181,21 @@ class Aggregation:
     def use_extreme_periods(self):
         return self.time_series_for_high_peaks or self.time_series_for_low_peaks
 
+    def accuracy(self) -> pd.DataFrame:
+        """
+        The error of the aggregated data per time series: The root mean squared error ('RMSE') and the one of the
+        duration curves ('RMSE duration curve'). Both are relative to the range (max - min) of the original data.
+        """
+        original = self.original_data.to_numpy(dtype=float)
+        aggregated = self.aggregated_data[self.original_data.columns].to_numpy(dtype=float)
+        value_range = np.ptp(original, axis=0)
+        value_range[value_range == 0] = 1
+        rmse = np.sqrt(np.mean(((aggregated - original) / value_range) ** 2, axis=0))
+        rmse_duration_curve = np.sqrt(np.mean(((np.sort(aggregated, axis=0) - np.sort(original, axis=0))
+                                               / value_range) ** 2, axis=0))
+        return pd.DataFrame({'RMSE': rmse, 'RMSE duration curve': rmse_duration_curve},
+                            index=self.original_data.columns)
+
     def plot(self, colormap: str = 'viridis', show: bool = True) -> 'plotly.Figure':
         from . import plotting
 
@@ -147,7 +228,7 @@ class Aggregation:
         clusters = self.tsam.clusterPeriodNoOccur.keys()
         index_vectors = {cluster: [] for cluster in clusters}
 
-        period_length = len(self.tsam.stepIdx)
+        period_length = self.time_steps_per_period
         total_steps = len(self.tsam.timeSeries)
 
         for period, cluster_id in enumerate(self.tsam.clusterOrder):
@@ -157,6 +238,78 @@ class Aggregation:
 
         return index_vectors
 
+    @property
+    def period_length(self) -> int:
+        """ The number of time steps per typical period (the number of segments, if segmented) """
+        return len(self.tsam.stepIdx)
+
+    @property
+    def time_steps_per_period(self) -> int:
+        """ The number of original time steps per period """
+        return int(round(self.hours_per_period / self.hours_per_time_step))
+
+    @property
+    def segment_durations(self) -> np.ndarray:
+        """ The number of original time steps of each time step of the typical periods. Shape: (periods, steps) """
+        clusters = sorted(self.tsam.clusterPeriodNoOccur)
+        if self.nr_of_segments is None:
+            return np.ones((len(clusters), self.period_length), dtype=int)
+        typical_periods = self.tsam.typicalPeriods.sort_index().loc[clusters]
+        return typical_periods.index.get_level_values('Segment Duration').to_numpy(dtype=int).reshape(len(clusters), -1)
+
+    @property
+    def occurrences(self) -> np.ndarray:
+        """ How often each typical period occurs in the original data. A shorter last period counts partly """
+        return np.array([self.tsam.clusterPeriodNoOccur[cluster] for cluster in sorted(self.tsam.clusterPeriodNoOccur)],
+                        dtype=float)
+
+    def get_typical_periods(self) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """
+        Returns the data of the typical periods (one period after the other, in the order of the clusters) by label,
+        and the indices of the original data the typical periods are taken from (the first period of each cluster).
+        """
+        clusters = sorted(self.tsam.clusterPeriodNoOccur)
+        typical_periods = self.tsam.typicalPeriods.sort_index().loc[clusters]
+        data = {label: typical_periods[label].to_numpy() for label in self.original_data.columns}
+
+        first_period_of_clusters = [int(np.argmax(np.asarray(self.tsam.clusterOrder) == cluster)) for cluster in clusters]
+        durations = self.segment_durations
+        start_of_steps = np.cumsum(durations, axis=1) - durations  # Within the period
+        indices = (np.array(first_period_of_clusters)[:, None] * self.time_steps_per_period + start_of_steps).ravel()
+        # A cluster might only occur in the shorter last period (or be an extreme period)
+        return data, np.minimum(indices, self.nr_of_time_steps - 1)
+
+    def expand(self, values: np.ndarray, extensive: bool = False) -> np.ndarray:
+        """
+        Expands values of the typical periods (one period after the other, in the order of the clusters) to the full
+        horizon, using the order of the clusters. A single value after the last period (e.g. of a charge state)
+        is kept at the end. Values of any other length are returned unchanged.
+        Values of segments are repeated over their original time steps. Extensive values (sums over a time step,
+        like the costs of a time step) are distributed evenly over them instead.
+        """
+        values = np.asarray(values)
+        durations = self.segment_durations
+        typical_length = durations.size
+        if len(values) not in (typical_length, typical_length + 1):
+            return values
+        if extensive:
+            values = np.concatenate([values[:typical_length] / durations.ravel(), values[typical_length:]])
+        # Index of the typical time step of every original time step. Segments are repeated by their duration
+        indices_of_clusters = np.arange(typical_length).reshape(durations.shape)
+        indices = np.concatenate([np.repeat(indices_of_clusters[cluster], durations[cluster])
+                                  for cluster in self.tsam.clusterOrder])
+        return np.concatenate([values[indices[:self.nr_of_time_steps]], values[typical_length:]])
+
+    def expand_states(self, values: np.ndarray) -> np.ndarray:
+        """
+        Expands values at the boundaries of the time steps of the typical periods, put in the order of the original
+        periods (like a charge state, one value more than time steps), to the boundaries of the original time steps.
+        Within segments, the values are interpolated linearly.
+        """
+        durations = self.segment_durations[self.tsam.clusterOrder]
+        boundaries = np.concatenate([[0], np.cumsum(durations)])
+        return np.interp(np.arange(self.nr_of_time_steps + 1), boundaries, values)
+
     def get_equation_indices(self, skip_first_index_of_period: bool = True) -> Tuple[np.ndarray, np.ndarray]:
         """
         Generates pairs of indices for the equations by comparing index vectors of the same cluster.
@@ -193,6 +346,252 @@ class Aggregation:
         return np.array(idx_var1), np.array(idx_var2)
 
 
+class ClusteringResult:
+    """
+    The result of a clustering, restored from a DiskCache. It offers the attributes of tsam.TimeSeriesAggregation
+    which are used by Aggregation (after createTypicalPeriods()), so it can be used in its place.
+    """
+    def __init__(self,
+                 cluster_order: np.ndarray,
+                 cluster_occurrences: Dict[int, float],
+                 typical_periods: pd.DataFrame,
+                 predicted_data: pd.DataFrame,
+                 extreme_periods: Optional[Dict[str, Dict]] = None):
+        self.clusterOrder = np.asarray(cluster_order)
+        self.clusterPeriodNoOccur = cluster_occurrences
+        self.typicalPeriods = typical_periods
+        self.stepIdx = typical_periods.index.get_level_values(1).unique()
+        self.timeSeries = predicted_data
+        self.extremePeriods = extreme_periods or {}
+
+    def predictOriginalData(self) -> pd.DataFrame:
+        return self.timeSeries
+
+    @classmethod
+    def from_cache_entry(cls, arrays: Dict[str, np.ndarray], metadata: Dict, index: pd.Index) -> 'ClusteringResult':
+        clusters = arrays['clusters']
+        typical_periods = pd.DataFrame(arrays['typical_periods'], columns=metadata['columns'],
+                                       index=pd.MultiIndex.from_arrays(list(arrays['typical_periods_index'].T),
+                                                                       names=metadata['index_names']))
+        predicted_data = pd.DataFrame(arrays['predicted_data'], columns=metadata['columns'], index=index)
+        return cls(arrays['cluster_order'], dict(zip(clusters.tolist(), arrays['occurrences'].tolist())),
+                   typical_periods, predicted_data, metadata['extreme_periods'])
+
+    @staticmethod
+    def to_cache_entry(clustering: Union[tsam.TimeSeriesAggregation, 'ClusteringResult'],
+                       predicted_data: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """ The arrays and metadata to store a clustering in a DiskCache """
+        clusters = sorted(clustering.clusterPeriodNoOccur)
+        typical_periods = clustering.typicalPeriods.sort_index().loc[clusters]
+        arrays = {'cluster_order': np.asarray(clustering.clusterOrder, dtype=np.int64),
+                  'clusters': np.asarray(clusters, dtype=np.int64),
+                  'occurrences': np.array([clustering.clusterPeriodNoOccur[cluster] for cluster in clusters],
+                                          dtype=float),
+                  'typical_periods': typical_periods.to_numpy(dtype=float),
+                  # (cluster, step) or, if segmented, (cluster, segment, duration)
+                  'typical_periods_index': np.array(typical_periods.index.to_list(), dtype=np.int64),
+                  'predicted_data': predicted_data[typical_periods.columns].to_numpy(dtype=float)}
+        extreme_periods = {name: {key: value.item() if isinstance(value, np.generic) else value
+                                  for key, value in period.items() if key != 'profile'}
+                           for name, period in (getattr(clustering, 'extremePeriods', None) or {}).items()}
+        metadata = {'columns': list(typical_periods.columns),
+                    'index_names': list(typical_periods.index.names),
+                    'extreme_periods': extreme_periods}
+        return arrays, metadata
+
+
+def cluster_periods(original_data: pd.DataFrame,
+                    period_length: int,
+                    nr_of_periods: int,
+                    weights: Optional[Dict[str, float]] = None,
+                    time_series_for_high_peaks: Optional[List[str]] = None,
+                    time_series_for_low_peaks: Optional[List[str]] = None,
+                    method: Literal['k_means', 'k_medoids'] = 'k_means',
+                    nr_of_restarts: int = 10,
+                    seed: int = 0,
+                    max_workers: Optional[int] = None) -> ClusteringResult:
+    """
+    Clusters the periods of the data with k-means or k-medoids in vectorized NumPy, as an alternative to tsam.
+    It follows the conventions of tsam: The data is normalized to its range and weighted. A shorter last period is
+    filled up with the first time steps. The periods with the highest (lowest) values of time_series_for_high_peaks
+    (time_series_for_low_peaks) become clusters of their own ('new_cluster_center'). The other typical periods are
+    rescaled to the sums of the original data.
+    The restarts (with k-means++ initializations) are split into batches, which run in parallel threads. Within a
+    batch, the restarts are computed together in the same array operations. The restart with the lowest inertia is
+    used.
+
+    Parameters
+    ----------
+    original_data : pd.DataFrame
+        The data with a datetime index
+    period_length : int
+        The number of time steps per period
+    nr_of_periods : int
+        The number of typical periods (without the extreme periods)
+    method : 'k_means' or 'k_medoids'
+        The typical periods are the means of their clusters ('k_means') or their medoids ('k_medoids').
+    nr_of_restarts : int
+        Number of different initializations.
+    seed : int
+        Seed of the initializations. The clustering is reproducible with the same seed, independent of max_workers.
+    max_workers : int, optional
+        Number of threads for the restarts. Defaults to the number of CPUs (at most nr_of_restarts).
+    """
+    values = original_data.to_numpy(dtype=float)
+    columns = list(original_data.columns)
+    nr_of_time_steps = len(values)
+    nr_of_original_periods = -(-nr_of_time_steps // period_length)
+    padded = np.concatenate([values, values[:nr_of_original_periods * period_length - nr_of_time_steps]])
+    periods = padded.reshape(nr_of_original_periods, period_length, len(columns))
+
+    value_range = np.ptp(values, axis=0)
+    value_range[value_range == 0] = 1
+    column_weights = np.array([(weights or {}).get(column, 1) for column in columns])
+    features = ((periods - values.min(axis=0)) / value_range * column_weights).reshape(nr_of_original_periods, -1)
+
+    if method not in ('k_means', 'k_medoids'):
+        raise ValueError(f'Unknown cluster method "{method}". Use "k_means" or "k_medoids"')
+    nr_of_clusters = min(nr_of_periods, nr_of_original_periods)
+    # Every restart has its own random generator, so the result does not depend on the batches
+    rngs = [np.random.default_rng(sequence) for sequence in np.random.SeedSequence(seed).spawn(nr_of_restarts)]
+    nr_of_batches = min(max_workers or os.cpu_count() or 1, nr_of_restarts)
+    batches = [[rngs[i] for i in batch] for batch in np.array_split(np.arange(nr_of_restarts), nr_of_batches)]
+    if method == 'k_means':
+        clustering = partial(_k_means, features, nr_of_clusters)
+    else:
+        distances = np.sqrt(_squared_distances(features, features[None])[0])
+        clustering = partial(_k_medoids, features, nr_of_clusters, distances)
+    if nr_of_batches == 1:
+        results = [clustering(batches[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=nr_of_batches) as executor:
+            results = list(executor.map(clustering, batches))
+    cluster_order, centers, _ = min(results, key=lambda result: result[2])  # The first one of equal inertias
+    if method == 'k_medoids':
+        medoids, centers = centers, features[centers]
+    else:
+        medoids = np.array([], dtype=int)
+
+    # Extreme periods, which are not already a cluster center
+    peaks = [(f'{column} max.', column, np.argmax(periods[:, :, i].max(axis=1)))
+             for i, column in enumerate(columns) if column in (time_series_for_high_peaks or [])]
+    peaks += [(f'{column} min.', column, np.argmin(periods[:, :, i].min(axis=1)))
+              for i, column in enumerate(columns) if column in (time_series_for_low_peaks or [])]
+    extreme_periods, extreme_steps = {}, []
+    for name, column, step in peaks:
+        if step not in extreme_steps and step not in medoids:
+            extreme_periods[name] = {'stepNo': int(step), 'column': column, 'clusterNo': int(cluster_order[step]),
+                                     'newClusterNo': nr_of_clusters + len(extreme_steps)}
+            extreme_steps.append(step)
+    if extreme_steps:
+        # Periods closer to an extreme period than to their cluster center join the extreme period
+        distances = _squared_distances(features, np.concatenate([centers, features[extreme_steps]])[None])[0]
+        closest_extreme = nr_of_clusters + np.argmin(distances[:, nr_of_clusters:], axis=1)
+        all_periods = np.arange(nr_of_original_periods)
+        is_closer = distances[all_periods, closest_extreme] < distances[all_periods, cluster_order]
+        cluster_order = np.where(is_closer, closest_extreme, cluster_order)
+        cluster_order[extreme_steps] = nr_of_clusters + np.arange(len(extreme_steps))
+
+    def representative(cluster: int) -> np.ndarray:
+        if cluster >= nr_of_clusters:
+            return periods[extreme_steps[cluster - nr_of_clusters]]
+        if method == 'k_medoids':
+            return periods[medoids[cluster]]
+        return periods[cluster_order == cluster].mean(axis=0)
+
+    # Clusters which lost all their periods to extreme periods are dropped
+    clusters, cluster_order = np.unique(cluster_order, return_inverse=True)
+    for extreme in extreme_periods.values():
+        extreme['newClusterNo'] = int(np.searchsorted(clusters, extreme['newClusterNo']))
+    typical_periods = np.stack([representative(cluster) for cluster in clusters])
+    is_extreme = clusters >= nr_of_clusters
+
+    # The typical periods (except the extreme ones) are rescaled to the sums of the original data (normalized)
+    counts = np.bincount(cluster_order, minlength=len(clusters))
+    normalized = (typical_periods - values.min(axis=0)) / value_range
+    sums = np.einsum('k,ktc->kc', counts, normalized)
+    sums_of_normal, sums_of_extreme = sums[~is_extreme].sum(axis=0), sums[is_extreme].sum(axis=0)
+    factors = np.divide(((padded - values.min(axis=0)) / value_range).sum(axis=0) - sums_of_extreme, sums_of_normal,
+                        out=np.ones_like(sums_of_normal), where=sums_of_normal != 0)
+    normalized[~is_extreme] = np.clip(normalized[~is_extreme] * factors, 0, 1)
+    typical_periods = normalized * value_range + values.min(axis=0)
+
+    occurrences = counts.astype(float)
+    if nr_of_time_steps % period_length != 0:  # The last period is shorter
+        occurrences[cluster_order[-1]] -= 1 - (nr_of_time_steps % period_length) / period_length
+
+    index = pd.MultiIndex.from_product([range(len(clusters)), range(period_length)], names=[None, 'TimeStep'])
+    predicted_data = pd.DataFrame(typical_periods[cluster_order].reshape(-1, len(columns))[:nr_of_time_steps],
+                                  columns=columns, index=original_data.index)
+    return ClusteringResult(cluster_order, dict(enumerate(occurrences.tolist())),
+                            pd.DataFrame(typical_periods.reshape(-1, len(columns)), columns=columns, index=index),
+                            predicted_data, extreme_periods)
+
+
+def _squared_distances(features: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """ Squared euclidean distances (restarts, periods, clusters) of features to centers (restarts, clusters, f) """
+    distances = ((features ** 2).sum(axis=1)[None, :, None] - 2 * features @ centers.transpose(0, 2, 1) +
+                 (centers ** 2).sum(axis=2)[:, None, :])
+    return np.maximum(distances, 0)
+
+
+def _k_means_plus_plus(features: np.ndarray, nr_of_clusters: int, rngs: List[np.random.Generator]) -> np.ndarray:
+    """ Indices of the initial centers (restarts, clusters), chosen by k-means++ for all restarts at once """
+    chosen = np.empty((len(rngs), nr_of_clusters), dtype=int)
+    chosen[:, 0] = [rng.integers(len(features)) for rng in rngs]
+    distances = _squared_distances(features, features[chosen[:, :1]])[:, :, 0]
+    for i in range(1, nr_of_clusters):
+        cumulative = np.cumsum(distances, axis=1)
+        thresholds = np.array([rng.random() for rng in rngs]) * cumulative[:, -1]
+        chosen[:, i] = np.argmax(cumulative > thresholds[:, None], axis=1)
+        distances = np.minimum(distances, _squared_distances(features, features[chosen[:, i:i + 1]])[:, :, 0])
+    return chosen
+
+
+def _k_means(features: np.ndarray, nr_of_clusters: int, rngs: List[np.random.Generator],
+             max_iterations: int = 300) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Lloyd's algorithm for a batch of restarts at once (one per random generator).
+    Returns the cluster of each period, the centers and the inertia of the best restart
+    """
+    centers = features[_k_means_plus_plus(features, nr_of_clusters, rngs)]
+    for _ in range(max_iterations):
+        labels = np.argmin(_squared_distances(features, centers), axis=2)
+        one_hot = (labels[:, :, None] == np.arange(nr_of_clusters)).astype(float)
+        counts = one_hot.sum(axis=1)
+        sums = one_hot.transpose(0, 2, 1) @ features
+        new_centers = np.where(counts[:, :, None] > 0, sums / np.maximum(counts, 1)[:, :, None], centers)
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    distances = _squared_distances(features, centers)
+    inertias = distances.min(axis=2).sum(axis=1)
+    best = np.argmin(inertias)
+    return np.argmin(distances[best], axis=1), centers[best], float(inertias[best])
+
+
+def _k_medoids(features: np.ndarray, nr_of_clusters: int, distances: np.ndarray, rngs: List[np.random.Generator],
+               max_iterations: int = 300) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Alternating k-medoids for a batch of restarts at once (one per random generator): The periods are assigned to
+    the closest medoid, then the member with the lowest sum of distances (periods, periods) to the other members
+    becomes the medoid.
+    Returns the cluster of each period, the indices of the medoids and the inertia of the best restart
+    """
+    medoids = _k_means_plus_plus(features, nr_of_clusters, rngs)
+    for _ in range(max_iterations):
+        one_hot = np.argmin(distances[medoids], axis=1)[:, :, None] == np.arange(nr_of_clusters)
+        costs = np.where(one_hot.transpose(0, 2, 1), one_hot.transpose(0, 2, 1).astype(float) @ distances, np.inf)
+        new_medoids = np.where(one_hot.any(axis=1), np.argmin(costs, axis=2), medoids)
+        if np.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+    distances_to_medoids = distances[medoids]  # (restarts, clusters, periods)
+    inertias = distances_to_medoids.min(axis=1).sum(axis=1)
+    best = np.argmin(inertias)
+    return np.argmin(distances_to_medoids[best], axis=0), medoids[best], float(inertias[best])
+
+
 class TimeSeriesCollection:
     def __init__(self,
                  time_series_list: List[TimeSeries]):
@@ -251,7 +650,11 @@ class AggregationParameters:
                  percentage_of_period_freedom: float = 0,
                  penalty_of_period_freedom: float = 0,
                  time_series_for_high_peaks: Optional[List[TimeSeriesData]] = None,
-                 time_series_for_low_peaks: Optional[List[TimeSeriesData]] = None
+                 time_series_for_low_peaks: Optional[List[TimeSeriesData]] = None,
+                 typical_periods_only: bool = False,
+                 nr_of_segments: Optional[int] = None,
+                 cluster_method: Literal['k_means', 'k_medoids'] = 'k_means',
+                 clustering_backend: Literal['tsam', 'numpy'] = 'tsam'
                  ):
         """
         Initializes aggregation parameters for time series data
@@ -279,7 +682,23 @@ class AggregationParameters:
             List of time series to use for explicitly selecting periods with high values.
         time_series_for_low_peaks : list of TimeSeriesData, optional
             List of time series to use for explicitly selecting periods with low values.
+        typical_periods_only : bool, optional
+            If True, only the typical periods are modeled, instead of the full horizon with equated periods.
+            Sums over time are weighted by the occurrences of the periods, and Storages are linked across the periods
+            in their original order. This shrinks the model by about the ratio of all periods to typical periods.
+            fix_storage_flows, aggregate_data_and_fix_non_binary_vars and the period freedom are not used then.
+        nr_of_segments : int, optional
+            If given, the time steps of each typical period are merged into this number of segments of varying
+            duration (intra-period segmentation). The segments become the time steps of the model, with their
+            duration as dt_in_hours. Results are mapped back to the original time steps. Requires typical_periods_only.
+        cluster_method : 'k_means' or 'k_medoids', optional
+            The typical periods are the means of their clusters ('k_means') or their medoids ('k_medoids').
+        clustering_backend : 'tsam' or 'numpy', optional
+            Clustering with tsam or with the vectorized NumPy implementation of this module (see cluster_periods()),
+            which is faster for large data. It does not support segmentation.
         """
+        if nr_of_segments is not None and not typical_periods_only:
+            raise ValueError('Segmentation of the typical periods (nr_of_segments) requires typical_periods_only=True')
         self.hours_per_period = hours_per_period
         self.nr_of_periods = nr_of_periods
         self.fix_storage_flows = fix_storage_flows
@@ -288,6 +707,10 @@ class AggregationParameters:
         self.penalty_of_period_freedom = penalty_of_period_freedom
         self.time_series_for_high_peaks: List[TimeSeriesData] = time_series_for_high_peaks or []
         self.time_series_for_low_peaks: List[TimeSeriesData] = time_series_for_low_peaks or []
+        self.typical_periods_only = typical_periods_only
+        self.nr_of_segments = nr_of_segments
+        self.cluster_method = cluster_method
+        self.clustering_backend = clustering_backend
 
     @property
     def use_extreme_periods(self):
@@ -0,0 +1,97 @@
+"""
+This module contains a simple content addressed cache on disk, used to reuse results of identical computations
+(e.g. solutions of identical models) across runs.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from typing import Dict, Optional, Tuple, Union, Any
+
+import numpy as np
+
+logger = logging.getLogger('flixOpt')
+
+
+class DiskCache:
+    """
+    A directory of cache entries, each stored as one .npz file named by its key.
+    An entry consists of numpy arrays and json serializable metadata.
+    If the total size of the directory exceeds max_size_mb, the least recently used entries are deleted.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Directory of the cache. Created if it doesn't exist.
+    max_size_mb : float
+        Maximum total size of all entries in megabytes.
+    """
+    def __init__(self, directory: Union[str, pathlib.Path] = 'cache/', max_size_mb: float = 1000):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size_mb = max_size_mb
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+        """ Returns the arrays and the metadata stored under key, or None if there is no such entry """
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files if name != '__metadata__'}
+                metadata = json.loads(str(data['__metadata__']))
+        except (FileNotFoundError, OSError, ValueError, KeyError) as e:
+            if path.exists():
+                logger.warning(f'Cache entry {path} could not be read and is ignored: {e}')
+            return None
+        os.utime(path)  # Marks the entry as recently used
+        return arrays, metadata
+
+    def put(self, key: str, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> None:
+        """ Stores arrays and metadata under key and evicts the least recently used entries if necessary """
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                np.savez(file, __metadata__=np.array(json.dumps(metadata)), **arrays)
+            os.replace(temporary_path, self._path(key))  # Atomic, so concurrent readers never see partial entries
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self._evict()
+
+    def clear(self) -> None:
+        for path in self.directory.glob('*.npz'):
+            path.unlink()
+
+    @property
+    def size_mb(self) -> float:
+        return sum(path.stat().st_size for path in self.directory.glob('*.npz')) / 1e6
+
+    def _evict(self) -> None:
+        entries = sorted(((path.stat().st_mtime, path.stat().st_size, path) for path in self.directory.glob('*.npz')),
+                         key=lambda entry: entry[0])
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries[:-1]:  # The newest entry is always kept
+            if size <= self.max_size_mb * 1e6:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            logger.debug(f'Evicted {path} from the cache')
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / f'{key}.npz'
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(directory={str(self.directory)!r}, max_size_mb={self.max_size_mb})'
+
+
+def hash_arrays(*arrays: np.ndarray, extra: Any = None) -> str:
+    """ Returns a stable sha256 hash of the arrays (including their dtype and shape) and the json serializable extra """
+    hasher = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        hasher.update(f'{array.dtype.str}{array.shape}'.encode())
+        hasher.update(array.tobytes())
+    hasher.update(json.dumps(extra, sort_keys=True, default=str).encode())
+    return hasher.hexdigest()
@@ -6,27 +6,44 @@ There are three different Calculation types:
     2. AggregatedCalculation: Calculates the SystemModel for the full FlowSystem, but aggregates the TimeSeriesData.
         This simplifies the mathematical model and usually speeds up the solving process.
     3. SegmentedCalculation: Solves a SystemModel for each individual Segment of the FlowSystem.
+    4. TwoStageCalculation: Sizes the investments with an AggregatedCalculation and checks the operation of this
+        design with a FullCalculation or SegmentedCalculation.
+    5. BendersCalculation: Decomposes investment planning into a master problem with the investment decisions and
+        subproblems with the operation (per time window or scenario), which are solved in parallel processes.
+    6. BatchCalculation: Runs one of the first four for several scenarios (variants of a FlowSystem) in parallel
+        processes.
+    7. RollingHorizonCalculation: Keeps a model of a fixed horizon, which is shifted forward step by step (driven
+        externally, e.g. for model predictive dispatch) and re-solved with updated forecasts and realized states.
+    8. NrOfPeriodsSelection: Compares several numbers of typical periods for an AggregatedCalculation in parallel
+        processes.
 """
 
+import copy
 import datetime
 import logging
 import math
 import pathlib
 import timeit
-from typing import List, Dict, Optional, Literal, Union, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Literal, Union, Any, Callable, Tuple, TYPE_CHECKING
 
 import numpy as np
 
-from .aggregation import TimeSeriesCollection, AggregationParameters, AggregationModel
-from .core import Numeric, Skalar
+from .aggregation import TimeSeriesCollection, AggregationParameters, AggregationModel, Aggregation
+from .core import Numeric, Skalar, TimeSeries, TimeSeriesData
 from .structure import SystemModel
 from .flow_system import FlowSystem
-from .elements import Component
-from .components import Storage
+from .elements import Component, Flow, FlowModel
+from .components import Storage, StorageModel
 from .features import InvestmentModel
-from .solvers import Solver
+from .effects import EffectModel
+from .solvers import Solver, HighsSolver
+from .math_modeling import ModelingLanguage, VariableTS, MatrixModel, HighspyModel, Checkpoint
+from .cache import DiskCache
 from . import utils as utils
 
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger('flixOpt')
 
@@ -36,8 +53,10 @@ class Calculation:
     class for defined way of solving a flow_system optimization
     """
     def __init__(self, name, flow_system: FlowSystem,
-                 modeling_language: Literal["pyomo", "cvxpy"] = "pyomo",
-                 time_indices: Optional[Union[range, List[int]]] = None):
+                 modeling_language: Literal["pyomo", "highspy", "cvxpy"] = "pyomo",
+                 time_indices: Optional[Union[range, List[int]]] = None,
+                 presolve: bool = False,
+                 scaling: bool = False):
         """
         Parameters
         ----------
@@ -45,15 +64,24 @@ class Calculation:
             name of calculation
         flow_system : FlowSystem
             flow_system which should be calculated
-        modeling_language : 'pyomo','cvxpy' (not implemeted yet)
+        modeling_language : 'pyomo', 'highspy', 'cvxpy' (not implemeted yet)
             choose optimization modeling language
         time_indices : List[int] or None
             list with indices, which should be used for calculation. If None, then all timesteps are used.
+        presolve : bool
+            If True, fixed variables, single-variable rows and empty rows are removed before passing the model
+            to the solver (see PresolvedModel). Only supported by the modeling language 'highspy'.
+        scaling : bool
+            If True, the rows and columns of the model are scaled before passing it to the solver and the results are
+            unscaled (see ScaledModel). Only supported by the modeling language 'highspy'.
         """
         self.name = name
         self.flow_system = flow_system
         self.modeling_language = modeling_language
         self.time_indices = time_indices
+        self.presolve = presolve
+        self.scaling = scaling
+        self.fixed_values: Dict[str, Numeric] = {}  # Variables (by label) to fix, e.g. the sizes of a given design
 
         self.system_model: Optional[SystemModel] = None
         self.durations = {'modeling': 0.0, 'solving': 0.0, 'saving': 0.0}  # Dauer der einzelnen Dinge
@@ -82,6 +110,7 @@ class Calculation:
             self._paths["data"] = path / f'{self.name}_data.json'
             self._paths["results"] = path / f'{self.name}_results.json'
             self._paths["infos"] = path / f'{self.name}_infos.yaml'
+            self._paths["checkpoint"] = path / f'{self.name}_checkpoint.json'
 
     def _save_solve_infos(self):
         import yaml
@@ -117,6 +146,70 @@ class Calculation:
         logger.info(f'Saving calculation to .json took {self.durations["saving"]:>8.2f} seconds')
         logger.info(f'Saving calculation to .yaml took {(timeit.default_timer() - t_start):>8.2f} seconds')
 
+    def _solve(self, solver: Solver, save_results: Union[bool, str, pathlib.Path], cache: Optional[DiskCache],
+               warm_start: Optional[Union['Calculation', Dict[str, Numeric], str, pathlib.Path]],
+               time_budget: Optional[float], checkpoint: Union[bool, float]):
+        """ Solves the SystemModel within the time_budget and writes checkpoints of the incumbents if requested """
+        self._define_path_names(save_results)
+        t_start = timeit.default_timer()
+        solver.logfile_name = self._paths['log']
+        if checkpoint is not False:
+            if not save_results:
+                raise ValueError(f'Checkpoints are written to the results folder. Set save_results to use them')
+            self.system_model.checkpoint = Checkpoint(self._paths['checkpoint'],
+                                                      None if checkpoint is True else checkpoint)
+        if warm_start is not None:
+            self.system_model.set_start_values(self.warm_start_values(warm_start))
+
+        time_limit = getattr(solver, 'time_limit_seconds', None)
+        if time_budget is not None and time_limit is None:
+            logger.warning(f'The {solver.__class__.__name__} has no time limit. The time_budget is ignored')
+        elif time_budget is not None:
+            solver.time_limit_seconds = max(min(time_limit, time_budget - (timeit.default_timer() - t_start)), 0)
+        try:
+            self.system_model.solve(solver, cache=cache)
+        finally:
+            if time_budget is not None and time_limit is not None:
+                solver.time_limit_seconds = time_limit
+            self.system_model.checkpoint = None
+        self.durations['solving'] = round(timeit.default_timer() - t_start, 2)
+
+        if save_results:
+            self._save_solve_infos()
+
+    def warm_start_values(self, warm_start: Union['Calculation', Dict[str, Numeric], str, pathlib.Path]
+                          ) -> Dict[str, np.ndarray]:
+        """
+        Maps the results of another Calculation (or a dict of results by the label of the Variables, or the path of a
+        checkpoint written during a solve) onto the Variables of this Calculation, to be used as start values of the
+        solver (a MIP start).
+        Results of the typical periods of an AggregatedCalculation are expanded to the full horizon by the order of
+        its clusters. Variables without a result of matching length are skipped.
+        """
+        if self.system_model is None:
+            raise Exception(f'The model must be created with .do_modeling() before start values can be mapped')
+        aggregation = warm_start.aggregation if isinstance(warm_start, AggregatedCalculation) else None
+        if isinstance(warm_start, (str, pathlib.Path)):
+            warm_start = Checkpoint.load(warm_start)
+        elif isinstance(warm_start, Calculation):
+            warm_start = {variable.label: variable.result for variable in warm_start.system_model.variables}
+
+        start_values, skipped = {}, []
+        for variable in self.system_model.variables:
+            if warm_start.get(variable.label) is None:
+                continue
+            value = np.atleast_1d(np.asarray(warm_start[variable.label], dtype=float))
+            if len(value) != variable.length and aggregation is not None:
+                value = aggregation.expand(value)
+            if len(value) == variable.length:
+                start_values[variable.label] = value
+            else:
+                skipped.append(variable.label)
+        if skipped:
+            logger.debug(f'No start values for {skipped}, as the lengths of the results dont match')
+        logger.info(f'Mapped start values for {len(start_values)} of {len(self.system_model.variables)} Variables')
+        return start_values
+
     def results(self):
         if self._results is None:
             self._results = self.system_model.results()
@@ -138,28 +231,134 @@ class FullCalculation(Calculation):
     """
 
     def do_modeling(self) -> SystemModel:
+        return self._do_modeling()
+
+    def _do_modeling(self, reuse: Optional[ModelingLanguage] = None) -> SystemModel:
+        """ Models the FlowSystem. If reuse is given, its solver model gets updated instead of translated again """
         t_start = timeit.default_timer()
 
         self.flow_system.transform_data()
         for time_series in self.flow_system.all_time_series:
             time_series.activate_indices(self.time_indices)
 
+        self._results = None
         self.system_model = SystemModel(self.name, self.modeling_language, self.flow_system, self.time_indices)
+        self.system_model.presolve = self.presolve
+        self.system_model.scaling = self.scaling
         self.system_model.do_modeling()
-        self.system_model.translate_to_modeling_language()
+        if self.fixed_values:
+            self.system_model.fix_variables(self.fixed_values)
+        self.system_model.translate_to_modeling_language(reuse=reuse)
 
         self.durations['modeling'] = round(timeit.default_timer() - t_start, 2)
         return self.system_model
 
-    def solve(self, solver: Solver, save_results: Union[bool, str, pathlib.Path] = False):
-        self._define_path_names(save_results)
+    def update_data(self, data: Dict[Union[TimeSeriesData, str], Numeric]) -> SystemModel:
+        """
+        Replaces the data of TimeSeries of the FlowSystem and updates the model for the next solve().
+        Only the Elements using these TimeSeries are modeled again, and only their changed bounds, coefficients and
+        right hand sides are passed on to the existing solver model (see SystemModel.update_data()).
+        If the structure of the model changes, the model is created again.
+        The passed TimeSeriesData objects are not modified.
+
+        Parameters
+        ----------
+        data : dict
+            The new data of the TimeSeries. The keys are either the TimeSeriesData objects used to create the
+            FlowSystem, or the labels of the TimeSeries (like 'Boiler__Q_th__relative_maximum').
+            The values must be scalars or arrays with the length of the time series of the FlowSystem.
+        """
+        if self.system_model is None:
+            raise Exception(f'The model must be created with .do_modeling() before the data can be updated')
         t_start = timeit.default_timer()
-        solver.logfile_name = self._paths['log']
-        self.system_model.solve(solver)
-        self.durations['solving'] = round(timeit.default_timer() - t_start, 2)
+        time_series = {ts.label: ts for ts in self.flow_system.all_time_series}
+        changed_time_series = []
+        for key, values in data.items():
+            label = key.label if isinstance(key, TimeSeriesData) else key
+            if label not in time_series:
+                raise KeyError(f'No TimeSeries with label "{label}" found in the FlowSystem')
+            if not np.isscalar(values) and len(values) != len(self.flow_system.time_series):
+                raise ValueError(f'The new data of TimeSeries "{label}" has length {len(values)}, '
+                                 f'but the FlowSystem has {len(self.flow_system.time_series)} time steps')
+            changed_time_series.append(time_series[label])
+        for ts, values in zip(changed_time_series, data.values()):
+            ts.data = TimeSeries.make_scalar_if_possible(np.array(values, dtype=float) if not np.isscalar(values)
+                                                         else values)
+            ts.activate_indices(self.time_indices)
 
-        if save_results:
-            self._save_solve_infos()
+        self._results = None
+        if not self.system_model.update_data(changed_time_series):
+            logger.info(f'The structure of the model changed with the new data. It is created again')
+            return self._do_modeling(reuse=self.system_model.model)
+        self.durations['modeling'] = round(timeit.default_timer() - t_start, 2)
+        return self.system_model
+
+    def _shift(self, time_indices: Union[range, List[int]]) -> SystemModel:
+        """
+        Moves the modeled calculation to other time_indices of the FlowSystem with the same number of time steps.
+        The model is updated in place for the data of the new time steps and the current initial states of the
+        Elements (see SystemModel.update_data() and SystemModel.update_initial_state()). Only if its structure
+        changes, the model is created again.
+        """
+        t_start = timeit.default_timer()
+        self._finish_shift(time_indices, self._prepare_shift(time_indices))
+        self.durations['modeling'] = round(timeit.default_timer() - t_start, 2)
+        return self.system_model
+
+    def _prepare_shift(self, time_indices: Union[range, List[int]],
+                       flow_system: Optional[FlowSystem] = None) -> Optional[Callable[[], None]]:
+        """
+        The first part of _shift(), which doesn't change the model (see SystemModel.prepare_data_update()).
+        If flow_system (a copy of the FlowSystem, see FlowSystem.copy()) is given, it is modeled instead. Then neither
+        this calculation nor its FlowSystem are changed, so this can run in a background thread.
+        Returns None if the structure of the model changes.
+        """
+        flow_system = self.flow_system if flow_system is None else flow_system
+        for time_series in flow_system.all_time_series:
+            time_series.activate_indices(time_indices)
+        return self.system_model.prepare_data_update(time_indices=time_indices, flow_system=flow_system)
+
+    def _finish_shift(self, time_indices: Union[range, List[int]],
+                      apply_data_update: Optional[Callable[[], None]]) -> SystemModel:
+        """ The second part of _shift(): Takes over the prepared data and the initial states of the Elements """
+        self.time_indices = time_indices
+        for time_series in self.flow_system.all_time_series:
+            time_series.activate_indices(time_indices)
+        self._results = None
+        system_model = self.system_model
+        if apply_data_update is not None:
+            apply_data_update()
+            if system_model.update_initial_state():
+                return system_model
+        logger.info(f'The structure of the model changed with the time steps. It is created again')
+        return self._do_modeling(reuse=system_model.model)
+
+    def solve(self, solver: Solver, save_results: Union[bool, str, pathlib.Path] = False,
+              cache: Optional[DiskCache] = None,
+              warm_start: Optional[Union[Calculation, Dict[str, Numeric], str, pathlib.Path]] = None,
+              time_budget: Optional[float] = None,
+              checkpoint: Union[bool, float] = False):
+        """
+        Parameters
+        ----------
+        solver : Solver
+            The solver to use.
+        save_results : bool or str or pathlib.Path
+            If True or a path, the results are saved to disk.
+        cache : DiskCache, optional
+            Cache for the solution. See MathModel.solve().
+        warm_start : Calculation or dict or str or pathlib.Path, optional
+            Results of a previous (e.g. aggregated) Calculation, a dict of results by the label of the Variables or
+            the path of a checkpoint. They are passed to the solver as start values. See Calculation.warm_start_values().
+        time_budget : float, optional
+            Wall-clock seconds for the solve. The time limit of the solver is lowered to the remaining budget, so the
+            best solution found so far is taken once the budget is used up.
+        checkpoint : bool or float
+            If True, every new incumbent is written to the results folder (<name>_checkpoint.json) during the solve.
+            If a number, at most every so many seconds. Requires save_results and modeling_language='highspy'.
+            To restart from it, pass the path of the checkpoint as warm_start.
+        """
+        self._solve(solver, save_results, cache, warm_start, time_budget, checkpoint)
 
 
 class AggregatedCalculation(Calculation):
@@ -170,12 +369,16 @@ class AggregatedCalculation(Calculation):
     def __init__(self, name, flow_system: FlowSystem,
                  aggregation_parameters: AggregationParameters,
                  components_to_clusterize: Optional[List[Component]] = None,
-                 modeling_language: Literal["pyomo", "cvxpy"] = "pyomo",
-                 time_indices: Optional[Union[range, List[int]]] = None):
+                 modeling_language: Literal["pyomo", "highspy", "cvxpy"] = "pyomo",
+                 time_indices: Optional[Union[range, List[int]]] = None,
+                 presolve: bool = False,
+                 scaling: bool = False):
         """
         Class for Optimizing the FLowSystem including:
             1. Aggregating TimeSeriesData via typical periods using tsam.
             2. Equalizing variables of typical periods.
+        With AggregationParameters.typical_periods_only, only the typical periods are modeled instead (see
+        SystemModel.use_typical_periods()). The results are expanded to the full horizon.
         Parameters
         ----------
         name : str
@@ -188,30 +391,112 @@ class AggregatedCalculation(Calculation):
             computed in the DataAggregation
         flow_system : FlowSystem
             flow_system which should be calculated
-        modeling_language : 'pyomo','cvxpy' (not implemeted yet)
+        modeling_language : 'pyomo', 'highspy', 'cvxpy' (not implemeted yet)
             choose optimization modeling language
         time_indices : List[int] or None
             list with indices, which should be used for calculation. If None, then all timesteps are used.
+        presolve : bool
+            If True, the model is reduced before passing it to the solver. Only supported by 'highspy'.
+        scaling : bool
+            If True, the model is scaled before passing it to the solver. Only supported by 'highspy'.
         """
-        super().__init__(name, flow_system, modeling_language, time_indices)
+        super().__init__(name, flow_system, modeling_language, time_indices, presolve, scaling)
         self.aggregation_parameters = aggregation_parameters
         self.components_to_clusterize = components_to_clusterize
         self.time_series_for_aggregation = None
         self.aggregation = None
         self.time_series_collection: Optional[TimeSeriesCollection] = None
+        self._typical_time_indices: Optional[List[int]] = None
 
-    def do_modeling(self) -> SystemModel:
+    def do_modeling(self, cache: Optional[DiskCache] = None) -> SystemModel:
+        """
+        Parameters
+        ----------
+        cache : DiskCache, optional
+            Cache for the clustering. If the same data was clustered with the same AggregationParameters before,
+            the clustering is loaded from it. See Aggregation.cluster().
+        """
+        t_start_agg = timeit.default_timer()
+        self.aggregation = self._create_aggregation()
+        self.aggregation.cluster(cache)
+        self.aggregation.plot()
+        if self.aggregation_parameters.typical_periods_only:
+            # The TimeSeries only hold the typical periods, taken from the first period of their cluster
+            typical_data, typical_indices = self.aggregation.get_typical_periods()
+            all_indices = self.time_indices if self.time_indices is not None else range(len(self.flow_system.time_series))
+            self._typical_time_indices = np.asarray(all_indices)[typical_indices].tolist()
+            for time_series in self.flow_system.all_time_series:
+                time_series.activate_indices(self._typical_time_indices)
+            self.time_series_collection.insert_data(typical_data)
+        elif self.aggregation_parameters.aggregate_data_and_fix_non_binary_vars:
+            self.time_series_collection.insert_data(  # Converting it into a dict with labels as keys
+                {col: np.array(values) for col, values in self.aggregation.aggregated_data.to_dict(orient='list').items()})
+        self.durations['aggregation'] = round(timeit.default_timer() - t_start_agg, 2)
+
+        # Model the System
+        t_start = timeit.default_timer()
+
+        self._results = None
+        if self.aggregation_parameters.typical_periods_only:
+            self.system_model = SystemModel(self.name, self.modeling_language, self.flow_system,
+                                            self._typical_time_indices)
+            # With segmentation, the time steps of the typical periods have varying durations
+            dt_in_hours = self.aggregation.segment_durations.ravel() * self.aggregation.hours_per_time_step
+            self.system_model.use_typical_periods(self.aggregation.period_length, self.aggregation.tsam.clusterOrder,
+                                                  self.aggregation.occurrences, dt_in_hours)
+        else:
+            self.system_model = SystemModel(self.name, self.modeling_language, self.flow_system, self.time_indices)
+        self.system_model.presolve = self.presolve
+        self.system_model.scaling = self.scaling
+        self.system_model.do_modeling()
+        if not self.aggregation_parameters.typical_periods_only:
+            #Add Aggregation Model after modeling the rest
+            aggregation_model = AggregationModel(self.aggregation_parameters, self.flow_system, self.aggregation,
+                                                 self.components_to_clusterize)
+            self.system_model.other_models.append(aggregation_model)
+            aggregation_model.do_modeling(self.system_model)
+
+        self.system_model.translate_to_modeling_language()
+
+        self.durations['modeling'] = round(timeit.default_timer() - t_start, 2)
+        return self.system_model
+
+    def solve(self, solver: Solver, save_results: Union[bool, str, pathlib.Path] = False,
+              cache: Optional[DiskCache] = None,
+              warm_start: Optional[Union[Calculation, Dict[str, Numeric], str, pathlib.Path]] = None,
+              time_budget: Optional[float] = None,
+              checkpoint: Union[bool, float] = False):
+        """
+        Parameters
+        ----------
+        solver : Solver
+            The solver to use.
+        save_results : bool or str or pathlib.Path
+            If True or a path, the results are saved to disk.
+        cache : DiskCache, optional
+            Cache for the solution. See MathModel.solve().
+        warm_start : Calculation or dict or str or pathlib.Path, optional
+            Results of a previous (e.g. aggregated) Calculation, a dict of results by the label of the Variables or
+            the path of a checkpoint. They are passed to the solver as start values. See Calculation.warm_start_values().
+        time_budget : float, optional
+            Wall-clock seconds for the solve. The time limit of the solver is lowered to the remaining budget, so the
+            best solution found so far is taken once the budget is used up.
+        checkpoint : bool or float
+            If True, every new incumbent is written to the results folder (<name>_checkpoint.json) during the solve.
+            If a number, at most every so many seconds. Requires save_results and modeling_language='highspy'.
+            To restart from it, pass the path of the checkpoint as warm_start.
+        """
+        self._solve(solver, save_results, cache, warm_start, time_budget, checkpoint)
+
+    def _create_aggregation(self) -> 'Aggregation':
+        """ Collects the TimeSeries of the FlowSystem, which are aggregated, and creates the (not yet clustered) Aggregation """
         self.flow_system.transform_data()
         for time_series in self.flow_system.all_time_series:
             time_series.activate_indices(self.time_indices)
 
-        from .aggregation import Aggregation
-
         (chosenTimeSeries, chosenTimeSeriesWithEnd, dt_in_hours, dt_in_hours_total) = (
             self.flow_system.get_time_data_from_indices(self.time_indices))
 
-        t_start_agg = timeit.default_timer()
-
         # Validation
         dt_min, dt_max = np.min(dt_in_hours), np.max(dt_in_hours)
         if not dt_min == dt_max:
@@ -231,59 +516,54 @@ class AggregatedCalculation(Calculation):
         original_data = pd.DataFrame(self.time_series_collection.data, index=chosenTimeSeries)
 
         # Aggregation - creation of aggregated timeseries:
-        self.aggregation = Aggregation(original_data=original_data,
-                                            hours_per_time_step=dt_min,
-                                            hours_per_period=self.aggregation_parameters.hours_per_period,
-                                            nr_of_periods=self.aggregation_parameters.nr_of_periods,
-                                            weights=self.time_series_collection.weights,
-                                            time_series_for_high_peaks=self.aggregation_parameters.labels_for_high_peaks,
-                                            time_series_for_low_peaks=self.aggregation_parameters.labels_for_low_peaks)
-
-        self.aggregation.cluster()
-        self.aggregation.plot()
-        if self.aggregation_parameters.aggregate_data_and_fix_non_binary_vars:
-            self.time_series_collection.insert_data(  # Converting it into a dict with labels as keys
-                {col: np.array(values) for col, values in self.aggregation.aggregated_data.to_dict(orient='list').items()})
-        self.durations['aggregation'] = round(timeit.default_timer() - t_start_agg, 2)
-
-        # Model the System
-        t_start = timeit.default_timer()
-
-        self.system_model = SystemModel(self.name, self.modeling_language, self.flow_system, self.time_indices)
-        self.system_model.do_modeling()
-        #Add Aggregation Model after modeling the rest
-        aggregation_model = AggregationModel(self.aggregation_parameters, self.flow_system, self.aggregation,
-                                             self.components_to_clusterize)
-        self.system_model.other_models.append(aggregation_model)
-        aggregation_model.do_modeling(self.system_model)
-
-        self.system_model.translate_to_modeling_language()
+        return Aggregation(original_data=original_data,
+                           hours_per_time_step=dt_min,
+                           hours_per_period=self.aggregation_parameters.hours_per_period,
+                           nr_of_periods=self.aggregation_parameters.nr_of_periods,
+                           weights=self.time_series_collection.weights,
+                           time_series_for_high_peaks=self.aggregation_parameters.labels_for_high_peaks,
+                           time_series_for_low_peaks=self.aggregation_parameters.labels_for_low_peaks,
+                           nr_of_segments=self.aggregation_parameters.nr_of_segments,
+                           cluster_method=self.aggregation_parameters.cluster_method,
+                           clustering_backend=self.aggregation_parameters.clustering_backend)
 
-        self.durations['modeling'] = round(timeit.default_timer() - t_start, 2)
-        return self.system_model
-
-    def solve(self, solver: Solver, save_results: Union[bool, str, pathlib.Path] = False):
-        self._define_path_names(save_results)
-        t_start = timeit.default_timer()
-        solver.logfile_name = self._paths['log']
-        self.system_model.solve(solver)
-        self.durations['solving'] = round(timeit.default_timer() - t_start, 2)
-
-        if save_results:
-            self._save_solve_infos()
+    def results(self):
+        """
+        With typical periods only, the results are expanded to the full horizon by the order of the clusters.
+        Segments are repeated over their original time steps, charge states are interpolated within them. The shares
+        of the effects and the switches of a segment are distributed over its time steps, so their sums are kept.
+        """
+        if self._results is not None or not self.aggregation_parameters.typical_periods_only:
+            return super().results()
+        results = _expand_nested_arrays(self.system_model.results(), self.aggregation.expand,
+                                        extensive_keys=('Effects', 'switchOn', 'switchOff'))
+        for model in self.system_model.component_models:
+            if isinstance(model, StorageModel):
+                charge_state = self.aggregation.expand_states(model.charge_state_of_horizon())
+                results['Components'][model.element.label][model.charge_state.label_short] = charge_state
+        _, results['Time'], results['Time intervals in hours'], _ = (
+            self.flow_system.get_time_data_from_indices(self.time_indices))
+        self._results = results
+        return self._results
 
 
 class SegmentedCalculation(Calculation):
     def __init__(self, name, flow_system: FlowSystem,
                  segment_length: int,
                  overlap_length: int,
-                 modeling_language: Literal["pyomo", "cvxpy"] = "pyomo",
-                 time_indices: Optional[Union[range, list[int]]] = None):
+                 modeling_language: Literal["pyomo", "highspy", "cvxpy"] = "pyomo",
+                 time_indices: Optional[Union[range, list[int]]] = None,
+                 presolve: bool = False,
+                 scaling: bool = False,
+                 pipelined: bool = False):
         """
         Dividing and Modeling the problem in (overlapping) segments.
         The final values of each Segment are recognized by the following segment, effectively coupling
         charge_states and flow_rates between segments.
-        Because of this intersection, both modeling and solving is done in one step
+        Because of this intersection, both modeling and solving is done in one step.
+        The model of the first segment is shifted from segment to segment: Only the data of the time steps and the
+        initial states are updated (see FullCalculation._shift()). Only if the structure of the model changes (e.g. a
+        shorter last segment), the segment is modeled again.
 
         Take care:
         Parameters like InvestParameters, sum_of_flow_hours and other restrictions over the total time_series
@@ -301,18 +581,29 @@ class SegmentedCalculation(Calculation):
         overlap_length : int
             The number of time_steps that are added to each individual model. Used for better
             results of storages)
-        modeling_language : 'pyomo', 'cvxpy' (not implemeted yet)
+        modeling_language : 'pyomo', 'highspy', 'cvxpy' (not implemeted yet)
             choose optimization modeling language
         time_indices : List[int] or None
             list with indices, which should be used for calculation. If None, then all timesteps are used.
-
+        presolve : bool
+            If True, the model of each segment is reduced before passing it to the solver. Only supported by 'highspy'.
+        scaling : bool
+            If True, the model of each segment is scaled before passing it to the solver. Only supported by 'highspy'.
+        pipelined : bool
+            If True, the data of the next segment is modeled in a background thread while the current segment is
+            solved. This hides the modeling time behind the solving time on machines with more than one core.
         """
-        super().__init__(name, flow_system, modeling_language, time_indices)
+        super().__init__(name, flow_system, modeling_language, time_indices, presolve, scaling)
         self.segment_length = segment_length
         self.overlap_length = overlap_length
+        self.pipelined = pipelined
         self._total_length = len(self.time_indices) if self.time_indices is not None else len(flow_system.time_series)
         self.number_of_segments = math.ceil(self._total_length / self.segment_length)
         self.sub_calculations: List[FullCalculation] = []
+        # The segments share one SystemModel, which is shifted from segment to segment. Therefore, the results of each
+        # segment are stored right after solving it.
+        self.main_results_of_segments: List[Dict[str, Union[Skalar, Dict]]] = []
+        self.solutions_of_segments: List[Dict[str, Numeric]] = []  # The results of all Variables by their label
 
         assert segment_length > 2, 'The Segment length must be greater 2, due to unwanted internal side effects'
         assert self.segment_length_with_overlap <= self._total_length, \
@@ -325,29 +616,33 @@ class SegmentedCalculation(Calculation):
         }
         self._transfered_start_values: Dict[str, Dict[str, Any]] = {}
 
-    def do_modeling_and_solve(self, solver: Solver, save_results: Union[bool, str, pathlib.Path] = True):
+    def do_modeling_and_solve(self, solver: Solver, save_results: Union[bool, str, pathlib.Path] = True,
+                              cache: Optional[DiskCache] = None):
         logger.info(f'{"":#^80}')
         logger.info(f'{" Segmented Solving ":#^80}')
         self._define_path_names(save_results)
 
-        for i in range(self.number_of_segments):
-            name_of_segment = f'Segment_{i+1}'
-            if self.sub_calculations:
-                self._transfer_start_values(name_of_segment)
-            time_indices = self._get_indices(i)
-            logger.info(f'{name_of_segment}. (flow_system indices {time_indices.start}...{time_indices.stop-1}):')
-            calculation = FullCalculation(name_of_segment, self.flow_system, self.modeling_language, time_indices)
-            # TODO: Add Before Values if available
-            self.sub_calculations.append(calculation)
-            calculation.do_modeling()
-            invest_elements = [model.element.label_full for model in calculation.system_model.sub_models
-                               if isinstance(model, InvestmentModel)]
-            if invest_elements:
-                logger.critical(f'Investments are not supported in Segmented Calculation! '
-                                f'Following elements Contain Investments: {invest_elements}')
-            calculation.solve(solver, save_results=False)
-
-        self._reset_start_values()
+        try:
+            if self.pipelined:
+                self._solve_pipelined(solver, cache)
+            else:
+                for i in range(self.number_of_segments):
+                    calculation = self._create_segment(i)
+                    if self.sub_calculations:  # The model of the prior segment is shifted
+                        prior_calculation = self.sub_calculations[-1]
+                        self._transfer_start_values(calculation.name, prior_calculation)
+                        calculation.system_model = prior_calculation.system_model
+                        calculation._shift(calculation.time_indices)
+                        calculation.system_model.set_start_values(self._shifted_start_values(prior_calculation,
+                                                                                             calculation))
+                    else:
+                        calculation.do_modeling()
+                    self.sub_calculations.append(calculation)
+                    self._check_investments(calculation)
+                    calculation.solve(solver, save_results=False, cache=cache)
+                    self._store_results(calculation)
+        finally:  # The start values are changed for the segments, also the placeholders of the pipelining
+            self._reset_start_values()
 
         for calc in self.sub_calculations:
             for key, value in calc.durations.items():
@@ -426,23 +721,120 @@ class SegmentedCalculation(Calculation):
         logger.info(f'Saving calculation to .yaml took {(timeit.default_timer() - t_start):>8.2f} seconds')
 
 
-    def _transfer_start_values(self, segment_name: str):
+    def _solve_pipelined(self, solver: Solver, cache: Optional[DiskCache] = None):
+        """
+        Solves the segments one after another, while the data of the next segment is modeled in a background thread
+        (see FullCalculation._prepare_shift()). The background thread only uses a copy of the FlowSystem, so the
+        FlowSystem and the model being solved aren't touched. Once the current segment is solved, its final values are
+        transferred and its model is shifted to the next segment.
+        """
+        calculation = self._create_segment(0)
+        calculation.do_modeling()
+
+        # The structure of the following segments must not depend on the transferred values: A Storage without a
+        # numeric initial_charge_state gets one from the prior segment anyway.
+        for comp in self.flow_system.components:
+            if isinstance(comp, Storage) and (comp.initial_charge_state is None or
+                                              not utils.is_number(comp.initial_charge_state)):
+                comp.initial_charge_state = 0  # Placeholder, replaced by the transferred value
+        flow_system_copy = self.flow_system.copy()  # Only used by the background thread
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='flixOpt_segment_modeling') as executor:
+            for i in range(self.number_of_segments):
+                self.sub_calculations.append(calculation)
+                self._check_investments(calculation)
+                if i + 1 == self.number_of_segments:
+                    calculation.solve(solver, save_results=False, cache=cache)
+                    self._store_results(calculation)
+                    break
+
+                next_calculation = self._create_segment(i + 1)
+                next_calculation.system_model = calculation.system_model
+                preparation = executor.submit(self._prepare_segment, next_calculation, flow_system_copy)
+                calculation.solve(solver, save_results=False, cache=cache)
+                self._store_results(calculation)
+                apply_data_update = preparation.result()  # Waits for the modeling and raises its exceptions
+
+                t_start = timeit.default_timer()
+                self._transfer_start_values(next_calculation.name, calculation)
+                next_calculation._finish_shift(next_calculation.time_indices, apply_data_update)
+                next_calculation.system_model.set_start_values(self._shifted_start_values(calculation,
+                                                                                          next_calculation))
+                next_calculation.durations['modeling'] += round(timeit.default_timer() - t_start, 2)
+                calculation = next_calculation
+
+    @staticmethod
+    def _prepare_segment(calculation: FullCalculation, flow_system: FlowSystem) -> Optional[Callable[[], None]]:
+        """
+        Prepares the shift of the model of the current segment (calculation.system_model) to the segment of
+        calculation with a copy of the FlowSystem, without changing the model, the FlowSystem or calculation.
+        Returns None if the structure of the model differs. The segment is modeled again after solving then.
+        """
+        t_start = timeit.default_timer()
+        apply_data_update = calculation._prepare_shift(calculation.time_indices, flow_system)
+        calculation.durations['modeling'] = round(timeit.default_timer() - t_start, 2)
+        return apply_data_update
+
+    def _store_results(self, calculation: FullCalculation):
+        """ Stores the results of a solved segment, before the shared SystemModel is shifted to the next one """
+        calculation.results()  # Kept by the calculation
+        self.main_results_of_segments.append(calculation.system_model.main_results)
+        self.solutions_of_segments.append({variable.label: variable.result
+                                           for variable in calculation.system_model.variables})
+
+    def _create_segment(self, segment_index: int) -> FullCalculation:
+        """ Creates the (not yet modeled) FullCalculation of a segment """
+        name_of_segment = f'Segment_{segment_index + 1}'
+        time_indices = self._get_indices(segment_index)
+        logger.info(f'{name_of_segment}. (flow_system indices {time_indices.start}...{time_indices.stop-1}):')
+        calculation = FullCalculation(name_of_segment, self.flow_system, self.modeling_language, time_indices,
+                                      self.presolve, self.scaling)
+        calculation.fixed_values = self.fixed_values
+        return calculation
+
+    @staticmethod
+    def _check_investments(calculation: FullCalculation):
+        invest_elements = [model.element.label_full for model in calculation.system_model.sub_models
+                           if isinstance(model, InvestmentModel) and not model.size.fixed]
+        if invest_elements:
+            logger.critical(f'Investments are not supported in Segmented Calculation! '
+                            f'Following elements Contain Investments: {invest_elements}')
+
+    def _transfer_start_values(self, segment_name: str, prior_calculation: FullCalculation):
         """
         This function gets the last values of the previous solved segment and
-        inserts them as start values for the nest segment
+        inserts them as start values for the nest segment.
+        The results are taken from the models of prior_calculation, as the Elements might already be part of the
+        model of the next segment.
         """
         final_index_of_prior_segment = - (1 + self.overlap_length)
         start_values_of_this_segment = {}
+        prior_models = {model.element: model for model in prior_calculation.system_model.sub_models
+                        if isinstance(model, (FlowModel, StorageModel))}
         for flow in self.flow_system.all_flows:
-            flow.previous_flow_rate = flow.model.flow_rate.result[final_index_of_prior_segment]  #TODO: maybe more values?
+            flow.previous_flow_rate = prior_models[flow].flow_rate.result[final_index_of_prior_segment]  #TODO: maybe more values?
             start_values_of_this_segment[flow.label_full] = flow.previous_flow_rate
         for comp in self.flow_system.components:
             if isinstance(comp, Storage):
-                comp.initial_charge_state = comp.model.charge_state.result[final_index_of_prior_segment]
+                comp.initial_charge_state = prior_models[comp].charge_state.result[final_index_of_prior_segment]
                 start_values_of_this_segment[comp.label_full] = comp.initial_charge_state
 
         self._transfered_start_values[segment_name] = start_values_of_this_segment
 
+    def _shifted_start_values(self, prior_calculation: FullCalculation,
+                              calculation: FullCalculation) -> Dict[str, np.ndarray]:
+        """
+        Returns start values for the time series variables of calculation: The results of the prior segment, shifted
+        by the segment_length, are known for the overlap. The other time steps get the results of the prior segment
+        at the same position in the segment, as a guess for a complete start solution.
+        """
+        start_values = _shifted_results(prior_calculation.system_model, calculation.system_model, self.segment_length)
+        prior_results = self.solutions_of_segments[-1]
+        for label, values in start_values.items():  # The prior segment is never shorter
+            guess = np.asarray(prior_results[label], dtype=float)[:len(values)]
+            unknown = np.isnan(values)
+            values[unknown] = guess[unknown]
+        return start_values
+
     def _reset_start_values(self):
         """ This resets the start values of all Elements to its original state"""
         for flow in self.flow_system.all_flows:
@@ -468,6 +860,1174 @@ class SegmentedCalculation(Calculation):
             **self._transfered_start_values}
 
 
+class RollingHorizonCalculation(Calculation):
+    """
+    Rolling horizon (model predictive) dispatch: A model of a fixed horizon is kept and shifted forward step by step.
+    The stepping is driven externally, e.g. by an operation system:
+
+        calculation.do_modeling()
+        calculation.solve(solver)
+        while ...:
+            calculation.step(forecasts={...}, realized={...})
+            calculation.solve(solver)
+
+    Each step, the forecasts are written into the TimeSeries of the FlowSystem (the TimeSeriesData of the user stay
+    unchanged), and the realized states (previous_flow_rate and with it the on-status, initial_charge_state) are
+    carried over. Without measurements, they are taken from the solution of the prior horizon. To keep the latency
+    per step low, the model of the horizon is shifted in place: Only the changed bounds, coefficients and right hand
+    sides are passed on to the solver model (see SystemModel.update_data()), which is warm started with the shifted
+    prior solution.
+
+    Take care:
+    Like in the SegmentedCalculation, InvestParameters and restrictions over the total time_series (like
+    sum_of_flow_hours or final charge states) apply to each horizon.
+    """
+
+    def __init__(self, name, flow_system: FlowSystem,
+                 horizon_length: int,
+                 step_length: int = 1,
+                 modeling_language: Literal["pyomo", "highspy", "cvxpy"] = "highspy",
+                 time_indices: Optional[Union[range, List[int]]] = None,
+                 presolve: bool = False,
+                 scaling: bool = False):
+        """
+        Parameters
+        ----------
+        name : str
+            name of calculation
+        flow_system : FlowSystem
+            flow_system which should be calculated. Its TimeSeries hold the forecasts and are changed by step().
+        horizon_length : int
+            The number of time_steps of the horizon.
+        step_length : int
+            The number of time_steps the horizon is shifted per step. The first step_length time steps of each
+            horizon are the applied dispatch (see results()).
+        modeling_language : 'pyomo', 'highspy', 'cvxpy' (not implemeted yet)
+            choose optimization modeling language. The solver model is updated each step.
+        time_indices : List[int] or None
+            list with indices, which should be used for calculation. If None, then all timesteps are used.
+        presolve : bool
+            If True, the model is reduced before passing it to the solver. Only supported by 'highspy'.
+        scaling : bool
+            If True, the model is scaled before passing it to the solver. Only supported by 'highspy'.
+        """
+        super().__init__(name, flow_system, modeling_language, time_indices, presolve, scaling)
+        self.horizon_length = horizon_length
+        self.step_length = step_length
+        self._indices = time_indices if time_indices is not None else range(len(flow_system.time_series))
+        self.start = 0  # Position of the current horizon in the indices
+        self.calculation: Optional[FullCalculation] = None  # The calculation of the current horizon
+        self.step_infos: List[Dict[str, Any]] = []
+
+        assert 0 < step_length <= horizon_length, f'The {step_length=} must be between 1 and {horizon_length=}'
+        assert horizon_length <= len(self._indices), \
+            f'{horizon_length=} cant be greater than the total length {len(self._indices)}'
+
+        self._original_start_values = {
+            **{flow: flow.previous_flow_rate for flow in self.flow_system.all_flows},
+            **{comp: comp.initial_charge_state for comp in self.flow_system.components if isinstance(comp, Storage)}
+        }
+        self._results_of_steps: List[Dict[str, Any]] = []  # Results of the horizons, which were shifted
+        self._solved = False
+
+    def do_modeling(self) -> SystemModel:
+        """ Models the first horizon """
+        self.start, self.step_infos, self._results_of_steps, self._solved = 0, [], [], False
+        self.calculation = self._create_horizon()
+        self.system_model = self.calculation.do_modeling()
+        SegmentedCalculation._check_investments(self.calculation)
+        self.step_infos.append({'Start index': self.horizon_indices[0],
+                                'modeling': self.calculation.durations['modeling'], 'solving': None})
+        self.durations['modeling'] += self.calculation.durations['modeling']
+        return self.system_model
+
+    def solve(self, solver: Solver, cache: Optional[DiskCache] = None, time_budget: Optional[float] = None):
+        """ Solves the current horizon. See FullCalculation.solve() """
+        if self.calculation is None:
+            raise Exception(f'The model must be created with .do_modeling() before solving')
+        self.calculation.solve(solver, save_results=False, cache=cache, time_budget=time_budget)
+        self._results, self._solved = None, True
+        self.step_infos[-1]['solving'] = self.calculation.durations['solving']
+        self.durations['solving'] += self.calculation.durations['solving']
+        logger.info(f'Solved horizon starting at index {self.horizon_indices[0]} in '
+                    f'{sum(self.step_infos[-1][key] for key in ("modeling", "solving")):.3f} seconds')
+
+    def step(self,
+             forecasts: Optional[Dict[Union[TimeSeriesData, str], Numeric]] = None,
+             realized: Optional[Dict[Union[Flow, Storage, str], Numeric]] = None) -> SystemModel:
+        """
+        Shifts the horizon forward by step_length and updates the model for the next solve().
+
+        Parameters
+        ----------
+        forecasts : dict, optional
+            New data of TimeSeries for the shifted horizon. The keys are either the TimeSeriesData objects used to
+            create the FlowSystem, or the labels of the TimeSeries (like 'Boiler__Q_th__relative_maximum').
+            The values must be scalars or arrays with the length of the horizon.
+        realized : dict, optional
+            Measured states at the start of the shifted horizon, by Flow or Storage (or their label_full): The
+            previous_flow_rate of Flows (scalar or array of the last values) and the initial_charge_state of Storages.
+            All other states are taken from the solution of the current horizon.
+        """
+        if not self._solved:
+            raise Exception(f'The current horizon must be solved before the horizon can be shifted')
+        if self.start + self.step_length + self.horizon_length > len(self._indices):
+            raise Exception(f'The horizon can not be shifted beyond the end of the time series of the FlowSystem '
+                            f'({len(self._indices)} time steps)')
+        t_start = timeit.default_timer()
+        self._results_of_steps.append(self.calculation.results())
+        self._carry_over_states(self.calculation, realized or {})
+        self.start += self.step_length
+        if forecasts:
+            self._update_forecasts(forecasts)
+
+        start_values = _shifted_results(self.system_model, self.system_model, self.step_length)
+        self.system_model = self.calculation._shift(self.horizon_indices)
+        self.system_model.set_start_values(start_values)
+        self._results, self._solved = None, False
+
+        duration = round(timeit.default_timer() - t_start, 3)
+        self.step_infos.append({'Start index': self.horizon_indices[0], 'modeling': duration, 'solving': None})
+        self.durations['modeling'] += duration
+        return self.system_model
+
+    def results(self, horizon: bool = False) -> Dict[str, Union[Numeric, Dict[str, Numeric]]]:
+        """
+        Returns the applied dispatch: The array results of the first step_length time steps of each solved horizon,
+        concatenated. Scalar results are skipped, as they refer to whole horizons.
+        If horizon is True, the results of the current horizon (the latest plan) are returned instead.
+        """
+        if horizon:
+            return self.calculation.results()
+        if self._results is None:
+            results_of_steps = self._results_of_steps + ([self.calculation.results()] if self._solved else [])
+            self._results = _limit_nested_arrays(
+                _combine_nested_arrays(*results_of_steps, length_per_array=self.step_length),
+                self.step_length * len(results_of_steps))
+        return self._results
+
+    def reset_initial_states(self):
+        """ Resets the initial states of all Elements, which were changed by step(), to its original state """
+        for flow in self.flow_system.all_flows:
+            flow.previous_flow_rate = self._original_start_values[flow]
+        for comp in self.flow_system.components:
+            if isinstance(comp, Storage):
+                comp.initial_charge_state = self._original_start_values[comp]
+
+    def _create_horizon(self) -> FullCalculation:
+        """ Creates the (not yet modeled) FullCalculation of the current horizon """
+        calculation = FullCalculation(f'{self.name}_{self.horizon_indices[0]}', self.flow_system,
+                                      self.modeling_language, self.horizon_indices, self.presolve, self.scaling)
+        calculation.fixed_values = self.fixed_values
+        return calculation
+
+    def _carry_over_states(self, prior_calculation: FullCalculation, realized: Dict[Union[Flow, Storage, str], Numeric]):
+        """ Sets the initial states of the Elements to the realized values or the values of the prior solution """
+        realized = {key if isinstance(key, str) else key.label_full: value for key, value in realized.items()}
+        prior_models = {model.element: model for model in prior_calculation.system_model.sub_models
+                        if isinstance(model, (FlowModel, StorageModel))}
+        storages = [comp for comp in self.flow_system.components if isinstance(comp, Storage)]
+        unknown = set(realized) - {element.label_full for element in self.flow_system.all_flows + storages}
+        if unknown:
+            raise KeyError(f'No Flows or Storages with labels {unknown} found in the FlowSystem')
+
+        for flow in self.flow_system.all_flows:
+            flow.previous_flow_rate = realized.get(flow.label_full,
+                                                   prior_models[flow].flow_rate.result[self.step_length - 1])
+        for comp in storages:  # The charge_state has one value more than the time steps
+            comp.initial_charge_state = realized.get(comp.label_full,
+                                                     prior_models[comp].charge_state.result[self.step_length])
+
+    def _update_forecasts(self, forecasts: Dict[Union[TimeSeriesData, str], Numeric]):
+        """ Writes the forecasts into the data of the TimeSeries at the time steps of the current horizon """
+        time_series = {ts.label: ts for ts in self.flow_system.all_time_series}
+        positions = list(self.horizon_indices)
+        for key, values in forecasts.items():
+            label = key.label if isinstance(key, TimeSeriesData) else key
+            if label not in time_series:
+                raise KeyError(f'No TimeSeries with label "{label}" found in the FlowSystem')
+            if not np.isscalar(values) and len(values) != self.horizon_length:
+                raise ValueError(f'The forecast of TimeSeries "{label}" has length {len(values)}, '
+                                 f'but the horizon has {self.horizon_length} time steps')
+            data = np.array(np.broadcast_to(time_series[label].data, len(self.flow_system.time_series)), dtype=float)
+            data[positions] = values
+            time_series[label].data = TimeSeries.make_scalar_if_possible(data)
+
+    @property
+    def horizon_indices(self) -> Union[range, List[int]]:
+        """ The indices of the FlowSystem of the current horizon """
+        return self._indices[self.start:self.start + self.horizon_length]
+
+    @property
+    def infos(self):
+        solved_steps = [info for info in self.step_infos if info['solving'] is not None]
+        return {**super().infos,
+                'Horizon length': self.horizon_length,
+                'Step length': self.step_length,
+                'Steps': len(self.step_infos),
+                'Mean latency per step': round(float(np.mean([info['modeling'] + info['solving']
+                                                              for info in solved_steps])), 3) if solved_steps else None}
+
+
+class TwoStageCalculation(Calculation):
+    """
+    Aggregate-then-dispatch: Sizes the investments with an AggregatedCalculation (stage one), fixes the sizes and
+    checks the operation of this design at full resolution (stage two). Stage two is a FullCalculation, or a
+    SegmentedCalculation if segment_length is given (possible, as the investments are already decided).
+    Because stage two depends on the results of stage one, modeling and solving is done in one step.
+    """
+    def __init__(self, name, flow_system: FlowSystem,
+                 aggregation_parameters: AggregationParameters,
+                 components_to_clusterize: Optional[List[Component]] = None,
+                 fix_is_invested: bool = True,
+                 segment_length: Optional[int] = None,
+                 overlap_length: int = 0,
+                 modeling_language: Literal["pyomo", "highspy", "cvxpy"] = "pyomo",
+                 time_indices: Optional[Union[range, List[int]]] = None,
+                 presolve: bool = False,
+                 scaling: bool = False):
+        """
+        Parameters
+        ----------
+        name : str
+            name of calculation
+        flow_system : FlowSystem
+            flow_system which should be calculated
+        aggregation_parameters : AggregationParameters
+            Parameters for the aggregation of stage one. See AggregatedCalculation.
+        components_to_clusterize: List[Component] or None
+            Components to perform the aggregation on in stage one. See AggregatedCalculation.
+        fix_is_invested : bool
+            If True, the investment decisions (isInvested) are fixed too. Else, only the sizes are fixed.
+        segment_length : int or None
+            If given, stage two is a SegmentedCalculation with this number of time_steps per segment.
+        overlap_length : int
+            The overlap of the segments of stage two. See SegmentedCalculation.
+        modeling_language : 'pyomo', 'highspy', 'cvxpy' (not implemeted yet)
+            choose optimization modeling language
+        time_indices : List[int] or None
+            list with indices, which should be used for calculation. If None, then all timesteps are used.
+        presolve : bool
+            If True, the models are reduced before passing them to the solver. Only supported by 'highspy'.
+        scaling : bool
+            If True, the models are scaled before passing them to the solver. Only supported by 'highspy'.
+        """
+        super().__init__(name, flow_system, modeling_language, time_indices, presolve, scaling)
+        self.aggregation_parameters = aggregation_parameters
+        self.components_to_clusterize = components_to_clusterize
+        self.fix_is_invested = fix_is_invested
+        self.segment_length = segment_length
+        self.overlap_length = overlap_length
+
+        self.stage_one: Optional[AggregatedCalculation] = None
+        self.stage_two: Optional[Union[FullCalculation, SegmentedCalculation]] = None
+
+    def do_modeling_and_solve(self, solver: Solver, save_results: Union[bool, str, pathlib.Path] = False,
+                              cache: Optional[DiskCache] = None):
+        logger.info(f'{"":#^80}')
+        logger.info(f'{" Stage one: Sizing on aggregated data ":#^80}')
+        self.stage_one = AggregatedCalculation(f'{self.name}_stage_one', self.flow_system,
+                                               self.aggregation_parameters, self.components_to_clusterize,
+                                               self.modeling_language, self.time_indices, self.presolve,
+                                               self.scaling)
+        self.stage_one.do_modeling(cache)
+        self.stage_one.solve(solver, save_results=save_results, cache=cache)
+        self.fixed_values = self.design()
+        logger.info(f'Fixed design: {self.fixed_values}')
+
+        logger.info(f'{"":#^80}')
+        logger.info(f'{" Stage two: Operation of the fixed design ":#^80}')
+        try:
+            if self.segment_length is None:
+                self.stage_two = FullCalculation(f'{self.name}_stage_two', self.flow_system, self.modeling_language,
+                                                 self.time_indices, self.presolve, self.scaling)
+                self.stage_two.fixed_values = self.fixed_values
+                self.stage_two.do_modeling()
+                self.stage_two.solve(solver, save_results=save_results, cache=cache, warm_start=self.stage_one)
+                self.system_model = self.stage_two.system_model
+            else:
+                self.stage_two = SegmentedCalculation(f'{self.name}_stage_two', self.flow_system, self.segment_length,
+                                                      self.overlap_length, self.modeling_language, self.time_indices,
+                                                      self.presolve, self.scaling)
+                self.stage_two.fixed_values = self.fixed_values
+                self.stage_two.do_modeling_and_solve(solver, save_results=save_results, cache=cache)
+                self.system_model = self.stage_two.sub_calculations[-1].system_model
+        except Exception as e:
+            system_models = self._stage_two_models()
+            if not system_models or system_models[-1].result_of_objective is not None:
+                raise  # Not caused by a missing solution
+            raise Exception(f'Stage two found no feasible solution for the design of stage one. The fixed '
+                            f'investments are probably too small for the operation at full resolution: '
+                            f'{self._fixed_investments()}. '
+                            f'Use a Bus with excess_penalty_per_flow_hour to find the lacking capacity, or more '
+                            f'typical periods or time_series_for_high_peaks in the aggregation_parameters') from e
+        undersized = self.undersized_elements()
+        if undersized:
+            logger.warning(f'The design of stage one is not sufficient for the operation at full resolution. The '
+                           f'excess of these Buses compensates the lacking capacity of the fixed investments (by '
+                           f'Bus): {undersized}')
+
+        for stage in (self.stage_one, self.stage_two):
+            for key, value in stage.durations.items():
+                self.durations[key] = self.durations.get(key, 0.0) + value
+
+    def design(self) -> Dict[str, Numeric]:
+        """ Returns the results of the investment Variables of stage one by their label """
+        if self.stage_one is None:
+            raise Exception(f'Stage one must be solved with .do_modeling_and_solve() first')
+        design = {}
+        for model in self.stage_one.system_model.sub_models:
+            if isinstance(model, InvestmentModel):
+                design[model.size.label] = model.size.result
+                if self.fix_is_invested and model.is_invested is not None:
+                    design[model.is_invested.label] = model.is_invested.result
+        return design
+
+    def undersized_elements(self) -> Dict[str, List[str]]:
+        """
+        Returns the Elements with a fixed investment (by label_full), which are connected to a Bus with excess in
+        stage two, by the label of the Bus. The excess compensates the operation, which the design can't cover.
+        """
+        invested_elements = {model.element.label_full: model.element for model in self.stage_one.system_model.sub_models
+                             if isinstance(model, InvestmentModel)}
+        undersized = {}
+        for main_results in self._stage_two_main_results():
+            for bus in main_results['buses with excess']:
+                for label, element in invested_elements.items():
+                    flows = [element] if isinstance(element, Flow) else element.inputs + element.outputs
+                    if any(flow.bus.label == bus for flow in flows) and label not in undersized.get(bus, []):
+                        undersized.setdefault(bus, []).append(label)
+        return undersized
+
+    def _stage_two_models(self) -> List[SystemModel]:
+        """ The SystemModels of stage two, which were created so far (one per segment if segmented) """
+        if self.stage_two is None:
+            return []
+        if isinstance(self.stage_two, SegmentedCalculation):
+            return [calculation.system_model for calculation in self.stage_two.sub_calculations]
+        return [self.stage_two.system_model] if self.stage_two.system_model is not None else []
+
+    def _stage_two_main_results(self) -> List[Dict[str, Union[Skalar, Dict]]]:
+        """ The main results of stage two (one per segment if segmented) """
+        if isinstance(self.stage_two, SegmentedCalculation):
+            return self.stage_two.main_results_of_segments
+        return [self.stage_two.system_model.main_results]
+
+    def _fixed_investments(self) -> Dict[str, Skalar]:
+        """ The fixed sizes of stage two by the label_full of their Element """
+        return {model.element.label_full: float(model.size.result) for model in self.stage_one.system_model.sub_models
+                if isinstance(model, InvestmentModel)}
+
+    def results(self, *args, **kwargs):
+        """ The results of stage two. Arguments are passed on (see SegmentedCalculation.results()) """
+        return self.stage_two.results(*args, **kwargs)
+
+    @property
+    def objectives(self) -> Dict[str, Union[Skalar, List[Skalar]]]:
+        """ The objective value of each stage. For a segmented stage two, the objective value of each segment """
+        if isinstance(self.stage_two, SegmentedCalculation):
+            objective_of_stage_two = [main_results['Objective']
+                                      for main_results in self.stage_two.main_results_of_segments]
+        else:
+            objective_of_stage_two = self.stage_two.system_model.result_of_objective
+        return {'Stage one': self.stage_one.system_model.result_of_objective, 'Stage two': objective_of_stage_two}
+
+    @property
+    def infos(self):
+        return {**super().infos,
+                'Stages': {
+                    'Stage one': {**self.stage_one.infos, 'Objective': self.objectives['Stage one']},
+                    'Stage two': {**self.stage_two.infos, 'Objective': self.objectives['Stage two']}},
+                'Design': self.fixed_values}
+
+
+class BendersCalculation(Calculation):
+    """
+    Benders decomposition for investment planning: A master problem holds the investment decisions (the Variables of
+    all InvestmentModels) and the invest shares of the Effects. The operation is split into subproblems, by time window
+    (segment_length) and/or by scenario (scenarios). For each design of the master problem, the subproblems are solved
+    in parallel processes. Their objective values and the duals (reduced costs) of the fixed investment decisions give
+    optimality cuts for the master problem. The lower bound is the bound of the master problem, the upper bound the
+    best design evaluated so far. Iterates until their relative gap is below gap.
+
+    Take care:
+    The subproblems are solved as LP (binaries of the operation like On/Off are relaxed), as the cuts need duals.
+    The bounds and the gap refer to this relaxation. The operation of the final design is solved with binaries (see
+    do_modeling_and_solve()).
+    The time windows are modeled independently, like the segments of a SegmentedCalculation without transferred
+    start values: Storages start each window with their initial_charge_state, and limits over the total time (like
+    flow_hours_total_max or the total of Effects) apply per window.
+    Every subproblem must be feasible for every design. Buses with excess ensure this.
+    """
+    def __init__(self, name, flow_system: FlowSystem,
+                 segment_length: Optional[int] = None,
+                 scenarios: Optional[Dict[str, FlowSystem]] = None,
+                 weights: Optional[Dict[str, float]] = None,
+                 gap: float = 1e-4,
+                 max_iterations: int = 100,
+                 max_workers: Optional[int] = None,
+                 time_indices: Optional[Union[range, List[int]]] = None):
+        """
+        Parameters
+        ----------
+        name : str
+            name of calculation
+        flow_system : FlowSystem
+            flow_system which should be calculated. Its InvestParameters define the master problem.
+        segment_length : int or None
+            If given, the operation is split into time windows of this number of time_steps.
+        scenarios : dict or None
+            Variants of flow_system (e.g. with other prices or weather years) by name, with the same InvestParameters.
+            If given, the operation of each scenario is a subproblem (instead of the operation of flow_system).
+        weights : dict or None
+            The weight (e.g. probability) of each scenario in the objective. Defaults to 1 for every scenario.
+        gap : float
+            The relative gap between the lower and upper bound, at which the iteration stops.
+        max_iterations : int
+            The maximum number of iterations.
+        max_workers : int or None
+            The number of processes solving the subproblems. Defaults to the number of CPUs.
+        time_indices : List[int] or None
+            list with indices, which should be used for calculation. If None, then all timesteps are used.
+        """
+        super().__init__(name, flow_system, 'highspy', time_indices)
+        self.segment_length = segment_length
+        self.scenarios = scenarios
+        self.weights = weights or {}
+        self.gap = gap
+        self.max_iterations = max_iterations
+        self.max_workers = max_workers
+
+        self.design: Dict[str, Numeric] = {}  # The investment decisions of the best design by label
+        self.iterations: List[Dict[str, float]] = []  # Lower bound, upper bound and gap of each iteration
+        self.sub_calculations: Dict[str, FullCalculation] = {}  # The operation of the final design per subproblem
+
+    def do_modeling_and_solve(self, solver: Solver, solve_operation: bool = True):
+        """
+        Parameters
+        ----------
+        solver : HighsSolver
+            The solver of the master problem (and of the operation of the final design).
+        solve_operation : bool
+            If True, the operation of the final design is solved for every subproblem (with binaries) as
+            FullCalculation. See .sub_calculations and .results().
+        """
+        if not isinstance(solver, HighsSolver):
+            raise NotImplementedError(f'Only the HighsSolver is implemented for the {self.__class__.__name__}')
+        logger.info(f'{"":#^80}')
+        logger.info(f'{" Benders Decomposition ":#^80}')
+        self._define_path_names(False)
+        solver.logfile_name = self._paths['log']
+
+        t_start = timeit.default_timer()
+        subproblems = {name: self._model_subproblem(name, *definition)
+                       for name, definition in self._subproblem_definitions().items()}
+        decision_labels = [variable.label for variable in next(iter(subproblems.values()))['decision_variables']]
+        if not decision_labels:
+            raise ValueError(f'The {self.__class__.__name__} needs at least one InvestParameters')
+        for name, subproblem in subproblems.items():
+            if sorted(variable.label for variable in subproblem['decision_variables']) != sorted(decision_labels):
+                raise ValueError(f'The InvestParameters of subproblem "{name}" differ from the first subproblem')
+        master = self._create_master_problem(subproblems, decision_labels)
+        logger.info(f'Created {len(subproblems)} subproblems and a master problem with {len(decision_labels)} '
+                    f'investment Variables')
+        self.durations['modeling'] += round(timeit.default_timer() - t_start, 2)
+
+        t_start = timeit.default_timer()
+        workers = _BendersWorkers(subproblems, decision_labels, self.max_workers)
+        try:
+            best_design = self._iterate(solver, master, workers, subproblems)
+        finally:
+            workers.stop()
+        self.design = {}
+        for variable in master['decision_variables']:
+            values = best_design[master['design_slices'][variable.label]]
+            self.design[variable.label] = values.item() if variable.length == 1 else values
+        self.durations['solving'] += round(timeit.default_timer() - t_start, 2)
+
+        if solve_operation:
+            for name, (flow_system, time_indices, _) in self._subproblem_definitions().items():
+                calculation = FullCalculation(f'{self.name}_{name}', flow_system, 'highspy', time_indices)
+                calculation.fixed_values = self.design
+                calculation.do_modeling()
+                calculation.solve(solver)
+                self.sub_calculations[name] = calculation
+                for key, value in calculation.durations.items():
+                    self.durations[key] += value
+
+    def _subproblem_definitions(self) -> Dict[str, Tuple[FlowSystem, List[int], float]]:
+        """ The FlowSystem, time_indices and weight of each subproblem by its name """
+        definitions = {}
+        for scenario, flow_system in (self.scenarios or {'base': self.flow_system}).items():
+            indices = list(self.time_indices if self.time_indices is not None else range(len(flow_system.time_series)))
+            length = self.segment_length or len(indices)
+            for start in range(0, len(indices), length):
+                name = scenario if self.segment_length is None else f'{scenario}_{start // length + 1}'
+                definitions[name] = (flow_system, indices[start:start + length], self.weights.get(scenario, 1.0))
+        return definitions
+
+    def _model_subproblem(self, name: str, flow_system: FlowSystem, time_indices: List[int],
+                          weight: float) -> Dict[str, Any]:
+        """ Models the operation of a subproblem and compiles it to a MatrixModel (without translating it) """
+        flow_system.transform_data()
+        for time_series in flow_system.all_time_series:
+            time_series.activate_indices(time_indices)
+        system_model = SystemModel(f'{self.name}_{name}', 'highspy', flow_system, time_indices)
+        system_model.do_modeling()
+        return {'matrix_model': system_model.compile(),
+                'weight': weight,
+                'decision_variables': [variable for model in system_model.sub_models
+                                       if isinstance(model, InvestmentModel) for variable in model.variables.values()],
+                'invest_variables': [variable for model in system_model.sub_models if isinstance(model, EffectModel)
+                                     for variable in model.invest.all_variables.values()]}
+
+    @staticmethod
+    def _create_master_problem(subproblems: Dict[str, Dict[str, Any]], decision_labels: List[str]) -> Dict[str, Any]:
+        """
+        Creates the master problem from the first subproblem: Its columns are the investment decisions and the invest
+        shares, its rows are all rows of the first subproblem with only these columns. One column per subproblem
+        (its operation) is added, fixed to 0 until the first cuts are added.
+        """
+        first = next(iter(subproblems.values()))
+        m: MatrixModel = first['matrix_model']
+        labels = set(decision_labels) | {variable.label for variable in first['invest_variables']}
+        variables = [variable for variable in m.variables if variable.label in labels]
+        columns = np.concatenate([np.arange(m.nr_of_columns)[m.column_slice(variable)] for variable in variables])
+        position = np.full(m.nr_of_columns, -1)
+        position[columns] = np.arange(len(columns))
+
+        nonzeros_per_row = np.diff(m.matrix_start)
+        row_of_entry = np.repeat(np.arange(m.nr_of_rows), nonzeros_per_row)
+        rows = nonzeros_per_row > 0
+        rows[row_of_entry[position[m.matrix_index] < 0]] = False
+        entries = rows[row_of_entry]
+
+        nr_of_subproblems = len(subproblems)
+        master = {'costs': np.concatenate([m.objective_vector[columns],
+                                           [subproblem['weight'] for subproblem in subproblems.values()]]),
+                  'lower': np.concatenate([m.lower_bound[columns], np.zeros(nr_of_subproblems)]),
+                  'upper': np.concatenate([m.upper_bound[columns], np.zeros(nr_of_subproblems)]),
+                  'integrality': np.concatenate([m.integrality[columns], np.zeros(nr_of_subproblems, dtype=np.int8)]),
+                  'operation_columns': np.arange(len(columns), len(columns) + nr_of_subproblems),
+                  'model': HighspyModel()}
+        import highspy
+        master['model'].highs.passModel(
+            len(master['costs']), int(np.sum(rows)), int(np.sum(entries)),
+            int(highspy.MatrixFormat.kRowwise), int(highspy.ObjSense.kMinimize), 0.,
+            master['costs'], master['lower'], master['upper'], m.row_lower[rows], m.row_upper[rows],
+            np.concatenate([[0], np.cumsum(nonzeros_per_row[rows])]).astype(np.int32),
+            position[m.matrix_index[entries]].astype(np.int32), m.matrix_value[entries],
+            master['integrality'].astype(np.int32))
+
+        # The design is passed to the subproblems in the order of decision_labels
+        variables_by_label = {variable.label: variable for variable in variables}
+        master['decision_variables'] = [variables_by_label[label] for label in decision_labels]
+        master['decision_columns'] = np.concatenate([position[np.arange(m.nr_of_columns)[m.column_slice(variable)]]
+                                                     for variable in master['decision_variables']])
+        master['design_slices'], start = {}, 0
+        for variable in master['decision_variables']:
+            master['design_slices'][variable.label] = slice(start, start + variable.length)
+            start += variable.length
+        return master
+
+    def _iterate(self, solver: Solver, master: Dict[str, Any], workers: '_BendersWorkers',
+                 subproblems: Dict[str, Dict[str, Any]]) -> np.ndarray:
+        """ Solves the master problem and the subproblems alternately. Returns the best design """
+        highs, decision_columns = master['model'].highs, master['decision_columns']
+        operation_columns = master['operation_columns']
+        lower_bound, upper_bound, best_design = -np.inf, np.inf, None
+        self.iterations = []
+        for iteration in range(1, self.max_iterations + 1):
+            solver.solve(master['model'])
+            if solver.solution is None:
+                raise Exception(f'The master problem could not be solved: "{solver.termination_message}"')
+            design = solver.solution[decision_columns]
+            design = np.clip(np.where(master['integrality'][decision_columns] == 1, np.round(design), design),
+                             master['lower'][decision_columns], master['upper'][decision_columns])
+            if iteration > 1:  # The operation is fixed to 0 in the first iteration, so the bound is not valid
+                lower_bound = max(lower_bound, solver.best_bound)
+
+            results = workers.solve(design)
+            invest_columns = slice(0, operation_columns[0])
+            total = float(master['costs'][invest_columns] @ solver.solution[invest_columns]) + sum(
+                subproblem['weight'] * results[name]['objective'] for name, subproblem in subproblems.items())
+            if total < upper_bound:
+                upper_bound, best_design = total, design
+
+            for operation_column, name in zip(operation_columns, subproblems):
+                # Optimality cut: operation >= objective + duals * (decisions - design)
+                duals = np.where(np.abs(results[name]['duals']) > 1e-12, results[name]['duals'], 0.)
+                index = np.concatenate([[operation_column], decision_columns]).astype(np.int32)
+                highs.addRow(results[name]['objective'] - float(duals @ design), np.inf, len(index), index,
+                             np.concatenate([[1.], -duals]))
+            if iteration == 1:
+                highs.changeColsBounds(len(operation_columns), operation_columns.astype(np.int32),
+                                       np.full(len(operation_columns), -np.inf),
+                                       np.full(len(operation_columns), np.inf))
+
+            gap = (upper_bound - lower_bound) / max(abs(upper_bound), 1e-9)
+            self.iterations.append({'lower bound': lower_bound, 'upper bound': upper_bound, 'gap': gap})
+            logger.info(f'Iteration {iteration:>3}: lower bound {lower_bound:>14.2f}, '
+                        f'upper bound {upper_bound:>14.2f}, gap {gap:>8.2%}')
+            if gap <= self.gap:
+                break
+        else:
+            logger.warning(f'The {self.__class__.__name__} stopped after {self.max_iterations} iterations with a gap '
+                           f'of {self.iterations[-1]["gap"]:.2%}')
+        return best_design
+
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        """ The results of the operation of the final design per subproblem """
+        return {name: calculation.results() for name, calculation in self.sub_calculations.items()}
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        """ The last lower and upper bound of the objective (with relaxed binaries of the operation) """
+        return self.iterations[-1]['lower bound'], self.iterations[-1]['upper bound']
+
+    @property
+    def infos(self):
+        return {**super().infos,
+                'Iterations': self.iterations,
+                'Design': utils.convert_to_native_types(self.design),
+                'Subproblems': {name: calculation.system_model.result_of_objective
+                                for name, calculation in self.sub_calculations.items()}}
+
+
+class BatchCalculation:
+    """
+    Runs a Calculation for each of several variants (scenarios) of a FlowSystem, e.g. for price scenarios, weather
+    years or sizes. Each scenario is calculated in a separate process, with at most max_workers at once.
+    The FlowSystem of each scenario is created in its process by flow_system_factory(**overrides).
+    The main results and selected result arrays of all scenarios are collected into one table.
+    """
+    calculation_types = {'full': FullCalculation, 'aggregated': AggregatedCalculation,
+                         'segmented': SegmentedCalculation, 'two_stage': TwoStageCalculation}
+
+    def __init__(self, name: str,
+                 flow_system_factory: Callable[..., FlowSystem],
+                 scenarios: Union[Dict[str, Dict[str, Any]], List[Dict[str, Any]]],
+                 calculation_type: Literal['full', 'aggregated', 'segmented', 'two_stage'] = 'full',
+                 calculation_kwargs: Optional[Dict[str, Any]] = None):
+        """
+        Parameters
+        ----------
+        name : str
+            name of the batch. The calculations are named '<name>_<scenario>'.
+        flow_system_factory : Callable
+            Creates the FlowSystem of a scenario from its overrides (as keyword arguments). Must be picklable,
+            i.e. a function defined on module level.
+        scenarios : dict or list
+            The overrides (keyword arguments of flow_system_factory) of each scenario by the name of the scenario.
+            If a list is given, the scenarios are named 'Scenario_1', 'Scenario_2', ...
+        calculation_type : 'full', 'aggregated', 'segmented', 'two_stage'
+            The Calculation to use for each scenario (FullCalculation, AggregatedCalculation, SegmentedCalculation or
+            TwoStageCalculation).
+        calculation_kwargs : dict, optional
+            Further arguments of the Calculation, like modeling_language, aggregation_parameters or segment_length.
+            Must be picklable and must not contain Elements, as each scenario creates its own FlowSystem.
+        """
+        if calculation_type not in self.calculation_types:
+            raise ValueError(f'Unknown calculation_type "{calculation_type}". '
+                             f'Choose from {list(self.calculation_types)}')
+        if not isinstance(scenarios, dict):
+            scenarios = {f'Scenario_{i + 1}': overrides for i, overrides in enumerate(scenarios)}
+        self.name = name
+        self.flow_system_factory = flow_system_factory
+        self.scenarios = scenarios
+        self.calculation_type = calculation_type
+        self.calculation_kwargs = calculation_kwargs or {}
+
+        self.results: Dict[str, Dict[str, Any]] = {}  # Result of each scenario, see _calculate_scenario()
+        self.duration: Optional[float] = None
+
+    def run(self, solver: Solver,
+            max_workers: Optional[int] = None,
+            threads_per_worker: Optional[int] = 1,
+            timeout: Optional[float] = None,
+            result_arrays: Optional[List[str]] = None) -> 'pd.DataFrame':
+        """
+        Calculates all scenarios and returns the table of their results (see .table()).
+
+        Parameters
+        ----------
+        solver : Solver
+            The solver to use. Every scenario gets a copy. It must be picklable (e.g. no lambda as progress_callback).
+        max_workers : int, optional
+            The number of scenarios calculated at once. Defaults to the number of CPUs.
+        threads_per_worker : int, optional
+            The threads of the solver in each process (if the solver has the setting 'threads'). The workers should
+            not use more threads than available in total. If None, the setting of the solver is kept.
+        timeout : float, optional
+            The time limit in seconds per scenario (modeling and solving). Scenarios exceeding it are terminated and
+            get the status 'timeout'. For a graceful stop with the best solution found, use the time limit of
+            the solver instead.
+        result_arrays : List[str], optional
+            Labels of the Variables, whose results are collected for every scenario (like 'Boiler__Q_th_flow_rate').
+        """
+        import multiprocessing
+        import multiprocessing.connection
+        import os
+        max_workers = max_workers or os.cpu_count() or 1
+        if threads_per_worker is not None:
+            if hasattr(solver, 'threads'):
+                solver = copy.copy(solver)
+                solver.threads = threads_per_worker
+            else:
+                logger.warning(f'The number of threads of {solver.__class__.__name__} can not be set')
+        context = multiprocessing.get_context('spawn')  # Forking a process with running solver threads is unsafe
+
+        logger.info(f'{"":#^80}')
+        logger.info(f'{f" Batch Calculation: {len(self.scenarios)} scenarios ":#^80}')
+        t_start = timeit.default_timer()
+        pending, running, self.results = list(self.scenarios), {}, {}
+        while pending or running:
+            while pending and len(running) < max_workers:
+                scenario = pending.pop(0)
+                job = {'name': f'{self.name}_{scenario}', 'factory': self.flow_system_factory,
+                       'overrides': self.scenarios[scenario], 'calculation_type': self.calculation_type,
+                       'calculation_kwargs': self.calculation_kwargs, 'solver': solver,
+                       'result_arrays': result_arrays or []}
+                # Each process gets its own pipe, so terminating a process while it sends can't affect the others
+                connection, child_connection = context.Pipe(duplex=False)
+                process = context.Process(target=_calculate_scenario_in_process, args=(job, child_connection),
+                                          daemon=True)
+                process.start()
+                child_connection.close()
+                running[scenario] = (process, connection, timeit.default_timer())
+
+            multiprocessing.connection.wait([connection for _, connection, _ in running.values()] +
+                                            [process.sentinel for process, _, _ in running.values()], timeout=0.1)
+            for scenario, (process, connection, t_start_of_scenario) in list(running.items()):
+                exited = process.exitcode is not None  # Checked first, as the result is sent before the process exits
+                if connection.poll():
+                    try:
+                        result = connection.recv()
+                    except (EOFError, OSError) as e:
+                        result = {'status': 'failed', 'error': f'Receiving the result failed: {e!r}'}
+                elif exited:
+                    result = {'status': 'failed', 'error': f'Process failed with exit code {process.exitcode}'}
+                elif timeout is not None and timeit.default_timer() - t_start_of_scenario > timeout:
+                    process.terminate()
+                    result = {'status': 'timeout', 'error': f'Exceeded {timeout} seconds'}
+                else:
+                    continue
+                running.pop(scenario, None)
+                connection.close()
+                self._finish(scenario, result, process)
+
+        self.duration = round(timeit.default_timer() - t_start, 2)
+        logger.info(f'Batch Calculation "{self.name}" took {self.duration} seconds: '
+                    f'{sum(result["status"] == "solved" for result in self.results.values())} of '
+                    f'{len(self.scenarios)} scenarios solved')
+        return self.table()
+
+    def _finish(self, scenario: str, result: Dict[str, Any], process) -> None:
+        process.join()
+        self.results[scenario] = result
+        if result['status'] == 'solved':
+            logger.info(f'Scenario "{scenario}" solved after {result["time"]} seconds')
+        else:
+            logger.warning(f'Scenario "{scenario}" {result["status"]}: {result["error"]}')
+            if 'traceback' in result:
+                logger.debug(result['traceback'])
+
+    def table(self) -> 'pd.DataFrame':
+        """
+        The results of all scenarios, one row per scenario (in the order of the scenarios): The status ('solved',
+        'failed' or 'timeout'), the error message, the time in seconds, the termination message of the solver,
+        the main results (flattened, like 'Effects|costs [€]|sum') and the result arrays (one array per cell).
+        """
+        import pandas as pd
+        rows = {}
+        for scenario in self.scenarios:
+            result = self.results.get(scenario, {'status': 'not calculated'})
+            rows[scenario] = {'status': result['status'], 'error': result.get('error'), 'time': result.get('time'),
+                              'termination message': result.get('termination_message'),
+                              **_flatten(result.get('main_results', {})),
+                              **result.get('arrays', {})}
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+    def result_array(self, label: str) -> 'pd.DataFrame':
+        """ The results of the Variable with label (one of the result_arrays), one column per solved scenario """
+        import pandas as pd
+        return pd.DataFrame({scenario: pd.Series(self.results[scenario]['arrays'][label]) for scenario in self.scenarios
+                             if self.results.get(scenario, {}).get('status') == 'solved'})
+
+
+class NrOfPeriodsSelection:
+    """
+    Helps to choose AggregationParameters.nr_of_periods. The TimeSeries of the FlowSystem are clustered for every
+    candidate number of typical periods in parallel processes. Reported are the errors of the aggregation per
+    TimeSeries (see Aggregation.accuracy()) and the number of typical time steps, which is the size of the model with
+    typical_periods_only. Optionally, the AggregatedCalculation of every candidate is solved too (with the same
+    clustering), to compare its objective to the one of the most detailed candidate, and its solve time.
+    A failing candidate is reported in the table, the others are kept.
+    """
+    def __init__(self, name: str,
+                 flow_system: FlowSystem,
+                 aggregation_parameters: AggregationParameters,
+                 candidates: List[int],
+                 modeling_language: Literal["pyomo", "highspy", "cvxpy"] = "pyomo",
+                 time_indices: Optional[Union[range, List[int]]] = None):
+        """
+        Parameters
+        ----------
+        name : str
+            name of the selection. The calculations are named '<name>_<nr_of_periods>'.
+        flow_system : FlowSystem
+            flow_system which should be calculated. It is passed to other processes, so it must be picklable
+            (i.e. not be modeled yet).
+        aggregation_parameters : AggregationParameters
+            Parameters for aggregation. nr_of_periods is replaced by the candidates.
+        candidates : List[int]
+            The numbers of typical periods to compare.
+        modeling_language : 'pyomo', 'highspy', 'cvxpy' (not implemeted yet)
+            choose optimization modeling language
+        time_indices : List[int] or None
+            list with indices, which should be used for calculation. If None, then all timesteps are used.
+        """
+        self.name = name
+        self.flow_system = flow_system
+        self.aggregation_parameters = aggregation_parameters
+        self.candidates = sorted(candidates)
+        self.modeling_language = modeling_language
+        self.time_indices = time_indices
+
+        self.errors: Dict[int, 'pd.DataFrame'] = {}  # Errors per TimeSeries of each candidate
+        self.results: Dict[int, Dict[str, Any]] = {}
+        self.duration: Optional[float] = None
+
+    def run(self, solver: Optional[Solver] = None,
+            max_workers: Optional[int] = None,
+            threads_per_worker: Optional[int] = 1,
+            cache: Optional[DiskCache] = None) -> 'pd.DataFrame':
+        """
+        Clusters (and solves) all candidates and returns the table of their results (see .table()).
+
+        Parameters
+        ----------
+        solver : Solver, optional
+            If given, the AggregatedCalculation of every candidate is solved with a copy of it.
+        max_workers : int, optional
+            The number of processes at once. Defaults to the number of CPUs.
+        threads_per_worker : int, optional
+            The threads of the solver in each process (if the solver has the setting 'threads').
+            If None, the setting of the solver is kept.
+        cache : DiskCache, optional
+            Cache for the clusterings (see Aggregation.cluster()). Later AggregatedCalculations can reuse them.
+        """
+        import multiprocessing
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        t_start = timeit.default_timer()
+        # Validates the aggregation_parameters for the FlowSystem, before the candidates are passed to the processes
+        AggregatedCalculation(self.name, self.flow_system, self.aggregation_parameters,
+                              time_indices=self.time_indices)._create_aggregation()
+        if solver is not None and threads_per_worker is not None:
+            if hasattr(solver, 'threads'):
+                solver = copy.copy(solver)
+                solver.threads = threads_per_worker
+            else:
+                logger.warning(f'The number of threads of {solver.__class__.__name__} can not be set')
+
+        logger.info(f'{"":#^80}')
+        logger.info(f'{f" Selection of the number of periods: {self.candidates} ":#^80}')
+        context = multiprocessing.get_context('spawn')  # Forking a process with running solver threads is unsafe
+        self.errors, self.results = {}, {}
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, mp_context=context) as executor:
+            futures = {}
+            for nr_of_periods in self.candidates:
+                aggregation_parameters = copy.copy(self.aggregation_parameters)
+                aggregation_parameters.nr_of_periods = nr_of_periods
+                futures[nr_of_periods] = executor.submit(
+                    _calculate_nr_of_periods, f'{self.name}_{nr_of_periods}', self.flow_system,
+                    aggregation_parameters, self.modeling_language, self.time_indices, solver, cache)
+            for nr_of_periods, future in futures.items():
+                try:
+                    self.errors[nr_of_periods], self.results[nr_of_periods] = future.result()
+                except Exception as e:  # Including a crashed process. The other candidates are kept
+                    self.results[nr_of_periods] = {'status': 'failed', 'error': f'{e.__class__.__name__}: {e}'}
+                    logger.warning(f'Candidate {nr_of_periods} failed: {self.results[nr_of_periods]["error"]}')
+
+        self.duration = round(timeit.default_timer() - t_start, 2)
+        logger.info(f'Selection of the number of periods took {self.duration} seconds')
+        return self.table()
+
+    def table(self) -> 'pd.DataFrame':
+        """
+        One row per candidate: The status ('clustered', 'solved' or 'failed') and error message, the number of typical
+        time steps, the mean and max errors over all TimeSeries and, if solved, the objective, its relative deviation
+        from the most detailed solved candidate, the time to model and solve and the number of single variables and
+        constraints.
+        """
+        import pandas as pd
+        solved = [candidate for candidate in self.candidates if 'objective' in self.results.get(candidate, {})]
+        reference = self.results[solved[-1]]['objective'] if solved else None
+        rows = {}
+        for nr_of_periods in self.candidates:
+            result = self.results.get(nr_of_periods, {'status': 'not calculated'})
+            rows[nr_of_periods] = {'status': result['status'], 'error': result.get('error')}
+            if nr_of_periods in self.errors:
+                errors = self.errors[nr_of_periods]
+                rows[nr_of_periods].update({
+                    'typical time steps': result['typical time steps'],
+                    **{f'{error} ({statistic})': getattr(errors[error], statistic)()
+                       for error in errors.columns for statistic in ('mean', 'max')}})
+            if 'objective' in result:
+                rows[nr_of_periods].update({
+                    'objective': result['objective'],
+                    'objective deviation': (result['objective'] - reference) / abs(reference) if reference else np.nan,
+                    **{key: value for key, value in result.items()
+                       if key not in ('objective', 'status', 'error', 'typical time steps')}})
+        table = pd.DataFrame.from_dict(rows, orient='index')
+        table.index.name = 'nr_of_periods'
+        return table
+
+    def recommend(self, tolerance: float = 0.01, criterion: Optional[str] = None) -> int:
+        """
+        Returns the smallest candidate whose criterion (a column of .table()) is within the tolerance (by its
+        absolute value). By default, the criterion is the 'objective deviation' if solved, else 'RMSE (max)'.
+        If no candidate meets the tolerance, the most detailed one is returned. Failed candidates are skipped.
+        """
+        table = self.table()
+        table = table[table['status'] != 'failed']
+        if table.empty:
+            raise Exception(f'All candidates failed. See the column "error" of .table()')
+        if criterion is None:
+            criterion = 'objective deviation' if 'objective deviation' in table.columns else 'RMSE (max)'
+        within_tolerance = table.index[np.abs(table[criterion].to_numpy()) <= tolerance]
+        if len(within_tolerance) == 0:
+            logger.warning(f'No candidate has a {criterion} within {tolerance}. The most detailed one is recommended')
+            return int(table.index[-1])
+        return int(within_tolerance[0])
+
+
+def _calculate_nr_of_periods(name: str, flow_system: FlowSystem, aggregation_parameters: AggregationParameters,
+                             modeling_language: str, time_indices: Optional[Union[range, List[int]]],
+                             solver: Optional[Solver], cache: Optional[DiskCache]
+                             ) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+    """
+    Clusters (e.g. in another process) and, if a solver is given, models and solves the AggregatedCalculation with this
+    clustering. Returns the accuracy of the clustering and the number of typical time steps, objective and size.
+    """
+    t_start = timeit.default_timer()
+    calculation = AggregatedCalculation(name, flow_system, aggregation_parameters, modeling_language=modeling_language,
+                                        time_indices=time_indices)
+    if solver is None:
+        aggregation = calculation._create_aggregation()
+        aggregation.cluster(cache)
+    else:
+        calculation.do_modeling(cache)
+        calculation.solve(solver)
+        aggregation = calculation.aggregation
+    result = {'status': 'clustered' if solver is None else 'solved',
+              'typical time steps': len(aggregation.occurrences) * aggregation.period_length}
+    if solver is not None:
+        system_model = calculation.system_model
+        result.update({'objective': system_model.result_of_objective,
+                       'time': round(timeit.default_timer() - t_start, 2),
+                       'single variables': system_model.nr_of_single_variables,
+                       'single constraints': system_model.nr_of_single_equations +
+                                             system_model.nr_of_single_inequations})
+    return aggregation.accuracy(), result
+
+
+def _calculate_scenario_in_process(job: Dict[str, Any], connection) -> None:
+    """ Calculates a scenario of a BatchCalculation and sends its result through connection """
+    import traceback
+    t_start = timeit.default_timer()
+    try:
+        result = _calculate_scenario(**job)
+    except Exception as e:
+        result = {'status': 'failed', 'error': f'{e.__class__.__name__}: {e}', 'traceback': traceback.format_exc()}
+    result['time'] = round(timeit.default_timer() - t_start, 2)
+    connection.send(result)
+    connection.close()
+
+
+def _calculate_scenario(name: str, factory: Callable[..., FlowSystem], overrides: Dict[str, Any],
+                        calculation_type: str, calculation_kwargs: Dict[str, Any], solver: Solver,
+                        result_arrays: List[str]) -> Dict[str, Any]:
+    """ Calculates a scenario of a BatchCalculation and returns its main results and result_arrays """
+    flow_system = factory(**overrides)
+    calculation = BatchCalculation.calculation_types[calculation_type](name, flow_system, **calculation_kwargs)
+    if isinstance(calculation, (SegmentedCalculation, TwoStageCalculation)):
+        calculation.do_modeling_and_solve(solver, save_results=False)
+    else:
+        calculation.do_modeling()
+        calculation.solve(solver)
+
+    if isinstance(calculation, TwoStageCalculation):
+        calculation = calculation.stage_two
+    if isinstance(calculation, SegmentedCalculation):
+        # Scalar results of the segments can't be combined, as they include the overlap
+        combined = calculation.results(combined_arrays=True)['Effects']
+        main_results = {'Effects': {
+            f'{effect.label} [{effect.unit}]': {
+                'operation': float(np.sum(combined[effect.label]['operation']['operation_sum_TS']))}
+            for effect in flow_system.effect_collection.effects}}
+        arrays = _combine_nested_arrays(
+            *[{label: np.asarray(solution[label]) for label in result_arrays}
+              for solution in calculation.solutions_of_segments], length_per_array=calculation.segment_length)
+        termination_message = calculation.sub_calculations[-1].system_model.solver.termination_message
+    else:
+        main_results = calculation.system_model.main_results
+        arrays = {label: calculation.system_model.all_variables[label].result for label in result_arrays}
+        termination_message = calculation.system_model.solver.termination_message
+    return {'status': 'solved', 'main_results': utils.convert_to_native_types(main_results), 'arrays': arrays,
+            'termination_message': termination_message}
+
+
+def _flatten(d: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    """ Flattens a nested dict. Keys are joined by '|', lists are joined to a string """
+    flat = {}
+    for key, value in d.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}|'))
+        elif isinstance(value, list):
+            flat[f'{prefix}{key}'] = ', '.join(str(item) for item in value)
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+class _BendersWorkers:
+    """
+    Processes solving the subproblems of a BendersCalculation as LP. Each process keeps a HiGHS instance per
+    subproblem, so only the bounds of the investment decisions change between iterations (and the last basis is reused).
+    """
+    def __init__(self, subproblems: Dict[str, Dict[str, Any]], decision_labels: List[str],
+                 max_workers: Optional[int] = None):
+        import multiprocessing
+        import os
+        context = multiprocessing.get_context('spawn')  # Forking a process with running HiGHS threads is unsafe
+        nr_of_workers = min(max_workers or os.cpu_count() or 1, len(subproblems))
+        jobs = [{} for _ in range(nr_of_workers)]
+        for i, (name, subproblem) in enumerate(subproblems.items()):
+            jobs[i % nr_of_workers][name] = self._create_job(subproblem, decision_labels)
+        self.connections, self.processes = [], []
+        for jobs_of_worker in jobs:
+            connection, child_connection = context.Pipe()
+            process = context.Process(target=_solve_benders_subproblems, args=(jobs_of_worker, child_connection),
+                                      daemon=True)
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    @staticmethod
+    def _create_job(subproblem: Dict[str, Any], decision_labels: List[str]) -> Dict[str, Any]:
+        """ The LP of the subproblem: Binaries are relaxed, the investment and invest shares have no costs """
+        m: MatrixModel = subproblem['matrix_model']
+        variables = {variable.label: variable for variable in subproblem['decision_variables']}
+        costs = m.objective_vector.copy()
+        for variable in subproblem['decision_variables'] + subproblem['invest_variables']:
+            costs[m.column_slice(variable)] = 0.
+        return {'costs': costs, 'lower': m.lower_bound, 'upper': m.upper_bound, 'row_lower': m.row_lower,
+                'row_upper': m.row_upper, 'matrix_start': m.matrix_start, 'matrix_index': m.matrix_index,
+                'matrix_value': m.matrix_value,
+                'decision_columns': np.concatenate([np.arange(m.nr_of_columns)[m.column_slice(variables[label])]
+                                                    for label in decision_labels])}
+
+    def solve(self, design: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        """ Solves all subproblems with the investment decisions fixed to design. Returns objective and duals """
+        for connection in self.connections:
+            connection.send(design)
+        results = {}
+        for connection in self.connections:
+            status, result = connection.recv()
+            if status == 'error':
+                raise Exception(f'Solving the subproblems failed: {result}')
+            results.update(result)
+        for name, result in results.items():
+            if result['objective'] is None:
+                raise Exception(f'Subproblem "{name}" could not be solved for the design: "{result["status"]}". '
+                                f'Every subproblem must be feasible for every design (e.g. by buses with excess)')
+        return results
+
+    def stop(self):
+        for connection, process in zip(self.connections, self.processes):
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+def _solve_benders_subproblems(jobs: Dict[str, Dict[str, Any]], connection) -> None:
+    """ Solves the subproblems of a BendersCalculation for each design received. Runs in a separate process """
+    import highspy
+    try:
+        instances = {}
+        for name, job in jobs.items():
+            highs = instances[name] = highspy.Highs()
+            highs.setOptionValue('output_flag', False)
+            highs.setOptionValue('threads', 1)
+            highs.passModel(len(job['costs']), len(job['row_lower']), len(job['matrix_value']),
+                            int(highspy.MatrixFormat.kRowwise), int(highspy.ObjSense.kMinimize), 0.,
+                            job['costs'], job['lower'], job['upper'], job['row_lower'], job['row_upper'],
+                            job['matrix_start'].astype(np.int32), job['matrix_index'].astype(np.int32),
+                            job['matrix_value'], np.zeros(len(job['costs']), dtype=np.int32))
+        while True:
+            design = connection.recv()
+            if design is None:
+                return
+            results = {}
+            for name, highs in instances.items():
+                columns = jobs[name]['decision_columns'].astype(np.int32)
+                highs.changeColsBounds(len(columns), columns, design, design)
+                highs.run()
+                model_status = highs.getModelStatus()
+                optimal = model_status == highspy.HighsModelStatus.kOptimal
+                results[name] = {'status': highs.modelStatusToString(model_status),
+                                 'objective': highs.getInfo().objective_function_value if optimal else None,
+                                 'duals': np.asarray(highs.getSolution().col_dual)[columns] if optimal else None}
+            connection.send(('results', results))
+    except Exception as e:
+        connection.send(('error', f'{e.__class__.__name__}: {e}'))
+
+
+def _shifted_results(prior_system_model: SystemModel, system_model: SystemModel, shift: int) -> Dict[str, np.ndarray]:
+    """
+    Returns the results of the time series variables of prior_system_model, shifted by shift time steps, as start
+    values for the variables of system_model. Values not known this way are NaN (unknown).
+    """
+    prior_results = {variable.label: variable.result for variable in prior_system_model.variables
+                     if isinstance(variable, VariableTS) and variable.result is not None}
+    start_values = {}
+    for variable in system_model.variables:
+        if variable.label not in prior_results:
+            continue
+        known = np.asarray(prior_results[variable.label], dtype=float)[shift:][:variable.length]
+        start_values[variable.label] = np.full(variable.length, np.nan)
+        start_values[variable.label][:len(known)] = known
+    return start_values
+
+
+def _limit_nested_arrays(d: Dict[str, Union[np.ndarray, dict]], length: int) -> Dict[str, Union[np.ndarray, dict]]:
+    """ Limits all arrays of a nested dictionary to the given length """
+    return {key: _limit_nested_arrays(value, length) if isinstance(value, dict) else value[:length]
+            for key, value in d.items()}
+
+
+def _expand_nested_arrays(d: Dict[str, Any], expand: Callable[..., np.ndarray],
+                          extensive_keys: Tuple[str, ...] = (), extensive: bool = False) -> Dict[str, Any]:
+    """
+    Applies expand to all arrays of a nested dictionary. Arrays below one of the extensive_keys are expanded with
+    extensive=True
+    """
+    def expand_value(key: str, value: Any) -> Any:
+        is_extensive = extensive or key in extensive_keys
+        if isinstance(value, dict):
+            return _expand_nested_arrays(value, expand, extensive_keys, is_extensive)
+        if isinstance(value, np.ndarray) and value.ndim == 1:
+            return expand(value, extensive=True) if is_extensive else expand(value)
+        return value
+    return {key: expand_value(key, value) for key, value in d.items()}
+
+
 def _remove_none_values(d: Dict[Any, Optional[Any]]) -> Dict[Any, Any]:
     # Remove None values from a dictionary
     return {k: _remove_none_values(v) if isinstance(v, dict) else v for k, v in d.items() if v is not None}
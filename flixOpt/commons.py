@@ -10,11 +10,13 @@ from .components import Source, Sink, SourceAndSink, Storage, LinearConverter, T
 from . import linear_converters
 
 from .flow_system import FlowSystem, create_datetime_array
-from .calculation import FullCalculation, SegmentedCalculation, AggregatedCalculation
+from .calculation import (FullCalculation, SegmentedCalculation, AggregatedCalculation, TwoStageCalculation,
+                          BendersCalculation, BatchCalculation, RollingHorizonCalculation, NrOfPeriodsSelection)
 from . import solvers
 
 from .interface import InvestParameters, OnOffParameters
 from .aggregation import AggregationParameters
+from .cache import DiskCache
 
 from . import plotting
 from . import results
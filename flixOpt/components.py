@@ -396,15 +396,22 @@ class StorageModel(ComponentModel):
         super().__init__(element)
         self.element: Storage = element
         self.charge_state: Optional[VariableTS] = None
+        self.charge_state_of_periods: Optional[VariableTS] = None  # Only with typical periods
         self.netto_discharge: Optional[VariableTS] = None
         self._investment: Optional[InvestmentModel] = None
+        self._eq_initial: Optional[Equation] = None
+        self._initial_charge_state: Optional[Union[Skalar, str]] = None  # The one used for modeling
+        self._period_order: Optional[np.ndarray] = None
+        self._remaining_since_start: Optional[np.ndarray] = None
 
     def do_modeling(self, system_model):
         super().do_modeling(system_model)
 
         lb, ub = self.absolute_charge_state_bounds
-        self.charge_state = create_variable('charge_state', self, system_model.nr_of_time_steps + 1, lower_bound=lb,
-                                            upper_bound=ub)
+        # Every (typical) period has its own charge states, with one more than time steps
+        self.charge_state = create_variable('charge_state', self,
+                                            system_model.nr_of_time_steps + system_model.nr_of_periods,
+                                            lower_bound=lb, upper_bound=ub)
 
         self.netto_discharge = create_variable('netto_discharge', self, system_model.nr_of_time_steps,
                                                lower_bound=-np.inf)  # negative Werte zulässig!
@@ -416,7 +423,8 @@ class StorageModel(ComponentModel):
         eq_netto.add_summand(self.element.charging.model.flow_rate, 1)
         eq_netto.add_summand(self.element.discharging.model.flow_rate, -1)
 
-        indices_charge_state = range(system_model.indices.start, system_model.indices.stop + 1)  # additional
+        # Rows: periods, columns: charge states of the period
+        indices_charge_state = np.arange(self.charge_state.length).reshape(system_model.nr_of_periods, -1)
 
         ############# Charge State Equation
         # charge_state(n+1)
@@ -425,11 +433,11 @@ class StorageModel(ComponentModel):
         # + discharging(n)  * 1 / eta_discharge * dt(n)
         # = 0
         eq_charge_state = create_equation('charge_state', self, eq_type='eq')
-        eq_charge_state.add_summand(self.charge_state, 1, indices_charge_state[1:])  # 1:end
+        eq_charge_state.add_summand(self.charge_state, 1, indices_charge_state[:, 1:].ravel())  # 1:end
         eq_charge_state.add_summand(self.charge_state,
                                     (self.element.relative_loss_per_hour.active_data * system_model.dt_in_hours) - 1,
                                     indices_charge_state
-                                    [:-1])  # sprich 0 .. end-1 % nach letztem Zeitschritt gibt es noch einen weiteren Ladezustand!
+                                    [:, :-1].ravel())  # sprich 0 .. end-1 % nach letztem Zeitschritt gibt es noch einen weiteren Ladezustand!
         eq_charge_state.add_summand(self.element.charging.model.flow_rate,
                                     -1 * self.element.eta_charge.active_data * system_model.dt_in_hours)
         eq_charge_state.add_summand(self.element.discharging.model.flow_rate,
@@ -441,23 +449,115 @@ class StorageModel(ComponentModel):
             self.sub_models.append(self._investment)
             self._investment.do_modeling(system_model)
 
+        if system_model.period_length is not None:
+            self._model_charge_state_of_periods(system_model, indices_charge_state)
+
         # Initial charge state
+        self._initial_charge_state = self.element.initial_charge_state
         if self.element.initial_charge_state is not None:
             self._model_initial_and_final_charge_state(system_model)
 
+    def update_initial_state(self) -> Optional[List[Equation]]:
+        initial_charge_state = self.element.initial_charge_state
+        if all(value is not None and utils.is_number(value)
+               for value in (initial_charge_state, self._initial_charge_state)):
+            self._eq_initial.set_constant(initial_charge_state)
+            self._initial_charge_state = initial_charge_state
+            return [self._eq_initial]
+        elif initial_charge_state != self._initial_charge_state:
+            return None  # Only a number can be updated to a number. Otherwise, other constraints are needed
+        return []
+
+    def _model_charge_state_of_periods(self, system_model: SystemModel, indices_charge_state: np.ndarray):
+        """
+        Links the typical periods in the order of the original horizon. charge_state_of_periods holds the charge state
+        at the start of every original period (and after the last one). Each period changes it like its typical period
+        does. The highest and lowest charge state of each typical period, shifted to the start of the original
+        period, must stay within the bounds of the Storage. The losses within a period are neglected for these bounds.
+        """
+        order = system_model.period_order
+        nr_of_periods = system_model.nr_of_periods
+        lb, ub = self.absolute_charge_state_bounds
+        self.charge_state_of_periods = create_variable('charge_state_of_periods', self, len(order) + 1,
+                                                       lower_bound=np.min(lb), upper_bound=np.max(ub))
+        charge_state_max = create_variable('charge_state_max', self, nr_of_periods, lower_bound=np.min(lb),
+                                           upper_bound=np.max(ub), avoid_use_of_variable_ts=True)
+        charge_state_min = create_variable('charge_state_min', self, nr_of_periods, lower_bound=np.min(lb),
+                                           upper_bound=np.max(ub), avoid_use_of_variable_ts=True)
+        starts, ends = indices_charge_state[:, 0], indices_charge_state[:, -1]
+        # Share of the charge state at the start of a typical period, that remains after each of its time steps
+        remaining_per_time_step = utils.as_vector(1 - self.element.relative_loss_per_hour.active_data *
+                                                  system_model.dt_in_hours, system_model.nr_of_time_steps)
+        self._remaining_since_start = np.cumprod(np.column_stack(
+            [np.ones(nr_of_periods), remaining_per_time_step.reshape(nr_of_periods, -1)]), axis=1)
+        self._period_order = order
+        remaining = self._remaining_since_start[order, -1]
+
+        # eq: charge_state_of_periods(p+1) = remaining(p) * [charge_state_of_periods(p) - charge_state(start)]
+        #                                    + charge_state(end)
+        eq_periods = create_equation('charge_state_of_periods', self, eq_type='eq')
+        eq_periods.add_summand(self.charge_state_of_periods, 1, np.arange(1, len(order) + 1))
+        eq_periods.add_summand(self.charge_state_of_periods, -1 * remaining, np.arange(len(order)))
+        eq_periods.add_summand(self.charge_state, remaining, starts[order])
+        eq_periods.add_summand(self.charge_state, -1, ends[order])
+
+        # eq: charge_state(t) <= charge_state_max(period of t); charge_state_min(period of t) <= charge_state(t)
+        period_of_charge_state = np.repeat(np.arange(nr_of_periods), indices_charge_state.shape[1])
+        eq_max = create_equation('charge_state_max', self, eq_type='ineq')
+        eq_max.add_summand(self.charge_state, 1)
+        eq_max.add_summand(charge_state_max, -1, period_of_charge_state)
+        eq_min = create_equation('charge_state_min', self, eq_type='ineq')
+        eq_min.add_summand(charge_state_min, 1, period_of_charge_state)
+        eq_min.add_summand(self.charge_state, -1)
+
+        # eq: charge_state_of_periods(p) + charge_state_max - charge_state(start) <= relative_maximum * capacity
+        # eq: relative_minimum * capacity <= charge_state_of_periods(p) + charge_state_min - charge_state(start)
+        relative_lower_bound, relative_upper_bound = self.relative_charge_state_bounds
+        eq_upper = create_equation('charge_state_of_periods_max', self, eq_type='ineq')
+        eq_upper.add_summand(self.charge_state_of_periods, 1, np.arange(len(order)))
+        eq_upper.add_summand(charge_state_max, 1, order)
+        eq_upper.add_summand(self.charge_state, -1, starts[order])
+        eq_lower = create_equation('charge_state_of_periods_min', self, eq_type='ineq')
+        eq_lower.add_summand(self.charge_state_of_periods, -1, np.arange(len(order)))
+        eq_lower.add_summand(charge_state_min, -1, order)
+        eq_lower.add_summand(self.charge_state, 1, starts[order])
+        if self._investment is None:
+            eq_upper.add_constant(np.min(relative_upper_bound) * self.element.capacity_in_flow_hours)
+            eq_lower.add_constant(-1 * np.max(relative_lower_bound) * self.element.capacity_in_flow_hours)
+        else:
+            eq_upper.add_summand(self._investment.size, -1 * np.min(relative_upper_bound))
+            eq_lower.add_summand(self._investment.size, np.max(relative_lower_bound))
+
+    def charge_state_of_horizon(self) -> np.ndarray:
+        """
+        The result of the charge state over the horizon. With typical periods, the charge states of the typical periods
+        are put in the order of the original horizon and shifted to the charge state at the start of each period
+        (with the losses since that start).
+        """
+        if self.charge_state_of_periods is None:
+            return self.charge_state.result
+        order = self._period_order
+        charge_states = np.asarray(self.charge_state.result).reshape(len(self._remaining_since_start), -1)[order]
+        shift = self.charge_state_of_periods.result[:-1] - charge_states[:, 0]
+        charge_state = charge_states + shift[:, None] * self._remaining_since_start[order]
+        return np.append(charge_state[:, :-1].ravel(), self.charge_state_of_periods.result[-1])
+
     def _model_initial_and_final_charge_state(self, system_model):
-        indices_charge_state = range(system_model.indices.start, system_model.indices.stop + 1)  # additional
+        # With typical periods, the charge state of the horizon is charge_state_of_periods
+        charge_state = self.charge_state if self.charge_state_of_periods is None else self.charge_state_of_periods
+        indices_charge_state = range(charge_state.length)
 
         if self.element.initial_charge_state is not None:
-            eq_initial = create_equation('initial_charge_state', self, eq_type='eq')
+            eq_initial = self._eq_initial = create_equation('initial_charge_state', self, eq_type='eq')
             if utils.is_number(self.element.initial_charge_state):
                 # eq: Q_Ladezustand(1) = Q_Ladezustand_Start;
                 eq_initial.add_constant(self.element.initial_charge_state)  # chargeState_0 !
-                eq_initial.add_summand(self.charge_state, 1, system_model.indices[0])
+                eq_initial.add_summand(charge_state, 1, system_model.indices[0])
             elif self.element.initial_charge_state == 'lastValueOfSim':
                 # eq: Q_Ladezustand(1) - Q_Ladezustand(end) = 0;
-                eq_initial.add_summand(self.charge_state, 1, system_model.indices[0])
-                eq_initial.add_summand(self.charge_state, -1,  system_model.indices[-1])
+                last_index = system_model.indices[-1] if self.charge_state_of_periods is None else indices_charge_state[-1]
+                eq_initial.add_summand(charge_state, 1, system_model.indices[0])
+                eq_initial.add_summand(charge_state, -1,  last_index)
             else:
                 raise Exception(f'initial_charge_state has undefined value: {self.element.initial_charge_state}')
                 # TODO: Validation in Storage Class, not in Model
@@ -467,13 +567,13 @@ class StorageModel(ComponentModel):
         # 1: eq:  Q_charge_state(end) <= Q_max
         if self.element.maximal_final_charge_state is not None:
             eq_max = create_equation('eq_final_charge_state_max', self, eq_type='ineq')
-            eq_max.add_summand(self.charge_state, 1, indices_charge_state[-1])
+            eq_max.add_summand(charge_state, 1, indices_charge_state[-1])
             eq_max.add_constant(self.element.maximal_final_charge_state)
 
         # 2: eq: - Q_charge_state(end) <= - Q_min
         if self.element.minimal_final_charge_state is not None:
             eq_min = create_equation('eq_charge_state_end_min', self, eq_type='ineq')
-            eq_min.add_summand(self.charge_state, -1, indices_charge_state[-1])
+            eq_min.add_summand(charge_state, -1, indices_charge_state[-1])
             eq_min.add_constant(- self.element.minimal_final_charge_state)
 
     @property
@@ -7,7 +7,7 @@ import logging
 
 import numpy as np
 
-from .math_modeling import Variable, VariableTS
+from .math_modeling import Variable, VariableTS, Equation
 from .core import Numeric, Numeric_TS, Skalar, Config
 from .interface import InvestParameters, OnOffParameters
 from .features import OnOffModel, InvestmentModel, PreventSimultaneousUsageModel
@@ -317,7 +317,8 @@ class FlowModel(ElementModel):
         self.sum_flow_hours = create_variable('sumFlowHours', self, 1, lower_bound=self.element.flow_hours_total_min,
                                               upper_bound=self.element.flow_hours_total_max)
         eq_sum_flow_hours = create_equation('sumFlowHours', self, 'eq')
-        eq_sum_flow_hours.add_summand(self.flow_rate, system_model.dt_in_hours, as_sum=True)
+        eq_sum_flow_hours.add_summand(self.flow_rate, system_model.dt_in_hours * system_model.time_step_weights,
+                                      as_sum=True)
         eq_sum_flow_hours.add_summand(self.sum_flow_hours, -1)
 
         # Load factor
@@ -326,6 +327,10 @@ class FlowModel(ElementModel):
         # Shares
         self._create_shares(system_model)
 
+    def update_initial_state(self) -> Optional[List[Equation]]:
+        self.flow_rate.previous_values = self.element.previous_flow_rate
+        return []
+
     def _create_shares(self, system_model: SystemModel):
         # Arbeitskosten:
         if self.element.effects_per_flow_hour is not None:
@@ -415,7 +420,8 @@ class BusModel(ElementModel):
 
         # Fehlerplus/-minus:
         if self.element.with_excess:
-            excess_penalty = np.multiply(system_model.dt_in_hours, self.element.excess_penalty_per_flow_hour.active_data)
+            excess_penalty = np.multiply(system_model.dt_in_hours * system_model.time_step_weights,
+                                         self.element.excess_penalty_per_flow_hour.active_data)
             self.excess_input = create_variable('excess_input', self, system_model.nr_of_time_steps, lower_bound=0)
             self.excess_output = create_variable('excess_output', self, system_model.nr_of_time_steps, lower_bound=0)
 
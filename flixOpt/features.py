@@ -183,6 +183,7 @@ class OnOffModel(ElementModel):
         self.switch_on: Optional[VariableTS] = None
         self.switch_off: Optional[VariableTS] = None
         self.nr_switch_on: Optional[VariableTS] = None
+        self._eq_initial_switch: Optional[Equation] = None
 
         self._on_off_parameters = on_off_parameters
         self._defining_variables = defining_variables
@@ -197,7 +198,7 @@ class OnOffModel(ElementModel):
                                               lower_bound=self._on_off_parameters.on_hours_total_min,
                                               upper_bound=self._on_off_parameters.on_hours_total_max)
         eq_total_on = create_equation('totalOnHours', self)
-        eq_total_on.add_summand(self.on, system_model.dt_in_hours, as_sum=True)
+        eq_total_on.add_summand(self.on, system_model.dt_in_hours * system_model.time_step_weights, as_sum=True)
         eq_total_on.add_summand(self.total_on_hours, -1)
 
         self._add_on_constraints(system_model, system_model.indices)
@@ -334,6 +335,8 @@ class OnOffModel(ElementModel):
             - To count consecutive zeros instead of ones, use a transformed binary variable
               (e.g., `1 - binary_variable`).
             - Constraints ensure the duration variable properly resets or increments based on activity.
+            - With typical periods, the periods dont follow each other. The duration restarts at the start of every
+              period, like at the first time step.
 
         Raises:
             AssertionError: If the binary_variable is None, indicating the duration constraints cannot be applied.
@@ -355,20 +358,24 @@ class OnOffModel(ElementModel):
         constraint_1.add_summand(duration_in_hours, 1)
         constraint_1.add_summand(binary_variable, -1 * mega)
 
+        starts = np.asarray(time_indices)[np.isin(time_indices, system_model.period_starts)]
+        indices = np.setdiff1d(time_indices, starts)  # t
+        prior_indices = indices - 1  # t-1
+
         # 2a) eq: duration(t) - duration(t-1) <= dt(t)
         constraint_2a = create_equation(f'{label_prefix}_constraint_2a', self, eq_type='ineq')
-        constraint_2a.add_summand(duration_in_hours, 1, time_indices[1:])  # duration(t)
-        constraint_2a.add_summand(duration_in_hours, -1, time_indices[0:-1])  # duration(t-1)
-        constraint_2a.add_constant(system_model.dt_in_hours[1:])  # dt(t)
+        constraint_2a.add_summand(duration_in_hours, 1, indices)  # duration(t)
+        constraint_2a.add_summand(duration_in_hours, -1, prior_indices)  # duration(t-1)
+        constraint_2a.add_constant(system_model.dt_in_hours[indices])  # dt(t)
 
         # 2b) eq: dt(t) - BIG * ( 1-On(t) ) <= duration(t) - duration(t-1)
         # eq: -duration(t) + duration(t-1) + On(t) * BIG <= -dt(t) + BIG
         # TODO: Use maximum duration instead of BIG
         constraint_2b = create_equation(f'{label_prefix}_constraint_2b', self, eq_type='ineq')
-        constraint_2b.add_summand(duration_in_hours, -1, time_indices[1:])  # duration(t)
-        constraint_2b.add_summand(duration_in_hours, 1, time_indices[0:-1])  # duration(t-1)
-        constraint_2b.add_summand(binary_variable, mega, time_indices[1:])  # on(t)
-        constraint_2b.add_constant(-1 * system_model.dt_in_hours[1:] + mega)  # dt(t)
+        constraint_2b.add_summand(duration_in_hours, -1, indices)  # duration(t)
+        constraint_2b.add_summand(duration_in_hours, 1, prior_indices)  # duration(t-1)
+        constraint_2b.add_summand(binary_variable, mega, indices)  # on(t)
+        constraint_2b.add_constant(-1 * system_model.dt_in_hours[indices] + mega)  # dt(t)
 
         # 3) check minimum_duration before switchOff-step
         # (last on-time period of timeseries is not checked and can be shorter)
@@ -376,17 +383,19 @@ class OnOffModel(ElementModel):
             # eq: minimum_duration * -1 * [On(t)-On(t-1)] <= duration(t-1)
             # eq: -duration(t - 1) - minimum_duration * On(t) + minimum_duration * On(t - 1) <= 0
             # Note: switchOff-step is when: On(t)-On(t-1) == -1
+            minimum = minimum_duration.active_data
+            if np.ndim(minimum) > 0:
+                minimum = np.asarray(minimum)[indices]
             eq_min_duration = create_equation(f'{label_prefix}_minimum_duration', self, eq_type='ineq')
-            eq_min_duration.add_summand(duration_in_hours, -1, time_indices[0:-1])  # duration(t-1)
-            eq_min_duration.add_summand(binary_variable, -1 * minimum_duration.active_data, time_indices[1:])  # on(t)
-            eq_min_duration.add_summand(binary_variable, minimum_duration.active_data, time_indices[0:-1])  # on(t-1)
+            eq_min_duration.add_summand(duration_in_hours, -1, prior_indices)  # duration(t-1)
+            eq_min_duration.add_summand(binary_variable, -1 * minimum, indices)  # on(t)
+            eq_min_duration.add_summand(binary_variable, minimum, prior_indices)  # on(t-1)
 
-        # 4) first index:
+        # 4) first index (of every typical period):
         # eq: duration(t=0)= dt(0) * On(0)
-        first_index = time_indices[0]  # only first element
         eq_first = create_equation(f'{label_prefix}_firstTimeStep', self)
-        eq_first.add_summand(duration_in_hours, 1, first_index)
-        eq_first.add_summand(binary_variable, -1 * system_model.dt_in_hours[first_index], first_index)
+        eq_first.add_summand(duration_in_hours, 1, starts)
+        eq_first.add_summand(binary_variable, -1 * system_model.dt_in_hours[starts], starts)
 
         return duration_in_hours
 
@@ -397,19 +406,22 @@ class OnOffModel(ElementModel):
         assert self.on is not None, f'On Variable of {self.element} must be defined to add constraints'
         # % Schaltänderung aus On-Variable
         # % SwitchOn(t)-SwitchOff(t) = On(t)-On(t-1)
+        # With typical periods, the periods dont follow each other. Switches at their starts are not modeled
+        indices = np.setdiff1d(system_model.indices, system_model.period_starts)
         eq_switch = create_equation('Switch', self)
-        eq_switch.add_summand(self.switch_on, 1, system_model.indices[1:])  # SwitchOn(t)
-        eq_switch.add_summand(self.switch_off, -1, system_model.indices[1:])  # SwitchOff(t)
-        eq_switch.add_summand(self.on, -1, system_model.indices[1:])  # On(t)
-        eq_switch.add_summand(self.on, +1, system_model.indices[0:-1])  # On(t-1)
+        eq_switch.add_summand(self.switch_on, 1, indices)  # SwitchOn(t)
+        eq_switch.add_summand(self.switch_off, -1, indices)  # SwitchOff(t)
+        eq_switch.add_summand(self.on, -1, indices)  # On(t)
+        eq_switch.add_summand(self.on, +1, np.asarray(indices) - 1)  # On(t-1)
 
         # Initital switch on
         # eq: SwitchOn(t=0)-SwitchOff(t=0) = On(t=0) - On(t=-1)
-        eq_initial_switch = create_equation('Initial_Switch', self)
-        eq_initial_switch.add_summand(self.switch_on, 1, indices_of_variable=0)  # SwitchOn(t=0)
-        eq_initial_switch.add_summand(self.switch_off, -1, indices_of_variable=0)  # SwitchOff(t=0)
-        eq_initial_switch.add_summand(self.on, -1, indices_of_variable=0)  # On(t=0)
-        eq_initial_switch.add_constant(-1 * self.on.previous_values[-1])  # On(t-1)
+        if system_model.period_length is None:
+            eq_initial_switch = self._eq_initial_switch = create_equation('Initial_Switch', self)
+            eq_initial_switch.add_summand(self.switch_on, 1, indices_of_variable=0)  # SwitchOn(t=0)
+            eq_initial_switch.add_summand(self.switch_off, -1, indices_of_variable=0)  # SwitchOff(t=0)
+            eq_initial_switch.add_summand(self.on, -1, indices_of_variable=0)  # On(t=0)
+            eq_initial_switch.add_constant(-1 * self.on.previous_values[-1])  # On(t-1)
 
         ## Entweder SwitchOff oder SwitchOn
         # eq: SwitchOn(t) + SwitchOff(t) <= 1
@@ -422,7 +434,7 @@ class OnOffModel(ElementModel):
         # eq: nrSwitchOn = sum(SwitchOn(t))
         eq_nr_switch_on = create_equation('NrSwitchOn', self)
         eq_nr_switch_on.add_summand(self.nr_switch_on, 1)
-        eq_nr_switch_on.add_summand(self.switch_on, -1, as_sum=True)
+        eq_nr_switch_on.add_summand(self.switch_on, -1 * system_model.time_step_weights, as_sum=True)
 
     def _create_shares(self, system_model: SystemModel):
         # Anfahrkosten:
@@ -437,6 +449,16 @@ class OnOffModel(ElementModel):
             effect_collection.add_share_to_operation('running_hour_effects', self.element, effects_per_running_hour,
                                                      system_model.dt_in_hours, self.on)
 
+    def update_initial_state(self) -> Optional[List[Equation]]:
+        """ The previous values of On, Off and the initial switch follow the defining variables """
+        self.on.previous_values = self._previous_on_values(Config.EPSILON)
+        if self.off is not None:
+            self.off.previous_values = 1 - self.on.previous_values
+        if self._eq_initial_switch is None:
+            return []
+        self._eq_initial_switch.set_constant(-1 * self.on.previous_values[-1])  # On(t-1)
+        return [self._eq_initial_switch]
+
     def _previous_on_values(self, epsilon: float = 1e-5) -> np.ndarray:
         # Gather previous values, ignoring empty (None) entries
         previous_values_of_variables = np.array([
@@ -589,8 +611,8 @@ class ShareAllocationModel(ElementModel):
             self._eq_time_series = create_equation(f'{self.label}_time_series', self)
             self._eq_time_series.add_summand(self.sum_TS, -1)
 
-            # eq: sum = sum(sum_TS(t)) # additionaly to self.sum
-            self._eq_sum.add_summand(self.sum_TS, 1, as_sum=True)
+            # eq: sum = sum(sum_TS(t) * weight(t)) # additionaly to self.sum
+            self._eq_sum.add_summand(self.sum_TS, system_model.time_step_weights, as_sum=True)
 
     def add_share(self,
                   system_model: SystemModel,
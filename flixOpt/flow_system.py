@@ -2,8 +2,9 @@
 This module contains the FlowSystem class, which is used to collect instances of many other classes by the end User.
 """
 
+import copy
 import pathlib
-from typing import List, Set, Tuple, Dict, Union, Optional, Literal
+from typing import List, Tuple, Dict, Union, Optional, Literal
 import logging
 
 import numpy as np
@@ -86,11 +87,20 @@ class FlowSystem:
         for element in self.all_elements:
             element.transform_data()
 
+    def copy(self) -> 'FlowSystem':
+        """
+        Returns a deep copy of the FlowSystem, with copies of all Elements and TimeSeries, but without their models.
+        Modeling the copy doesn't change this FlowSystem or its models (e.g. in a background thread).
+        """
+        elements = [self.effect_collection] + self.all_elements
+        memo = {id(model): None for model in [self.model] + [element.model for element in elements] if model is not None}
+        return copy.deepcopy(self, memo)
+
     def network_infos(self) -> Tuple[Dict[str, Dict[str, str]], Dict[str, Dict[str, str]]]:
         nodes = {node.label_full: {'label': node.label,
                                    'class': 'Bus' if isinstance(node, Bus) else 'Component',
                                    'infos':  node.__str__()}
-                 for node in self.components + list(self.all_buses)}
+                 for node in self.components + self.all_buses}
 
         edges = {flow.label_full: {'label': flow.label,
                                    'start': flow.bus.label_full if flow.is_input_in_comp else flow.comp.label_full,
@@ -223,16 +233,18 @@ class FlowSystem:
         return f"FlowSystem with components:\n{components}\nand effects:\n{effects}"
 
     @property
-    def all_flows(self) -> Set[Flow]:
-        return {flow for comp in self.components for flow in comp.inputs + comp.outputs}
+    def all_flows(self) -> List[Flow]:
+        """ In the order of the Components. A stable order makes the model (and the solution found) reproducible """
+        return list(dict.fromkeys(flow for comp in self.components for flow in comp.inputs + comp.outputs))
 
     @property
-    def all_buses(self) -> Set[Bus]:
-        return {flow.bus for flow in self.all_flows}
+    def all_buses(self) -> List[Bus]:
+        """ In the order of the Flows connected to them (see all_flows) """
+        return list(dict.fromkeys(flow.bus for flow in self.all_flows))
 
     @property
     def all_elements(self) -> List[Element]:
-        return self.components + self.effect_collection.effects + list(self.all_flows) + list(self.all_buses)
+        return self.components + self.effect_collection.effects + self.all_flows + self.all_buses
 
     @property
     def all_time_series(self) -> List[TimeSeries]:
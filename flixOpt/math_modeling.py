@@ -7,19 +7,26 @@ Multiple solvers are supported.
 """
 
 import logging
+import pathlib
 import re
+import threading
 import timeit
-from typing import List, Dict, Optional, Union, Literal, Any
+from typing import List, Dict, Optional, Union, Literal, Any, Tuple, Callable
 from abc import ABC, abstractmethod
 
 import numpy as np
 import pyomo.environ as pyo
 
 from . import utils
+from .cache import DiskCache, hash_arrays
 from .core import Numeric
 
 logger = logging.getLogger('flixOpt')
 
+# Above this share of changed coefficients, HighspyModel passes the whole model again instead of changing them one by
+# one. Changing a single coefficient costs about as much as passing 30 nonzeros of a model.
+_SHARE_OF_COEFFICIENTS_TO_PASS_AGAIN = 0.03
+
 
 class Variable:
     """
@@ -78,6 +85,22 @@ class Variable:
     def reset_result(self):
         self.result = None
 
+    def matches(self, other: 'Variable') -> bool:
+        """ True if other is the same Variable (label, length and type), only its data might differ """
+        return (type(self) is type(other) and self.label == other.label and self.length == other.length and
+                self.is_binary == other.is_binary)
+
+    def take_data_from(self, other: 'Variable') -> bool:
+        """
+        Takes over the bounds and the fixed value of other, a matching Variable (e.g. of a model built with other
+        data, see .matches()). Returns True if the bounds changed.
+        """
+        changed = not (_is_equal(self.lower_bound, other.lower_bound) and _is_equal(self.upper_bound, other.upper_bound)
+                       and self.fixed == other.fixed and _is_equal(self.fixed_value, other.fixed_value))
+        self.lower_bound, self.upper_bound = other.lower_bound, other.upper_bound
+        self.fixed_value, self.fixed = other.fixed_value, other.fixed
+        return changed
+
 
 class VariableTS(Variable):
     """
@@ -97,6 +120,10 @@ class VariableTS(Variable):
                          lower_bound=lower_bound, upper_bound=upper_bound)
         self.previous_values = previous_values
 
+    def take_data_from(self, other: 'VariableTS') -> bool:
+        self.previous_values = other.previous_values
+        return super().take_data_from(other)
+
 
 class _Constraint:
     """
@@ -206,9 +233,37 @@ class _Constraint:
         except ValueError as e:
             raise ValueError(f'Length of Constant {value=} does not fit: {e}')
 
+    def set_constant(self, value: Numeric) -> None:
+        """ Replaces the right side of the equation (all constants added before) by value """
+        self.constant = 0
+        self.parts_of_constant = []
+        self.add_constant(value)
+
     def description(self, at_index: int = 0) -> str:
         raise NotImplementedError(f'Not implemented for Abstract class <_Constraint>')
 
+    def matches(self, other: '_Constraint') -> bool:
+        """
+        True if other is the same Constraint (label, length, type and summands with the same variables and indices),
+        only its factors and constant might differ
+        """
+        return (type(self) is type(other) and self.label == other.label and self.length == other.length and
+                len(self.summands) == len(other.summands) and
+                all(type(own) is type(new) and own.variable.label == new.variable.label and
+                    _is_equal(own.indices, new.indices) for own, new in zip(self.summands, other.summands)))
+
+    def take_data_from(self, other: '_Constraint') -> bool:
+        """
+        Takes over the factors of the summands and the constant of other, a matching Constraint (e.g. of a model
+        built with other data, see .matches()). The own Variables are kept. Returns True if anything changed.
+        """
+        changed = not _is_equal(self.constant, other.constant) or any(
+            not _is_equal(own.factor, new.factor) for own, new in zip(self.summands, other.summands))
+        self.constant, self.parts_of_constant = other.constant, other.parts_of_constant
+        for own, new in zip(self.summands, other.summands):
+            own.factor, own.factor_vec = new.factor, new.factor_vec
+        return changed
+
     def _update_length(self, new_length: int) -> None:
         """
         Passes if the new_length is 1, the current length is 1 or new_length matches the existing length of the Equation
@@ -410,8 +465,9 @@ class MathModel:
     ----------
     label : str
         A descriptive label for the model.
-    modeling_language : {'pyomo', 'cvxpy'}, optional
+    modeling_language : {'pyomo', 'highspy', 'cvxpy'}, optional
         Specifies the modeling language used for translation (default is 'pyomo').
+        'highspy' passes the compiled MatrixModel directly to the HiGHS solver, bypassing pyomo.
 
     Attributes
     ----------
@@ -450,18 +506,26 @@ class MathModel:
 
     def __init__(self,
                  label: str,
-                 modeling_language: Literal['pyomo', 'cvxpy'] = 'pyomo'):
+                 modeling_language: Literal['pyomo', 'highspy', 'cvxpy'] = 'pyomo'):
         self._infos = {}
         self.label = label
         self.modeling_language: str = modeling_language
 
         self.solver: Optional[Solver] = None
         self.model: Optional[ModelingLanguage] = None
+        self.matrix_model: Optional[MatrixModel] = None
 
         self._variables: List[Variable] = []
         self._constraints: List[Union[Equation, Inequation]] = []
         self._objective: Optional[Equation] = None
         self.result_of_objective: Optional[float] = None
+        self.start_values: Dict[str, Numeric] = {}
+        self.fixed_values: Dict[str, Numeric] = {}  # See .fix_variables()
+        self.presolve: bool = False  # Reduce the model before passing it to the solver (only 'highspy')
+        self.presolved_model: Optional[PresolvedModel] = None
+        self.scaling: bool = False  # Scale rows and columns before passing the model to the solver (only 'highspy')
+        self.scaled_model: Optional[ScaledModel] = None
+        self.checkpoint: Optional[Checkpoint] = None  # Writes the incumbents during the solve (only 'highspy')
 
         self.duration = {}
 
@@ -484,23 +548,227 @@ class MathModel:
                 f'No. of Inequations (single): {self.nr_of_inequations} ({self.nr_of_single_inequations})\n'
                 f'No. of Variables   (single): {self.nr_of_variables} ({self.nr_of_single_variables})')
 
-    def translate_to_modeling_language(self) -> None:
+    def translate_to_modeling_language(self, reuse: Optional['ModelingLanguage'] = None) -> None:
+        """
+        Translates the model to the modeling language.
+
+        Parameters
+        ----------
+        reuse : ModelingLanguage, optional
+            An already translated model of a MathModel with the same structure (e.g. the same SystemModel, built with
+            other data). If it supports updating (see ModelingLanguage.update_model()), only the changed coefficients,
+            bounds and right hand sides are patched in it. Otherwise, the model is translated from scratch.
+        """
         t_start = timeit.default_timer()
-        if self.modeling_language == 'pyomo':
+        if self.presolve and self.modeling_language != 'highspy':
+            logger.warning(f'Presolve is only supported by the modeling language "highspy" and is skipped')
+        if self.scaling and self.modeling_language != 'highspy':
+            logger.warning(f'Scaling is only supported by the modeling language "highspy" and is skipped')
+        if reuse is not None and reuse.update_model(self):
+            logger.info(f'Updated existing {reuse.__class__.__name__} instead of translating "{self.label}" again')
+            self.model = reuse
+        elif self.modeling_language == 'pyomo':
             self.model = PyomoModel()
             self.model.translate_model(self)
+        elif self.modeling_language == 'highspy':
+            self.model = HighspyModel()
+            self.model.translate_model(self)
         else:
             raise NotImplementedError('Modeling Language cvxpy is not yet implemented')
         self.duration['Translation'] = round(timeit.default_timer() - t_start, 2)
 
-    def solve(self, solver: 'Solver') -> None:
+    def update_translation(self,
+                           variables: List[Variable],
+                           constraints: List[Union[Equation, Inequation]]) -> None:
+        """
+        Passes the changed bounds of Variables and the changed factors and constants of constraints (with the same
+        structure as before) on to the translated model. Only these parts are updated (see
+        ModelingLanguage.update_parts()). If the ModelingLanguage can't update them, the model is translated again.
+        Does nothing, if the model wasn't translated yet.
+        """
+        if self.model is None or not (variables or constraints):
+            return
+        t_start = timeit.default_timer()
+        if self.model.update_parts(self, variables, constraints):
+            logger.debug(f'Updated {len(variables)} Variables and {len(constraints)} constraints of "{self.label}"')
+            self.duration['Translation'] = round(timeit.default_timer() - t_start, 2)
+        else:
+            self.translate_to_modeling_language()
+        if self.matrix_model is not getattr(self.model, 'matrix_model', None):
+            self.matrix_model = None  # Compiled before the update
+
+    def compile(self) -> 'MatrixModel':
+        """
+        Compiles all Variables, Equations and Inequations into one sparse matrix representation (MatrixModel).
+        The result is stored in .matrix_model and can be consumed by any array based backend.
+        """
+        t_start = timeit.default_timer()
+        self.matrix_model = MatrixModel(self)
+        self.duration['Compilation'] = round(timeit.default_timer() - t_start, 2)
+        return self.matrix_model
+
+    def write(self,
+              path: Union[str, pathlib.Path],
+              format: Literal['mps', 'lp'] = 'mps',
+              chunk_size: int = 10_000) -> None:
+        """
+        Writes the model to a file in the (free) MPS or the CPLEX LP format, which can be read by any common solver.
+        Columns are named x<i> and rows c<i>, in the same order as in the MatrixModel. The labels of the
+        Variables and constraints are written as comments.
+
+        Parameters
+        ----------
+        path : str or pathlib.Path
+            The file to write to.
+        format : 'mps' or 'lp'
+            'lp': The rows are streamed directly from the Equations and Inequations in chunks of chunk_size rows,
+                  so only one constraint is held in memory as arrays at a time.
+            'mps': The MPS format is column oriented. The compiled MatrixModel is used (and created if necessary),
+                  and the columns are written in chunks of chunk_size columns, straight from its row-wise matrix.
+        chunk_size : int
+            Number of rows or columns formatted at once.
+        """
+        t_start = timeit.default_timer()
+        with open(path, 'w', encoding='utf-8') as file:
+            if format == 'lp':
+                _write_lp_file(self, file, chunk_size)
+            elif format == 'mps':
+                _write_mps_file(self.matrix_model or self.compile(), self.label, file, chunk_size)
+            else:
+                raise ValueError(f'Unknown file format "{format}". Use "mps" or "lp"')
+        self.duration['Writing'] = round(timeit.default_timer() - t_start, 2)
+
+    def read_solution(self, path: Union[str, pathlib.Path]) -> None:
+        """
+        Reads a solution file of a model written by .write() and stores the values in Variable.result.
+        Supported are the solution files of HiGHS (--solution_file) and CBC (solu).
+        """
+        column_offsets, nr_of_columns = _get_offsets(self.variables)
+        status, objective, solution = _read_solution_file(path, nr_of_columns)
+        if status.lower() != 'optimal':
+            logger.warning(f'Solution in {path} is not optimal. Status: "{status}"')
+        _write_results(self.variables, column_offsets, solution)
+        self.result_of_objective = objective
+
+    def set_start_values(self, start_values: Dict[str, Numeric]) -> None:
+        """
+        Sets start values (a MIP start) for the next solve, by the label of the Variables.
+        NaN marks unknown values. With 'pyomo', they are passed on as warmstart to solvers supporting it.
+        """
+        self.start_values = start_values
+
+    def coefficient_diagnostics(self, owners: Optional[Dict[str, str]] = None) -> 'CoefficientDiagnostics':
+        """ Ranges of the coefficients, bounds and right hand sides of the compiled model. See CoefficientDiagnostics """
+        return CoefficientDiagnostics(self.matrix_model or self.compile(), owners)
+
+    def fix_variables(self, values: Dict[str, Numeric]) -> None:
+        """
+        Fixes Variables (by label) to the given values, which are clipped to the bounds of the Variables.
+        Binary values are rounded. Must be called before the model is translated to a ModelingLanguage.
+        The values are kept in .fixed_values.
+        """
+        self.fixed_values.update(values)
+        variables = {variable.label: variable for variable in self.variables}
+        for label, value in values.items():
+            if label not in variables:
+                raise KeyError(f'No Variable with label "{label}" found in the model "{self.label}"')
+            variable = variables[label]
+            value = np.asarray(value, dtype=float)
+            lower = -np.inf if variable.lower_bound is None else np.asarray(variable.lower_bound, dtype=float)
+            upper = np.inf if variable.upper_bound is None else np.asarray(variable.upper_bound, dtype=float)
+            value = np.clip(np.round(value) if variable.is_binary else value, lower, upper)
+            variable.fixed_value = value.item() if value.size == 1 else value
+            variable.fixed = True
+
+    def solve(self, solver: 'Solver', cache: Optional[DiskCache] = None) -> None:
+        """
+        Solves the model and writes the results into the Variables.
+
+        Parameters
+        ----------
+        solver : Solver
+            The solver to use.
+        cache : DiskCache, optional
+            If given, the solution is looked up in the cache by the fingerprint of the model (see .fingerprint()) and
+            the settings of the solver. On a hit, the results are loaded instead of solving. Else, the solution is
+            stored after solving, if it is proven optimal (not e.g. the best solution found within a time limit).
+        """
         self.solver = solver
         t_start = timeit.default_timer()
+        self.result_of_objective = None
         for variable in self.variables:
             variable.reset_result()  # altes Ergebnis löschen (falls vorhanden)
+        if cache is not None:
+            key = self.fingerprint(solver.settings)
+            entry = cache.get(key)
+            if entry is not None and entry[1].get('optimal'):  # Only proven optimal solutions are reused
+                self._load_solution(*entry)
+                logger.info(f'Loaded the solution of "{self.label}" from {cache} (key {key[:12]}...)')
+                self.duration['Solving'] = round(timeit.default_timer() - t_start, 2)
+                return
+        if self.checkpoint is not None and self.modeling_language != 'highspy':
+            logger.warning(f'Checkpoints are only supported by the modeling language "highspy" and are skipped')
         self.model.solve(self, solver)
+        if cache is not None:
+            if solver.is_optimal:
+                self._save_solution(cache, key)
+            else:
+                logger.info(f'The solution of "{self.label}" is not stored in the cache, as it is not proven optimal')
         self.duration['Solving'] = round(timeit.default_timer() - t_start, 2)
 
+    def fingerprint(self, extra: Any = None) -> str:
+        """
+        Returns a stable hash of the model, which doesn't depend on the order of the Variables and Constraints.
+        If the modeling language holds a compiled MatrixModel ('highspy'), its fingerprint is used (see
+        MatrixModel.fingerprint()). Otherwise, the Variables and Constraints are hashed directly (sorted by label),
+        without compiling the model. extra (json serializable, e.g. solver settings) is included.
+        """
+        matrix_model = getattr(self.model, 'matrix_model', None)
+        if matrix_model is not None:
+            return matrix_model.fingerprint(extra)
+        arrays, parts = [], []
+        for variable in sorted(self.variables, key=lambda variable: variable.label):
+            parts.append((variable.label, variable.length, bool(variable.is_binary)))
+            arrays.extend(_get_bounds(variable))
+        constraints = self._constraints + ([self._objective] if self._objective is not None else [])
+        for constraint in sorted(constraints, key=lambda constraint: constraint.label):
+            summands = sorted(constraint.summands, key=lambda summand: (summand.variable.label,
+                                                                        summand.__class__.__name__))
+            parts.append((constraint.label, constraint.length, constraint.__class__.__name__,
+                          [(summand.variable.label, summand.__class__.__name__) for summand in summands]))
+            arrays.append(np.asarray(utils.as_vector(constraint.constant_vector, constraint.length), dtype=float))
+            for summand in summands:
+                arrays.append(np.asarray(summand.indices, dtype=np.int64))
+                arrays.append(np.asarray(summand.factor_vec, dtype=float))
+        return hash_arrays(*arrays, extra={'parts': parts, 'extra': extra})
+
+    def _save_solution(self, cache: DiskCache, key: str) -> None:
+        variables = sorted(self.variables, key=lambda variable: variable.label)  # The order of .fingerprint()
+        if any(variable.result is None for variable in variables):
+            return  # Nothing to store
+        solution = np.concatenate([np.broadcast_to(np.asarray(variable.result, dtype=float), variable.length)
+                                   for variable in variables]) if variables else np.zeros(0)
+        solver = self.solver
+        metadata = {'result_of_objective': self.result_of_objective,
+                    'objective': solver.objective,
+                    'best_bound': solver.best_bound,
+                    'termination_message': solver.termination_message,
+                    'optimal': solver.is_optimal,
+                    'log': solver.log.infos if isinstance(solver.log, SolverLog) else solver.log,
+                    'progress': [event.as_dict() for event in solver.progress]}
+        cache.put(key, {'solution': solution}, utils.convert_to_native_types(metadata))
+
+    def _load_solution(self, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> None:
+        variables = sorted(self.variables, key=lambda variable: variable.label)
+        _write_results(variables, _get_offsets(variables)[0], arrays['solution'])
+        self.result_of_objective = metadata['result_of_objective']
+        solver = self.solver
+        solver.objective, solver.best_bound = metadata['objective'], metadata['best_bound']
+        solver.termination_message, solver.is_optimal = metadata['termination_message'], metadata['optimal']
+        solver.log = metadata['log']
+        solver.progress = [SolverProgress(event['time'], event['objective'], event['best bound'], event['gap'],
+                                          event['nodes']) for event in metadata['progress']]
+
     def results(self) -> Dict[str, Numeric]:
         return {variable.label: variable.result for variable in self.variables}
 
@@ -516,7 +784,10 @@ class MathModel:
                     'No. of Vars. (single)': self.nr_of_single_variables,
                     'No. of Vars. (TS)': len(self.ts_variables),
                 },
-                'Solver Log': self.solver.log.infos if isinstance(self.solver.log, SolverLog) else self.solver.log}
+                'Solver Log': self.solver.log.infos if isinstance(self.solver.log, SolverLog) else self.solver.log,
+                'Presolve': self.presolved_model.report if self.presolved_model is not None else None,
+                'Scaling': self.scaled_model.report if self.scaled_model is not None else None,
+                'Solver Progress': [event.as_dict() for event in self.solver.progress]}
 
     @property
     def variables(self) -> List[Variable]:
@@ -567,6 +838,767 @@ class MathModel:
         return sum([eq.length for eq in self.inequations])
 
 
+class MatrixModel:
+    """
+    Compiled, array based form of a MathModel:
+
+        min   c * x
+        s.t.  row_lower   <= A * x <= row_upper
+              lower_bound <=   x   <= upper_bound
+              x[integrality == 1] binary
+
+    All Variables are stacked into one global column vector, all Equations and Inequations into one global row vector
+    (in the same order as they are translated to a ModelingLanguage). A is assembled with NumPy from Summand.indices and
+    Summand.factor_vec, with one vectorized step per Summand and no work per single row. Duplicate entries are summed.
+    The matrix is stored in CSR format (matrix_start, matrix_index, matrix_value).
+
+    Parameters
+    ----------
+    math_model : MathModel
+        The model to compile.
+    """
+    def __init__(self, math_model: MathModel):
+        self.variables: List[Variable] = list(math_model.variables)
+        self.constraints: List[_Constraint] = list(math_model.equations) + list(math_model.inequations)
+        self.objective: Optional[Equation] = math_model.objective
+        self.objective_offset = 0.0  # The constant of the objective is ignored, like in the PyomoModel
+
+        # Columns
+        self.column_offsets, self.nr_of_columns = _get_offsets(self.variables)
+        self.lower_bound = np.full(self.nr_of_columns, -np.inf)
+        self.upper_bound = np.full(self.nr_of_columns, np.inf)
+        self.integrality = np.zeros(self.nr_of_columns, dtype=np.int8)
+        for variable in self.variables:
+            column_slice = self.column_slice(variable)
+            self.lower_bound[column_slice], self.upper_bound[column_slice] = _get_bounds(variable)
+            self.integrality[column_slice] = variable.is_binary
+
+        # Rows
+        self.row_offsets, self.nr_of_rows = _get_offsets(self.constraints)
+        self.row_lower = np.full(self.nr_of_rows, -np.inf)
+        self.row_upper = np.zeros(self.nr_of_rows)
+        rows, cols, values = [], [], []
+        for constraint in self.constraints:
+            row_slice = self.row_slice(constraint)
+            constant = np.asarray(constraint.constant_vector, dtype=float)
+            self.row_upper[row_slice] = constant
+            if isinstance(constraint, Equation):
+                self.row_lower[row_slice] = constant
+            for summand in constraint.summands:
+                summand_rows, summand_cols, summand_values = _get_summand_entries(
+                    summand, self.column_offsets[summand.variable], row_slice.start, constraint.length)
+                rows.append(summand_rows)
+                cols.append(summand_cols)
+                values.append(summand_values)
+
+        self.matrix_start, self.matrix_index, self.matrix_value = _coo_to_csr(
+            np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64),
+            np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64),
+            np.concatenate(values) if values else np.zeros(0),
+            self.nr_of_rows, self.nr_of_columns)
+
+        # Objective (the constant of the objective is ignored, like in the PyomoModel)
+        self.objective_vector = np.zeros(self.nr_of_columns)
+        if self.objective is not None:
+            for summand in self.objective.summands:
+                _, summand_cols, summand_values = _get_summand_entries(
+                    summand, self.column_offsets[summand.variable], 0, 1)
+                np.add.at(self.objective_vector, summand_cols, summand_values)
+
+    def column_slice(self, variable: Variable) -> slice:
+        start = self.column_offsets[variable]
+        return slice(start, start + variable.length)
+
+    def row_slice(self, constraint: _Constraint) -> slice:
+        start = self.row_offsets[constraint]
+        return slice(start, start + constraint.length)
+
+    def to_csc(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Returns the constraint matrix in CSC format as (start, index, value) """
+        rows = np.repeat(np.arange(self.nr_of_rows, dtype=np.int64), np.diff(self.matrix_start))
+        order = np.lexsort((rows, self.matrix_index))
+        start = np.zeros(self.nr_of_columns + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.matrix_index, minlength=self.nr_of_columns), out=start[1:])
+        return start, rows[order], self.matrix_value[order]
+
+    def write_results(self, solution: np.ndarray) -> None:
+        """
+        Writes a solution vector (one value per column) into the .result of every Variable.
+        Binary Variables are stored as int8, Variables of length 1 as scalars.
+        """
+        _write_results(self.variables, self.column_offsets, solution)
+
+    def fingerprint(self, extra: Any = None) -> str:
+        """
+        Returns a stable hash of the model: Labels and lengths of all Variables and Constraints, all coefficients,
+        bounds and right hand sides. extra (json serializable, e.g. solver settings) is included.
+        The hash doesn't depend on the order of the Variables and Constraints (which may differ between two builds of
+        the same system), as everything is hashed in the canonical order (sorted by label).
+        """
+        columns, rows = self.canonical_columns(), self._canonical_positions(self.constraints, self.row_offsets)
+        entry_rows = rows[np.repeat(np.arange(self.nr_of_rows), np.diff(self.matrix_start))]
+        entry_cols = columns[self.matrix_index]
+        order = np.lexsort((entry_cols, entry_rows))
+        parts = sorted((part.label, part.length) for part in self.variables + self.constraints)
+        return hash_arrays(*(self._to_canonical(array, columns) for array in
+                             (self.lower_bound, self.upper_bound, self.integrality, self.objective_vector)),
+                           *(self._to_canonical(array, rows) for array in (self.row_lower, self.row_upper)),
+                           entry_rows[order], entry_cols[order], self.matrix_value[order],
+                           extra={'parts': parts, 'extra': extra})
+
+    def canonical_columns(self) -> np.ndarray:
+        """ Returns the position of each column in the canonical order (Variables sorted by label) """
+        return self._canonical_positions(self.variables, self.column_offsets)
+
+    @staticmethod
+    def _canonical_positions(parts: List[Union[Variable, _Constraint]], offsets: Dict) -> np.ndarray:
+        positions = np.zeros(sum(part.length for part in parts), dtype=np.int64)
+        position = 0
+        for part in sorted(parts, key=lambda part: part.label):
+            positions[offsets[part]:offsets[part] + part.length] = np.arange(position, position + part.length)
+            position += part.length
+        return positions
+
+    @staticmethod
+    def _to_canonical(array: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        canonical = np.empty_like(array)
+        canonical[positions] = array
+        return canonical
+
+    def start_entries(self, start_values: Dict[str, Numeric]) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the (column index, value) of all known (not NaN) start values. Binary values are rounded """
+        indices, values = [], []
+        for variable in self.variables:
+            if variable.label not in start_values:
+                continue
+            value = np.broadcast_to(np.asarray(start_values[variable.label], dtype=float), variable.length)
+            known = ~np.isnan(value)
+            indices.append(np.arange(self.column_slice(variable).start, self.column_slice(variable).stop)[known])
+            values.append(np.round(value[known]) if variable.is_binary else value[known])
+        if not indices:
+            return np.array([], dtype=np.int64), np.array([])
+        return np.concatenate(indices), np.concatenate(values)
+
+    @property
+    def nr_of_nonzeros(self) -> int:
+        return len(self.matrix_value)
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} with {self.nr_of_rows} rows, {self.nr_of_columns} columns and '
+                f'{self.nr_of_nonzeros} nonzeros>')
+
+
+class PresolvedModel:
+    """
+    Reduced form of a MatrixModel, with the same array attributes, so it can be passed to a solver in its place:
+
+    1. Fixed columns (lower_bound == upper_bound) are substituted into the row bounds and the objective offset.
+    2. Rows with a single nonzero become bounds of their column (rounded for integer columns).
+    3. Rows without nonzeros are dropped (after checking their feasibility).
+
+    These steps are repeated as long as new columns get fixed by tightened bounds.
+    postsolve() restores the solution vector of the original MatrixModel, report summarizes what was removed.
+
+    Parameters
+    ----------
+    matrix_model : MatrixModel
+        The model to reduce. It is not modified.
+    tolerance : float
+        Tolerance for fixing columns and checking the feasibility.
+    """
+    def __init__(self, matrix_model: MatrixModel, tolerance: float = 1e-9):
+        m = self.original = matrix_model
+        lower, upper = m.lower_bound.copy(), m.upper_bound.copy()
+        row_lower, row_upper = m.row_lower.copy(), m.row_upper.copy()
+        is_integer = m.integrality > 0
+        rows = np.repeat(np.arange(m.nr_of_rows), np.diff(m.matrix_start))
+        cols, values = m.matrix_index, m.matrix_value
+
+        active_entries = values != 0
+        active_rows = np.ones(m.nr_of_rows, dtype=bool)
+        self.fixed_columns = np.zeros(m.nr_of_columns, dtype=bool)
+        self.fixed_values = np.zeros(m.nr_of_columns)
+        self.bound_rows = np.zeros(m.nr_of_rows, dtype=bool)
+        self.empty_rows = np.zeros(m.nr_of_rows, dtype=bool)
+
+        newly_fixed = upper - lower <= tolerance
+        while True:
+            self.fixed_values[newly_fixed] = np.where(is_integer[newly_fixed],
+                                                      np.round(lower[newly_fixed]), lower[newly_fixed])
+            self.fixed_columns |= newly_fixed
+            substituted = active_entries & newly_fixed[cols]
+            contribution = np.bincount(rows[substituted], values[substituted] * self.fixed_values[cols[substituted]],
+                                       minlength=m.nr_of_rows)
+            row_lower -= contribution
+            row_upper -= contribution
+            active_entries &= ~newly_fixed[cols]
+
+            entries_per_row = np.bincount(rows[active_entries], minlength=m.nr_of_rows)
+            empty = active_rows & (entries_per_row == 0)
+            infeasible = empty & ((row_lower > tolerance) | (row_upper < -tolerance))
+            if np.any(infeasible):
+                raise Exception(f'The model is infeasible: Constraint "{self._label_of_row(np.argmax(infeasible))}" '
+                                f'has no variables left, but a nonzero right hand side')
+            self.empty_rows |= empty
+
+            singleton = active_rows & (entries_per_row == 1)
+            entries = active_entries & singleton[rows]
+            row, col, factor = rows[entries], cols[entries], values[entries]
+            with np.errstate(invalid='ignore'):
+                np.maximum.at(lower, col, np.where(factor > 0, row_lower[row], row_upper[row]) / factor)
+                np.minimum.at(upper, col, np.where(factor > 0, row_upper[row], row_lower[row]) / factor)
+            lower[is_integer] = np.ceil(lower[is_integer] - tolerance)
+            upper[is_integer] = np.floor(upper[is_integer] + tolerance)
+            if np.any(lower > upper + tolerance):
+                column = np.argmax(lower > upper + tolerance)
+                raise Exception(f'The model is infeasible: The bounds of Variable "{self._label_of_column(column)}" '
+                                f'contradict each other ({lower[column]} > {upper[column]})')
+            self.bound_rows |= singleton
+            active_rows &= ~(empty | singleton)
+
+            newly_fixed = ~self.fixed_columns & (upper - lower <= tolerance)
+            if not np.any(newly_fixed):
+                break
+
+        # Assembling the reduced model
+        self.kept_columns = np.flatnonzero(~self.fixed_columns)
+        self.kept_rows = np.flatnonzero(active_rows)
+        self.column_map = np.full(m.nr_of_columns, -1, dtype=np.int64)  # Original column -> reduced column
+        self.column_map[self.kept_columns] = np.arange(len(self.kept_columns))
+        row_map = np.cumsum(active_rows) - 1
+        entries = active_entries & active_rows[rows]
+
+        self.nr_of_columns, self.nr_of_rows = len(self.kept_columns), len(self.kept_rows)
+        self.lower_bound, self.upper_bound = lower[self.kept_columns], upper[self.kept_columns]
+        self.integrality = m.integrality[self.kept_columns]
+        self.row_lower, self.row_upper = row_lower[self.kept_rows], row_upper[self.kept_rows]
+        self.matrix_start = np.zeros(self.nr_of_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_map[rows[entries]], minlength=self.nr_of_rows), out=self.matrix_start[1:])
+        self.matrix_index = self.column_map[cols[entries]]
+        self.matrix_value = values[entries]
+        self.objective_vector = m.objective_vector[self.kept_columns]
+        self.objective_offset = m.objective_offset + float(m.objective_vector @ self.fixed_values)
+
+    def postsolve(self, solution: np.ndarray) -> np.ndarray:
+        """ Returns the solution vector of the original MatrixModel for a solution vector of the reduced model """
+        full_solution = self.fixed_values.copy()
+        full_solution[self.kept_columns] = solution
+        return full_solution
+
+    def reduce_entries(self, index: np.ndarray, value: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Maps (column index, value) pairs of the original MatrixModel to the reduced model """
+        kept = self.column_map[index] >= 0
+        return self.column_map[index][kept], value[kept]
+
+    @property
+    def nr_of_nonzeros(self) -> int:
+        return len(self.matrix_value)
+
+    @property
+    def report(self) -> Dict[str, Union[str, Dict[str, int]]]:
+        """ Summary of the reductions, with the number of removed single columns and rows per Variable/Constraint """
+        m = self.original
+        return {'Columns': f'{m.nr_of_columns} -> {self.nr_of_columns}',
+                'Rows': f'{m.nr_of_rows} -> {self.nr_of_rows}',
+                'Nonzeros': f'{m.nr_of_nonzeros} -> {self.nr_of_nonzeros}',
+                'Fixed variables': _count_per_part(m.variables, m.column_offsets, self.fixed_columns),
+                'Rows turned into bounds': _count_per_part(m.constraints, m.row_offsets, self.bound_rows),
+                'Empty rows': _count_per_part(m.constraints, m.row_offsets, self.empty_rows)}
+
+    def _label_of_column(self, column: int) -> str:
+        return next(var.label for var in self.original.variables if column in range(
+            self.original.column_offsets[var], self.original.column_offsets[var] + var.length))
+
+    def _label_of_row(self, row: int) -> str:
+        return next(con.label for con in self.original.constraints if row in range(
+            self.original.row_offsets[con], self.original.row_offsets[con] + con.length))
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} with {self.nr_of_rows} rows, {self.nr_of_columns} columns and '
+                f'{self.nr_of_nonzeros} nonzeros (before: {self.original.nr_of_rows} rows, '
+                f'{self.original.nr_of_columns} columns and {self.original.nr_of_nonzeros} nonzeros)>')
+
+
+class ScaledModel:
+    """
+    Scaled form of a MatrixModel (or PresolvedModel), with the same array attributes, so it can be passed to a solver
+    in its place. Rows and continuous columns are scaled by powers of 2 (exact in floating point arithmetic):
+
+        A' = R * A * C,   x = C * x',   c' = C * c,   row bounds' = R * row bounds,   bounds' = bounds / C
+
+    The factors are chosen by iterated geometric mean scaling, which moves the absolute coefficients of each row and
+    column close to 1. Integer columns are not scaled. postsolve() restores the solution vector of the original
+    MatrixModel, report compares the ranges of the coefficients before and after scaling.
+
+    Parameters
+    ----------
+    model : MatrixModel or PresolvedModel
+        The model to scale. It is not modified.
+    iterations : int
+        Number of alternating row and column scaling passes.
+    """
+    def __init__(self, model: Union[MatrixModel, PresolvedModel], iterations: int = 4):
+        self.original = model
+        rows = np.repeat(np.arange(model.nr_of_rows), np.diff(model.matrix_start))
+        cols = model.matrix_index
+        nonzero = model.matrix_value != 0
+        log_values = np.log2(np.abs(model.matrix_value[nonzero]))
+        rows_nz, cols_nz = rows[nonzero], cols[nonzero]
+        is_integer = model.integrality > 0
+
+        row_log, column_log = np.zeros(model.nr_of_rows), np.zeros(model.nr_of_columns)
+        for _ in range(iterations):
+            row_log -= _midrange_per_index(rows_nz, log_values + row_log[rows_nz] + column_log[cols_nz],
+                                           model.nr_of_rows)
+            column_shift = _midrange_per_index(cols_nz, log_values + row_log[rows_nz] + column_log[cols_nz],
+                                               model.nr_of_columns)
+            column_log -= np.where(is_integer, 0, column_shift)
+        self.row_scale, self.column_scale = 2.0 ** np.round(row_log), 2.0 ** np.round(column_log)
+
+        self.nr_of_columns, self.nr_of_rows = model.nr_of_columns, model.nr_of_rows
+        self.lower_bound = model.lower_bound / self.column_scale
+        self.upper_bound = model.upper_bound / self.column_scale
+        self.integrality = model.integrality
+        self.row_lower, self.row_upper = model.row_lower * self.row_scale, model.row_upper * self.row_scale
+        self.matrix_start, self.matrix_index = model.matrix_start, model.matrix_index
+        self.matrix_value = model.matrix_value * self.row_scale[rows] * self.column_scale[cols]
+        self.objective_vector = model.objective_vector * self.column_scale
+        self.objective_offset = model.objective_offset
+
+    def postsolve(self, solution: np.ndarray) -> np.ndarray:
+        """ Returns the solution vector of the original MatrixModel for a solution vector of the scaled model """
+        solution = solution * self.column_scale
+        return self.original.postsolve(solution) if isinstance(self.original, PresolvedModel) else solution
+
+    def reduce_entries(self, index: np.ndarray, value: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Maps (column index, value) pairs of the original MatrixModel to the scaled model """
+        if isinstance(self.original, PresolvedModel):
+            index, value = self.original.reduce_entries(index, value)
+        return index, value / self.column_scale[index]
+
+    @property
+    def nr_of_nonzeros(self) -> int:
+        return len(self.matrix_value)
+
+    @property
+    def report(self) -> Dict[str, str]:
+        """ Ranges of the absolute coefficients of the matrix before and after scaling """
+        return {'Matrix range': f'{_format_range(self.original.matrix_value)} -> {_format_range(self.matrix_value)}',
+                'Row scale range': _format_range(self.row_scale),
+                'Column scale range': _format_range(self.column_scale)}
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} of {self.original!r}: {self.report}>'
+
+
+class CoefficientDiagnostics:
+    """
+    Ranges of the absolute nonzero values in a MatrixModel: the coefficients of the matrix, the finite bounds of the
+    Variables, the right hand sides of the Constraints and the objective coefficients. Ranges spanning many orders of
+    magnitude (e.g. big-M terms next to tiny epsilons) slow down solvers and make their results unreliable.
+
+    Each range is a tuple (min, max), or None if there are no such values.
+
+    Attributes:
+        ranges (dict): The ranges of the whole model, by kind ('Matrix', 'Bounds', 'RHS', 'Objective').
+        constraints (dict): The ranges of 'Matrix' and 'RHS' per Constraint label.
+        variables (dict): The ranges of 'Matrix' (of its column), 'Bounds' and 'Objective' per Variable label.
+        owners (dict): The ranges of 'Matrix' and 'RHS' (of its Constraints) and 'Bounds' (of its Variables) per
+            owner (e.g. Element), if owners were given.
+
+    Parameters
+    ----------
+    matrix_model : MatrixModel
+        The model to analyse.
+    owners : dict, optional
+        Maps the labels of Variables and Constraints to the label of their owner (e.g. an Element).
+    """
+    def __init__(self, matrix_model: MatrixModel, owners: Optional[Dict[str, str]] = None):
+        m = matrix_model
+        row_part = np.repeat(np.arange(len(m.constraints)), [con.length for con in m.constraints])
+        column_part = np.repeat(np.arange(len(m.variables)), [var.length for var in m.variables])
+        entry_rows = np.repeat(np.arange(m.nr_of_rows), np.diff(m.matrix_start))
+
+        matrix_of_constraints = _ranges_per_index(row_part[entry_rows], m.matrix_value, len(m.constraints))
+        matrix_of_variables = _ranges_per_index(column_part[m.matrix_index], m.matrix_value, len(m.variables))
+        rhs = _ranges_per_index(np.tile(row_part, 2), np.concatenate([m.row_lower, m.row_upper]), len(m.constraints))
+        bounds = _ranges_per_index(np.tile(column_part, 2), np.concatenate([m.lower_bound, m.upper_bound]),
+                                   len(m.variables))
+        objective = _ranges_per_index(column_part, m.objective_vector, len(m.variables))
+
+        self.constraints: Dict[str, Dict[str, Optional[Tuple[float, float]]]] = {
+            con.label: {'Matrix': matrix_of_constraints[i], 'RHS': rhs[i]} for i, con in enumerate(m.constraints)}
+        self.variables: Dict[str, Dict[str, Optional[Tuple[float, float]]]] = {
+            var.label: {'Matrix': matrix_of_variables[i], 'Bounds': bounds[i], 'Objective': objective[i]}
+            for i, var in enumerate(m.variables)}
+        self.ranges: Dict[str, Optional[Tuple[float, float]]] = {
+            'Matrix': _merge_ranges(matrix_of_constraints), 'Bounds': _merge_ranges(bounds),
+            'RHS': _merge_ranges(rhs), 'Objective': _merge_ranges(objective)}
+
+        self.owners: Dict[str, Dict[str, Optional[Tuple[float, float]]]] = {}
+        for parts, kinds in [(self.constraints, ('Matrix', 'RHS')), (self.variables, ('Bounds',))]:
+            for label, part_ranges in parts.items():
+                if (owners or {}).get(label) is None:
+                    continue
+                owner_ranges = self.owners.setdefault(owners[label], {'Matrix': None, 'Bounds': None, 'RHS': None})
+                for kind in kinds:
+                    owner_ranges[kind] = _merge_ranges([owner_ranges[kind], part_ranges[kind]])
+
+    def worst_constraints(self, n: int = 10) -> List[Tuple[str, float]]:
+        """ The n Constraints with the widest range of coefficients, as (label, max / min) """
+        ratios = [(label, ranges['Matrix'][1] / ranges['Matrix'][0])
+                  for label, ranges in self.constraints.items() if ranges['Matrix'] is not None]
+        return sorted(ratios, key=lambda item: item[1], reverse=True)[:n]
+
+    def largest_coefficients(self, n: int = 10) -> List[Tuple[str, float]]:
+        """ The n Constraints with the largest absolute coefficient or right hand side, as (label, value) """
+        largest = [(label, max(r[1] for r in ranges.values() if r is not None))
+                   for label, ranges in self.constraints.items() if any(r is not None for r in ranges.values())]
+        return sorted(largest, key=lambda item: item[1], reverse=True)[:n]
+
+    def largest_bounds(self, n: int = 10) -> List[Tuple[str, float]]:
+        """ The n Variables with the largest finite absolute bound, as (label, value) """
+        largest = [(label, ranges['Bounds'][1]) for label, ranges in self.variables.items()
+                   if ranges['Bounds'] is not None]
+        return sorted(largest, key=lambda item: item[1], reverse=True)[:n]
+
+    def report(self, n: int = 10) -> Dict[str, Dict[str, str]]:
+        """ Summary of the ranges (in total and per owner) and the n worst offenders of each kind """
+        return {'Ranges': {kind: _format_range(value) for kind, value in self.ranges.items()},
+                'Ranges per owner': {owner: {kind: _format_range(value) for kind, value in ranges.items()}
+                                     for owner, ranges in self.owners.items()},
+                'Widest coefficient ranges (max / min)': {label: f'{ratio:.1e}'
+                                                          for label, ratio in self.worst_constraints(n)},
+                'Largest coefficients': {label: f'{value:.1e}' for label, value in self.largest_coefficients(n)},
+                'Largest bounds': {label: f'{value:.1e}' for label, value in self.largest_bounds(n)}}
+
+    def __str__(self):
+        report = self.report()
+        lines = [f'{" Coefficient Ranges ":#^80}']
+        lines += [f'{kind:<12}: {value}' for kind, value in report['Ranges'].items()]
+        for title in ['Widest coefficient ranges (max / min)', 'Largest coefficients', 'Largest bounds']:
+            lines += [f'{title}:'] + [f'  {label:<60}: {value}' for label, value in report[title].items()]
+        return '\n'.join(lines)
+
+
+def _ranges_per_index(index: np.ndarray, values: np.ndarray,
+                      length: int) -> List[Optional[Tuple[float, float]]]:
+    """ Returns the range (min, max) of the absolute, finite, nonzero values per index. None if there are none """
+    values = np.abs(values)
+    valid = np.isfinite(values) & (values > 0)
+    minimum, maximum = np.full(length, np.inf), np.full(length, -np.inf)
+    np.minimum.at(minimum, index[valid], values[valid])
+    np.maximum.at(maximum, index[valid], values[valid])
+    return [(float(low), float(high)) if np.isfinite(low) else None for low, high in zip(minimum, maximum)]
+
+
+def _merge_ranges(ranges: List[Optional[Tuple[float, float]]]) -> Optional[Tuple[float, float]]:
+    ranges = [r for r in ranges if r is not None]
+    if not ranges:
+        return None
+    return min(r[0] for r in ranges), max(r[1] for r in ranges)
+
+
+def _format_range(values: Union[np.ndarray, Optional[Tuple[float, float]]]) -> str:
+    """ Formats a range (min, max) or the range of the absolute nonzero values of an array """
+    if isinstance(values, np.ndarray):
+        values = _merge_ranges(_ranges_per_index(np.zeros(len(values), dtype=np.int64), values, 1))
+    if values is None:
+        return 'empty'
+    return f'[{values[0]:.1e}, {values[1]:.1e}] (ratio {values[1] / values[0]:.1e})'
+
+
+def _midrange_per_index(index: np.ndarray, values: np.ndarray, length: int) -> np.ndarray:
+    """ Returns (max + min) / 2 of the values per index, 0 for indices without values """
+    minimum, maximum = np.full(length, np.inf), np.full(length, -np.inf)
+    np.minimum.at(minimum, index, values)
+    np.maximum.at(maximum, index, values)
+    has_values = np.isfinite(minimum)
+    midrange = np.zeros(length)
+    midrange[has_values] = (minimum[has_values] + maximum[has_values]) / 2
+    return midrange
+
+
+def _count_per_part(parts: List[Union[Variable, _Constraint]],
+                    offsets: Dict[Union[Variable, _Constraint], int],
+                    mask: np.ndarray) -> Dict[str, int]:
+    """ Counts the True values of mask per Variable or Constraint. Only parts with a count > 0 are returned """
+    counts = {part.label: int(np.count_nonzero(mask[offsets[part]:offsets[part] + part.length])) for part in parts}
+    return {label: count for label, count in counts.items() if count > 0}
+
+
+def _get_offsets(parts: List[Union[Variable, _Constraint]]) -> Tuple[Dict[Union[Variable, _Constraint], int], int]:
+    """ Returns the position of the first single element of each Variable (column) or constraint (row) """
+    lengths = np.array([part.length for part in parts], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    return {part: int(start) for part, start in zip(parts, starts[:-1])}, int(starts[-1])
+
+
+def _is_equal(a: Any, b: Any) -> bool:
+    """ Fast comparison of scalars, ranges and arrays (like bounds, factors or indices). Unequal types count as unequal """
+    if a is b:
+        return True
+    if a is None or b is None:
+        return False
+    if isinstance(a, range) and isinstance(b, range) or np.isscalar(a) and np.isscalar(b):
+        return a == b
+    return np.array_equal(a, b)
+
+
+def _get_bounds(variable: Variable) -> Tuple[np.ndarray, np.ndarray]:
+    """ Returns the lower and upper bound of every single element of a Variable. Fixed values set both bounds """
+    lower = np.array(utils.as_vector(variable.lower_bound, variable.length), dtype=float)  # None -> NaN
+    upper = np.array(utils.as_vector(variable.upper_bound, variable.length), dtype=float)
+    lower[np.isnan(lower)] = -np.inf
+    upper[np.isnan(upper)] = np.inf
+    if variable.fixed:
+        fixed_value = np.array(utils.as_vector(variable.fixed_value, variable.length), dtype=float)
+        is_fixed = ~np.isnan(fixed_value)
+        lower[is_fixed] = fixed_value[is_fixed]
+        upper[is_fixed] = fixed_value[is_fixed]
+    if variable.is_binary:
+        lower, upper = np.maximum(lower, 0), np.minimum(upper, 1)
+    return lower, upper
+
+
+def _get_summand_entries(summand: Summand,
+                         column_start: int,
+                         row_start: int,
+                         nr_of_rows: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Returns the (row, column, value) entries of a Summand inside a constraint with nr_of_rows rows """
+    indices = np.asarray(summand.indices, dtype=np.int64)
+    factors = np.asarray(summand.factor_vec, dtype=float)
+    rows = np.arange(row_start, row_start + nr_of_rows, dtype=np.int64)
+    if isinstance(summand, SumOfSummand):  # every row holds the whole sum
+        factors = np.broadcast_to(factors, indices.shape)
+        return (np.repeat(rows, len(indices)),
+                np.tile(column_start + indices, nr_of_rows),
+                np.tile(factors, nr_of_rows))
+    if summand.length == 1:  # Scalar summand is used in every single row
+        return rows, np.full(nr_of_rows, column_start + indices[0]), np.full(nr_of_rows, factors[0])
+    if len(indices) == 1:
+        return rows, np.full(nr_of_rows, column_start + indices[0]), factors
+    return rows, column_start + indices, factors
+
+
+def _coo_to_csr(rows: np.ndarray,
+                cols: np.ndarray,
+                values: np.ndarray,
+                nr_of_rows: int,
+                nr_of_columns: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Converts COO entries to CSR (start, index, value). Duplicate entries are summed, explicit zeros are kept. """
+    nr_of_columns = max(nr_of_columns, 1)
+    keys = rows * nr_of_columns + cols
+    order = np.argsort(keys, kind='stable')
+    keys, values = keys[order], values[order]
+    unique_keys, first_positions = np.unique(keys, return_index=True)
+    summed_values = np.add.reduceat(values, first_positions) if len(values) > 0 else values
+    start = np.zeros(nr_of_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(unique_keys // nr_of_columns, minlength=nr_of_rows), out=start[1:])
+    return start, unique_keys % nr_of_columns, summed_values
+
+
+def _write_results(variables: List[Variable], column_offsets: Dict[Variable, int], solution: np.ndarray) -> None:
+    solution = np.asarray(solution, dtype=float)
+    for variable in variables:
+        start = column_offsets[variable]
+        result = solution[start: start + variable.length]
+        if variable.is_binary:
+            result = np.round(result).astype(np.int8)
+        else:
+            result = result.copy()
+        variable.result = result[0] if variable.length == 1 else result
+
+
+def _format_terms(cols: np.ndarray, values: np.ndarray, terms_per_line: int = 10) -> str:
+    """ Formats a linear expression like '+1.0 x0 -2.5 x3' for the LP format """
+    terms = [f'{value:+} x{col}' for col, value in zip(cols.tolist(), values.tolist())] or ['0 x0']
+    return '\n  '.join(' '.join(terms[i:i + terms_per_line]) for i in range(0, len(terms), terms_per_line))
+
+
+def _write_lp_file(math_model: MathModel, file, chunk_size: int) -> None:
+    variables = math_model.variables
+    constraints = list(math_model.equations) + list(math_model.inequations)
+    column_offsets, nr_of_columns = _get_offsets(variables)
+
+    file.write(f'\\ Model {math_model.label}, written by flixOpt\n')
+    file.write('Minimize\n')
+    cols, values = [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+    for summand in math_model.objective.summands if math_model.objective is not None else []:
+        _, summand_cols, summand_values = _get_summand_entries(summand, column_offsets[summand.variable], 0, 1)
+        cols.append(summand_cols)
+        values.append(summand_values)
+    _, objective_cols, objective_values = _coo_to_csr(
+        np.zeros(sum(len(c) for c in cols), dtype=np.int64), np.concatenate(cols), np.concatenate(values),
+        1, nr_of_columns)
+    file.write(f' obj: {_format_terms(objective_cols, objective_values)}\n')
+
+    file.write('Subject To\n')
+    row_start = 0
+    for constraint in constraints:
+        file.write(f'\\ {constraint.label}\n')
+        rows, cols, values = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+        for summand in constraint.summands:
+            summand_rows, summand_cols, summand_values = _get_summand_entries(
+                summand, column_offsets[summand.variable], 0, constraint.length)
+            rows.append(summand_rows)
+            cols.append(summand_cols)
+            values.append(summand_values)
+        start, index, value = _coo_to_csr(np.concatenate(rows), np.concatenate(cols), np.concatenate(values),
+                                          constraint.length, nr_of_columns)
+        constant = np.asarray(constraint.constant_vector, dtype=float).tolist()
+        sense = '=' if isinstance(constraint, Equation) else '<='
+        for chunk_start in range(0, constraint.length, chunk_size):
+            lines = [f' c{row_start + i}: {_format_terms(index[start[i]:start[i + 1]], value[start[i]:start[i + 1]])}'
+                     f' {sense} {constant[i]}\n'
+                     for i in range(chunk_start, min(chunk_start + chunk_size, constraint.length))]
+            file.write(''.join(lines))
+        row_start += constraint.length
+
+    file.write('Bounds\n')
+    integer_columns = []
+    for variable in variables:
+        file.write(f'\\ {variable.label}\n')
+        lower, upper = _get_bounds(variable)
+        offset = column_offsets[variable]
+        lines = []
+        for i, (lb, ub) in enumerate(zip(lower.tolist(), upper.tolist())):
+            if lb == ub:
+                lines.append(f' x{offset + i} = {lb}\n')
+            elif lb == -np.inf and ub == np.inf:
+                lines.append(f' x{offset + i} free\n')
+            else:
+                lines.append(f' {"-inf" if lb == -np.inf else lb} <= x{offset + i} <= {"+inf" if ub == np.inf else ub}\n')
+        file.write(''.join(lines))
+        if variable.is_binary:
+            integer_columns.extend(range(offset, offset + variable.length))
+
+    if integer_columns:
+        file.write('General\n')
+        for i in range(0, len(integer_columns), 10):
+            file.write(' ' + ' '.join(f'x{col}' for col in integer_columns[i:i + 10]) + '\n')
+    file.write('End\n')
+
+
+def _write_mps_file(matrix_model: Union[MatrixModel, PresolvedModel, ScaledModel], label: str, file,
+                    chunk_size: int) -> None:
+    """
+    Writes the model in the free MPS format. The sense of each row follows from its bounds. Only a MatrixModel knows
+    the labels of its constraints, which are written as comments. The objective offset is not written.
+    All sections are written in chunks of chunk_size rows or columns. The COLUMNS section is streamed from the
+    row-wise matrix: Besides the model, only the column order of the entries (one integer per nonzero) is held in
+    memory, not a column-wise copy of the matrix.
+    """
+    m = matrix_model
+    file.write(f'* Model {label}, written by flixOpt (free MPS)\n')
+    file.write(f'NAME {"_".join(label.split()) or "flixOpt"}\n')
+
+    file.write('ROWS\n N  obj\n')
+    senses = np.where(m.row_lower == m.row_upper, 'E', np.where(m.row_upper == np.inf, 'G', 'L'))
+    if isinstance(m, MatrixModel):
+        for constraint in m.constraints:
+            file.write(f'* {constraint.label}\n')
+            row_slice = m.row_slice(constraint)
+            file.write(''.join(f' {sense}  c{row}\n' for row, sense in
+                               zip(range(row_slice.start, row_slice.stop), senses[row_slice].tolist())))
+    else:
+        for chunk in _chunks(np.arange(m.nr_of_rows), chunk_size):
+            file.write(''.join(f' {sense}  c{row}\n' for row, sense in zip(chunk.tolist(), senses[chunk].tolist())))
+
+    file.write('COLUMNS\n')
+    order = np.argsort(m.matrix_index, kind='stable')  # Entries by column, each column in the order of the rows
+    start = np.zeros(m.nr_of_columns + 1, dtype=np.int64)
+    np.cumsum(np.bincount(m.matrix_index, minlength=m.nr_of_columns), out=start[1:])
+    is_integer = False
+    for chunk_start in range(0, m.nr_of_columns, chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, m.nr_of_columns)
+        entries = order[start[chunk_start]:start[chunk_stop]]
+        index = (np.searchsorted(m.matrix_start, entries, side='right') - 1).tolist()  # The rows
+        value = m.matrix_value[entries].tolist()
+        lines = []
+        for col in range(chunk_start, chunk_stop):
+            if bool(m.integrality[col]) != is_integer:
+                is_integer = not is_integer
+                lines.append(f'    MARKER  \'MARKER\'  \'{"INTORG" if is_integer else "INTEND"}\'\n')
+            if m.objective_vector[col] != 0 or start[col] == start[col + 1]:
+                lines.append(f'    x{col}  obj  {m.objective_vector[col]}\n')
+            first, last = start[col] - start[chunk_start], start[col + 1] - start[chunk_start]
+            lines.extend(f'    x{col}  c{row}  {coefficient}\n' for row, coefficient in
+                         zip(index[first:last], value[first:last]))
+        file.write(''.join(lines))
+    if is_integer:
+        file.write('    MARKER  \'MARKER\'  \'INTEND\'\n')
+
+    file.write('RHS\n')
+    rhs = np.where(senses == 'G', m.row_lower, m.row_upper)
+    nonzero_rows = np.flatnonzero(rhs)
+    for chunk in _chunks(nonzero_rows, chunk_size):
+        file.write(''.join(f'    RHS  c{row}  {value}\n' for row, value in zip(chunk.tolist(), rhs[chunk].tolist())))
+    ranged_rows = np.flatnonzero((senses == 'L') & (m.row_lower > -np.inf))  # Both bounds, e.g. after scaling
+    if len(ranged_rows) > 0:
+        file.write('RANGES\n')
+        for chunk in _chunks(ranged_rows, chunk_size):
+            file.write(''.join(f'    RNG  c{row}  {value}\n' for row, value in
+                               zip(chunk.tolist(), (m.row_upper[chunk] - m.row_lower[chunk]).tolist())))
+
+    file.write('BOUNDS\n')
+    for chunk in _chunks(np.arange(m.nr_of_columns), chunk_size):
+        lines = []
+        for col, lb, ub, is_integer in zip(chunk.tolist(), m.lower_bound[chunk].tolist(),
+                                           m.upper_bound[chunk].tolist(), m.integrality[chunk].tolist()):
+            if lb == ub:
+                lines.append(f' FX BND  x{col}  {lb}\n')
+                continue
+            if lb == -np.inf and ub == np.inf:
+                lines.append(f' FR BND  x{col}\n')
+                continue
+            if lb == -np.inf:
+                lines.append(f' MI BND  x{col}\n')
+            elif lb != 0 or is_integer:
+                lines.append(f' LO BND  x{col}  {lb}\n')
+            if ub != np.inf:
+                lines.append(f' UP BND  x{col}  {ub}\n')
+        file.write(''.join(lines))
+    file.write('ENDATA\n')
+
+
+def _chunks(array: np.ndarray, chunk_size: int) -> List[np.ndarray]:
+    """ Splits array into consecutive parts of chunk_size elements (views, no copies) """
+    return [array[start:start + chunk_size] for start in range(0, len(array), chunk_size)]
+
+
+def _read_solution_file(path: Union[str, pathlib.Path], nr_of_columns: int) -> Tuple[str, Optional[float], np.ndarray]:
+    """
+    Reads the values of the columns x<i> from a solution file of HiGHS or CBC.
+    Returns the status, the objective value and the solution vector.
+    """
+    solution = np.zeros(nr_of_columns)
+    column_pattern = re.compile(r'x(\d+)$')
+    with open(path, 'r', encoding='utf-8') as file:
+        first_line = file.readline().strip()
+        if first_line == 'Model status':  # HiGHS
+            status, objective = file.readline().strip(), None
+            for line in file:
+                if line.startswith('Objective'):
+                    objective = float(line.split()[1])
+                elif line.startswith('# Columns'):
+                    for _ in range(int(line.split()[2])):
+                        name, value = file.readline().split()[:2]
+                        solution[int(column_pattern.match(name).group(1))] = float(value)
+                    break
+        elif ' - objective value ' in first_line:  # CBC, only non-zero columns are listed
+            status, objective = first_line.split(' - objective value ')
+            objective = float(objective)
+            for line in file:
+                parts = line.replace('**', '').split()
+                match = column_pattern.match(parts[1]) if len(parts) >= 3 else None
+                if match:
+                    solution[int(match.group(1))] = float(parts[2])
+        else:
+            raise Exception(f'Format of solution file {path} is not supported. Use HiGHS or CBC solution files.')
+    return status, objective, solution
+
+
 class SolverLog:
     """
     Parses and holds solver log information for specific solvers.
@@ -580,10 +1612,20 @@ class SolverLog:
         presolved_continuous (Optional[int]): Number of continuous variables after presolving.
         presolved_integer (Optional[int]): Number of integer variables after presolving.
         presolved_binary (Optional[int]): Number of binary variables after presolving.
+        lp_iterations (Optional[int]): Number of LP iterations (highs only).
+        nodes (Optional[int]): Number of explored branch and bound nodes (highs only).
+        gap (Optional[float]): Final relative MIP gap (highs only).
+        time_total (Optional[float]): Total solving time in seconds (highs only).
+        time_presolve (Optional[float]): Time spent in presolve in seconds (highs only).
+        time_root (Optional[float]): Time until the root node was solved, in seconds (highs only).
+        time_branch_and_bound (Optional[float]): Time spent in branch and bound after the root node (highs only).
     """
-    def __init__(self, solver_name: str, filename: str):
-        with open(filename, 'r') as file:
-            self.log = file.read()
+    def __init__(self, solver_name: str, filename: Optional[str]):
+        if filename is None:
+            self.log = ''
+        else:
+            with open(filename, 'r') as file:
+                self.log = file.read()
 
         self.solver_name = solver_name
 
@@ -594,10 +1636,18 @@ class SolverLog:
         self.presolved_continuous = None
         self.presolved_integer = None
         self.presolved_binary = None
+
+        self.lp_iterations = None
+        self.nodes = None
+        self.gap = None
+        self.time_total = None
+        self.time_presolve = None
+        self.time_root = None
+        self.time_branch_and_bound = None
         self.parse_infos()
 
     @property
-    def infos(self) -> Dict[str, Dict[str, int]]:
+    def infos(self) -> Dict[str, Dict[str, Union[int, float]]]:
         return {
             'presolved': {
                 'cols': self.presolved_cols,
@@ -606,6 +1656,15 @@ class SolverLog:
                 'binary': self.presolved_binary,
                 'rows': self.presolved_rows,
                 'nonzeros': self.presolved_nonzeros,
+            },
+            'solving': {
+                'lp iterations': self.lp_iterations,
+                'nodes': self.nodes,
+                'gap': self.gap,
+                'time total': self.time_total,
+                'time presolve': self.time_presolve,
+                'time root': self.time_root,
+                'time branch and bound': self.time_branch_and_bound,
             }
         }
 
@@ -656,6 +1715,54 @@ class SolverLog:
                 self.presolved_binary = int(match.group(2))
                 self.presolved_continuous = self.presolved_cols - self.presolved_integer
 
+        elif self.solver_name == 'highs':
+            # Only the last run is parsed, as HiGHS appends to an existing log file
+            runs = list(re.finditer(r'^(MIP|LP) has \d+ rows', self.log, re.MULTILINE))
+            log = self.log[runs[-1].start():] if runs else self.log
+
+            # string: Presolve reductions: rows 219(-316); columns 136(-328); nonzeros 721(-823)
+            match = re.search(r'Presolve reductions: rows (\d+)\(-?\d+\); columns (\d+)\(-?\d+\); '
+                              r'nonzeros (\d+)\(-?\d+\)', log)
+            if match:
+                self.presolved_rows = int(match.group(1))
+                self.presolved_cols = int(match.group(2))
+                self.presolved_nonzeros = int(match.group(3))
+
+            # string: 136 cols (69 binary, 0 integer, 0 implied int., 67 continuous, 0 domain fixed)
+            match = re.search(r'\d+ cols \((\d+) binary, (\d+) integer, (\d+) implied int\., (\d+) continuous', log)
+            if match:
+                self.presolved_binary = int(match.group(1))
+                self.presolved_integer = int(match.group(1)) + int(match.group(2)) + int(match.group(3))
+                self.presolved_continuous = int(match.group(4))
+
+            match = re.search(r'^\s*LP iterations\s+(\d+)', log, re.MULTILINE)
+            if match:
+                self.lp_iterations = int(match.group(1))
+            match = re.search(r'^\s*Nodes\s+(\d+)', log, re.MULTILINE)
+            if match:
+                self.nodes = int(match.group(1))
+            # string: Gap               0.446% (tolerance: 0.5%)
+            match = re.search(r'^\s*Gap\s+([\d.eE+-]+)%', log, re.MULTILINE)
+            if match:
+                self.gap = float(match.group(1)) / 100
+
+            # string: Timing            2.98
+            #                           0.04 (Presolve)
+            match = re.search(r'^\s*Timing\s+([\d.]+)', log, re.MULTILINE)
+            if match:
+                self.time_total = float(match.group(1))
+            match = re.search(r'^\s*([\d.]+) \(Presolve\)', log, re.MULTILINE)
+            if match:
+                self.time_presolve = float(match.group(1))
+
+            # The last line of the branch and bound table with 0 processed nodes holds the time of the root node
+            # string: L       0       0         0   0.00%   -15670.737797   -11483.696164     36.46% ... 2923     1.0s
+            root_lines = re.findall(r'^\s*[A-Za-z]?\s+0\s+\d+\s+\d+\s+[\d.]+%.*\s([\d.]+)s\s*$', log, re.MULTILINE)
+            if root_lines:
+                self.time_root = float(root_lines[-1])
+                if self.time_total is not None:
+                    self.time_branch_and_bound = max(round(self.time_total - self.time_root, 4), 0.)
+
         elif self.solver_name == 'glpk':
             logger.warning(f'{"":#^80}\n')
             logger.warning(f'{" No solver-log parsing implemented for glpk yet! ":#^80}\n')
@@ -663,6 +1770,193 @@ class SolverLog:
             raise Exception('SolverLog.parse_infos() is not defined for solver ' + self.solver_name)
 
 
+class SolverProgress:
+    """
+    A progress event of a running (MIP) solve.
+
+    Attributes:
+        time (float): Seconds since the start of the solve.
+        objective (Optional[float]): Objective of the best solution found so far (incumbent). None if there is none.
+        best_bound (Optional[float]): Best bound of the objective. None if there is none.
+        gap (Optional[float]): Relative gap between objective and best_bound. None if unknown.
+        nodes (Optional[int]): Number of explored branch and bound nodes.
+    """
+    def __init__(self,
+                 time: float,
+                 objective: Optional[float],
+                 best_bound: Optional[float],
+                 gap: Optional[float],
+                 nodes: Optional[int]):
+        self.time = time
+        self.objective = _finite_or_none(objective)
+        self.best_bound = _finite_or_none(best_bound)
+        self.gap = _finite_or_none(gap)
+        self.nodes = nodes
+
+    @classmethod
+    def from_log_line(cls, solver_name: str, line: str) -> Optional['SolverProgress']:
+        """ Parses a line of the branch and bound output of a solver log. Returns None if it is no progress line """
+        tokens = line.split()
+        if solver_name in ('highs', 'gurobi') and tokens and len(tokens[0]) == 1 and not tokens[0].isdigit():
+            tokens = tokens[1:]  # Source of a new solution (e.g. 'H' for heuristic)
+        if solver_name == 'highs':
+            # string: L       0       0         0   0.00%   -15670.737797   -11483.696164     36.46% ... 2923     1.0s
+            if len(tokens) != 12 or not tokens[0].isdigit() or not tokens[3].endswith('%') or not tokens[-1].endswith('s'):
+                return None
+            return cls(_to_float(tokens[-1][:-1]), _to_float(tokens[5]), _to_float(tokens[4]),
+                       _to_percentage(tokens[6]), int(tokens[0]))
+        elif solver_name == 'gurobi':
+            # string:      0     0 -15670.737    0   67 -11362.583 -15670.737  37.9%     -    0s
+            if (len(tokens) < 7 or not tokens[0].isdigit() or not tokens[1].isdigit() or
+                    not re.fullmatch(r'\d+s', tokens[-1])):
+                return None
+            return cls(_to_float(tokens[-1][:-1]), _to_float(tokens[-5]), _to_float(tokens[-4]),
+                       _to_percentage(tokens[-3]), int(tokens[0]))
+        elif solver_name == 'cbc':
+            # string: Cbc0010I After 100 nodes, 5 on tree, -11598.87 best solution, best possible -12505 (2.80 seconds)
+            match = re.search(r'Cbc0010I After (\d+) nodes, \d+ on tree, (\S+) best solution, '
+                              r'best possible (\S+) \(([\d.]+) seconds\)', line)
+            if match:
+                objective, best_bound = _to_float(match.group(2)), _to_float(match.group(3))
+                objective = None if objective is not None and abs(objective) >= 1e50 else objective
+                return cls(float(match.group(4)), objective, best_bound,
+                           _relative_gap(objective, best_bound), int(match.group(1)))
+        return None
+
+    def as_dict(self) -> Dict[str, Optional[Union[int, float]]]:
+        return {'time': self.time, 'objective': self.objective, 'best bound': self.best_bound,
+                'gap': self.gap, 'nodes': self.nodes}
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(time={self.time}, objective={self.objective}, '
+                f'best_bound={self.best_bound}, gap={self.gap}, nodes={self.nodes})')
+
+
+def _finite_or_none(value: Optional[float]) -> Optional[float]:
+    return float(value) if value is not None and np.isfinite(value) else None
+
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        return _finite_or_none(float(value))
+    except ValueError:
+        return None
+
+
+def _to_percentage(value: str) -> Optional[float]:
+    number = _to_float(value.rstrip('%'))
+    return number / 100 if number is not None else None
+
+
+def _relative_gap(objective: Optional[float], best_bound: Optional[float]) -> Optional[float]:
+    if objective is None or best_bound is None:
+        return None
+    return abs(objective - best_bound) / max(abs(objective), 1e-10)
+
+
+class Checkpoint:
+    """
+    Writes the incumbent (the best solution found so far) of a running solve to a json file. A killed, crashed or
+    timed out solve still leaves a usable solution this way, which can be passed as start values (a MIP start) to the
+    next solve (see Checkpoint.load()). The file is replaced atomically, so it is never left half written.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        The file to write to.
+    interval : float, optional
+        Minimal number of seconds between two writes. Incumbents found in between are written once the interval
+        passed. If None, every new incumbent is written.
+    """
+    def __init__(self, path: Union[str, pathlib.Path], interval: Optional[float] = None):
+        self.path = pathlib.Path(path)
+        self.interval = interval
+        self.nr_of_writes = 0
+        self._pending: Optional[Tuple[Callable[[], Dict[str, Numeric]], SolverProgress]] = None
+        self._last_write: Optional[float] = None
+
+    def update(self, results: Callable[[], Dict[str, Numeric]], progress: SolverProgress) -> None:
+        """
+        Registers a new incumbent and writes it, if the interval passed.
+        results is called to get the values by label of the Variables, only if the incumbent is written.
+        """
+        self._pending = (results, progress)
+        self.flush()
+
+    def flush(self, force: bool = False) -> None:
+        """ Writes the pending incumbent, if the interval passed since the last write (or if force is True) """
+        if self._pending is None:
+            return
+        now = timeit.default_timer()
+        if not force and self.interval is not None and self._last_write is not None and (
+                now - self._last_write < self.interval):
+            return
+        import json
+        results, progress = self._pending
+        temporary_path = self.path.with_name(f'{self.path.name}.tmp')
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump({'progress': progress.as_dict(), 'results': utils.convert_to_native_types(results())}, file)
+        temporary_path.replace(self.path)
+        self._pending, self._last_write = None, now
+        self.nr_of_writes += 1
+        logger.debug(f'Wrote checkpoint with objective {progress.objective} to {self.path}')
+
+    @staticmethod
+    def load(path: Union[str, pathlib.Path]) -> Dict[str, np.ndarray]:
+        """ Returns the values of a checkpoint by the label of the Variables, e.g. to be used as start values """
+        import json
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        logger.info(f'Loaded checkpoint from {path} with objective {data["progress"]["objective"]}')
+        return {label: np.asarray(value, dtype=float) for label, value in data['results'].items()}
+
+
+class _LogTail:
+    """
+    Context manager, which reads the lines a solver appends to its log file in a background thread and
+    reports them as SolverProgress to the Solver. Used for solvers without a callback API.
+    """
+    def __init__(self, solver: 'Solver', solver_name: str, interval: float = 0.5):
+        self.solver = solver
+        self.solver_name = solver_name
+        self.interval = interval
+        self.path = pathlib.Path(solver.logfile_name) if solver.logfile_name is not None else None
+        self._position = 0
+        self._rest = ''
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        if self.path is not None:
+            self._position = self.path.stat().st_size if self.path.exists() else 0  # Skip prior runs
+            self.solver.progress = []
+            self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        if self.path is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._read()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._read()
+
+    def _read(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as file:
+            file.seek(self._position)
+            text = self._rest + file.read()
+            self._position = file.tell()
+        *lines, self._rest = text.split('\n')
+        for line in lines:
+            event = SolverProgress.from_log_line(self.solver_name, line)
+            if event is not None:
+                self.solver.report_progress(event)
+
+
 class Solver(ABC):
     """
     Abstract base class for solvers.
@@ -675,7 +1969,20 @@ class Solver(ABC):
         objective (Optional[float]): Objective value from the solution.
         best_bound (Optional[float]): Best bound from the solver.
         termination_message (Optional[str]): Solver's termination message.
+        is_optimal (Optional[bool]): Whether the last solve proved optimality (within the mip_gap). None if unknown.
+        solution (Optional[np.ndarray]): Column values of the last solve. Only set for array based modeling
+            languages ('highspy'). None if no solution was found.
+        progress (List[SolverProgress]): Trajectory of incumbent and best bound of the last solve.
+            Only events with a changed incumbent or bound are kept.
+        progress_callback (Optional[Callable[[SolverProgress], Optional[bool]]]): Called with every progress
+            event during the solve. If it returns True, the solve is interrupted (only supported with 'highspy'),
+            e.g. to stop stagnating runs early.
+        incumbent_callback (Optional[Callable[[np.ndarray, SolverProgress], None]]): Called with the column values
+            of every new incumbent (of the model passed to the solver) and its progress event, e.g. to write
+            checkpoints. Only supported with 'highspy'.
     """
+    _option_names: Tuple[str, ...] = ('mip_gap',)  # The attributes influencing the solution (see .settings)
+
     def __init__(self,
                  mip_gap: float,
                  solver_output_to_console: bool,
@@ -688,7 +1995,12 @@ class Solver(ABC):
         self.objective: Optional[float] = None
         self.best_bound: Optional[float] = None
         self.termination_message: Optional[str] = None
+        self.is_optimal: Optional[bool] = None
         self.log: Optional[str, SolverLog] = None
+        self.solution: Optional[np.ndarray] = None
+        self.progress: List[SolverProgress] = []
+        self.progress_callback: Optional[Callable[[SolverProgress], Optional[bool]]] = None
+        self.incumbent_callback: Optional[Callable[[np.ndarray, SolverProgress], None]] = None
 
         self._solver = None
         self._results: Optional[float, str] = None
@@ -696,6 +2008,24 @@ class Solver(ABC):
     def solve(self, modeling_language: 'ModelingLanguage'):
         raise NotImplementedError(f' Solving is not possible with this Abstract class')
 
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """
+        The options of the solver, which influence the solution (e.g. used as key for caching solutions).
+        The results of a solve (like is_optimal) are not part of it, so the same instance can be used again.
+        """
+        return {'solver': self.__class__.__name__, **{name: getattr(self, name) for name in self._option_names}}
+
+    def report_progress(self, event: SolverProgress) -> bool:
+        """
+        Records a progress event (if incumbent or bound changed) and passes it to the progress_callback.
+        Returns True if the solve should be interrupted.
+        """
+        if not self.progress or (self.progress[-1].objective, self.progress[-1].best_bound) != (
+                event.objective, event.best_bound):
+            self.progress.append(event)
+        return bool(self.progress_callback(event)) if self.progress_callback is not None else False
+
     def __repr__(self):
         return (f"{self.__class__.__name__}("
                 f"mip_gap={self.mip_gap}, "
@@ -715,6 +2045,8 @@ class GurobiSolver(Solver):
         time_limit_seconds (int): Time limit for the solver. After this time, the solver takes the currently
         best solution, ignoring the mip_gap.
     """
+    _option_names = ('mip_gap', 'time_limit_seconds')
+
     def __init__(self,
                  mip_gap: float = 0.01,
                  time_limit_seconds: int = 300,
@@ -727,18 +2059,19 @@ class GurobiSolver(Solver):
     def solve(self, modeling_language: 'ModelingLanguage'):
         if isinstance(modeling_language, PyomoModel):
             self._solver = pyo.SolverFactory('gurobi')
-            self._results = self._solver.solve(
-                modeling_language.model, tee=self.solver_output_to_console, keepfiles=True, logfile=self.logfile_name,
-                options={"mipgap": self.mip_gap, "TimeLimit": self.time_limit_seconds}
-            )
+            with _LogTail(self, 'gurobi'):
+                self._results = self._solver.solve(
+                    modeling_language.model, tee=self.solver_output_to_console, keepfiles=True,
+                    logfile=self.logfile_name, options={"mipgap": self.mip_gap, "TimeLimit": self.time_limit_seconds},
+                    warmstart=modeling_language.warm_start
+                )
 
             self.objective = modeling_language.model.objective.expr()
             self.termination_message = self._results.solver.termination_message
             self.best_bound = self._results.problem.lower_bound
 
-            from pyomo.opt import SolverStatus, TerminationCondition
-            if not (self._results.solver.status == SolverStatus.ok and
-                    self._results.solver.termination_condition == TerminationCondition.optimal):
+            self.is_optimal = _is_optimal(self._results)
+            if not self.is_optimal:
                 logger.warning(f'Solver ended with status {self._results.solver.status} and '
                                f'termination condition {self._results.solver.termination_condition}')
             try:
@@ -767,6 +2100,8 @@ class CplexSolver(Solver):
         time_limit_seconds (int): Time limit for the solver. After this time, the solver takes the currently
         best solution, ignoring the mip_gap.
     """
+    _option_names = ('mip_gap', 'time_limit_seconds')
+
     def __init__(self,
                  mip_gap: float = 0.01,
                  time_limit_seconds: int = 300,
@@ -781,11 +2116,13 @@ class CplexSolver(Solver):
             self._solver = pyo.SolverFactory('cplex')
             self._results = self._solver.solve(
                 modeling_language.model, tee=self.solver_output_to_console, keepfiles=True, logfile=self.logfile_name,
-                options={"mipgap": self.mip_gap, "timelimit": self.time_limit_seconds}
+                options={"mipgap": self.mip_gap, "timelimit": self.time_limit_seconds},
+                warmstart=modeling_language.warm_start
             )
 
             self.objective = modeling_language.model.objective.expr()
             self.termination_message: Optional[str] = f'Not Implemented for {self.__class__.__name__} yet'
+            self.is_optimal = _is_optimal(self._results)
             self.best_bound = self._results['Problem'][0]['Lower bound']
             self.log = f'Not Implemented for {self.__class__.__name__} yet'
         else:
@@ -801,42 +2138,147 @@ class HighsSolver(Solver):
         time_limit_seconds (int): Time limit for the solver. After this time, the solver takes the currently
         best solution, ignoring the mip_gap.
         threads (int): Number of threads to use for the solver.
+        random_seed (int): Seed of the random number generator of HiGHS. Influences the branch and bound.
+        presolve (bool): Whether HiGHS presolves the model.
     """
+    _option_names = ('mip_gap', 'time_limit_seconds', 'threads', 'random_seed', 'presolve')
+
     def __init__(self,
                  mip_gap: float = 0.01,
                  time_limit_seconds: int = 300,
                  logfile_name: str = 'highs.log',
                  solver_output_to_console: bool = True,
                  threads: int = 4,
+                 random_seed: int = 0,
+                 presolve: bool = True,
                  ):
         super().__init__(mip_gap, solver_output_to_console, logfile_name)
         self.time_limit_seconds = time_limit_seconds
         self.threads = threads
+        self.random_seed = random_seed
+        self.presolve = presolve
+
+    @property
+    def options(self) -> Dict[str, Union[str, int, float, bool]]:
+        """ The options passed to HiGHS """
+        options = {"mip_rel_gap": self.mip_gap,
+                   "time_limit": float(self.time_limit_seconds),
+                   "threads": self.threads,
+                   "random_seed": self.random_seed,
+                   "parallel": "on",
+                   "presolve": "on" if self.presolve else "off",
+                   "output_flag": True}
+        if self.logfile_name is not None:
+            options["log_file"] = str(self.logfile_name)
+        return options
 
     def solve(self, modeling_language: 'ModelingLanguage'):
         if isinstance(modeling_language, PyomoModel):
             from pyomo.contrib import appsi
+            _prepare_highs_scheduler(self.threads)
             self._solver = appsi.solvers.Highs()
-            self._solver.highs_options = {"mip_rel_gap": self.mip_gap,
-                                          "time_limit": self.time_limit_seconds,
-                                          "log_file": str(self.logfile_name),
-                                          #"log_to_console": self.solver_output_to_console,
-                                          "threads": self.threads,
-                                          "parallel": "on",
-                                          "presolve": "on",
-                                          "output_flag": True}
+            self._solver.highs_options = self.options
             self._solver.config.stream_solver = True
+            self._solver.config.warmstart = modeling_language.warm_start
 
-            self._results = self._solver.solve(modeling_language.model)  # HiGHS writes logs to stdout/stderr, so we capture them here
+            with _LogTail(self, 'highs'):
+                self._results = self._solver.solve(modeling_language.model)  # HiGHS writes logs to stdout/stderr, so we capture them here
 
             self.objective = modeling_language.model.objective.expr()
             self.termination_message: Optional[str] = self._results.termination_condition.name
-            if not self.termination_message == 'optimal':
+            self.is_optimal = self.termination_message == 'optimal'
+            if not self.is_optimal:
                 logger.warning(f'Solution is not optimal. Termination Message: "{self.termination_message}"')
             self.best_bound = self._results.best_objective_bound
-            self.log = f'Not Implemented for {self.__class__.__name__} yet'
+            try:
+                self.log = SolverLog('highs', self.logfile_name)
+            except Exception as e:
+                self.log = None
+                logger.warning(f'SolverLog could not be loaded. {e}')
+        elif isinstance(modeling_language, HighspyModel):
+            import highspy
+            highs = modeling_language.highs
+            for option, value in {**self.options, "log_to_console": self.solver_output_to_console}.items():
+                highs.setOptionValue(option, value)
+            _prepare_highs_scheduler(self.threads)
+
+            self.progress = []
+            t_start = timeit.default_timer()
+
+            def create_progress(event) -> SolverProgress:
+                data = event.data_out
+                return SolverProgress(round(timeit.default_timer() - t_start, 4), data.objective_function_value,
+                                      data.mip_dual_bound, data.mip_gap, int(data.mip_node_count))
+
+            def on_incumbent(event):
+                progress = create_progress(event)
+                if self.incumbent_callback is not None:
+                    self.incumbent_callback(np.array(event.data_out.mip_solution), progress)
+                self.report_progress(progress)
+
+            def on_interrupt(event):
+                if self.report_progress(create_progress(event)):
+                    logger.warning(f'Solve was interrupted by the progress_callback')
+                    event.interrupt()
+
+            highs.cbMipImprovingSolution.subscribe(on_incumbent)
+            highs.cbMipInterrupt.subscribe(on_interrupt)
+            try:
+                highs.run()
+            finally:
+                highs.cbMipImprovingSolution.unsubscribe(on_incumbent)
+                highs.cbMipInterrupt.unsubscribe(on_interrupt)
+            time_total = round(timeit.default_timer() - t_start, 4)
+
+            model_status = highs.getModelStatus()
+            info = highs.getInfo()
+            self.termination_message = highs.modelStatusToString(model_status)
+            self.is_optimal = model_status == highspy.HighsModelStatus.kOptimal
+            if not self.is_optimal:
+                logger.warning(f'Solution is not optimal. Termination Message: "{self.termination_message}"')
+            self.objective = info.objective_function_value
+            self.best_bound = info.mip_dual_bound if info.mip_node_count >= 0 else info.objective_function_value
+            self.solution = np.asarray(highs.getSolution().col_value) if info.primal_solution_status else None
+            try:
+                self.log = SolverLog('highs', self.logfile_name)
+            except Exception as e:
+                self.log = SolverLog('highs', None)
+                logger.warning(f'SolverLog could not be loaded. {e}')
+            # The values of the info are more reliable than the parsed ones
+            self.log.time_total = time_total
+            if info.mip_node_count >= 0:
+                self.log.nodes = int(info.mip_node_count)
+                self.log.gap = float(info.mip_gap)
+            elif info.simplex_iteration_count >= 0:
+                self.log.lp_iterations = int(info.simplex_iteration_count)
+            if self.log.time_root is not None:
+                self.log.time_branch_and_bound = max(round(self.log.time_total - self.log.time_root, 4), 0.)
         else:
-            raise NotImplementedError(f'Only Pyomo is implemented for HIGHS solver.')
+            raise NotImplementedError(f'Only Pyomo and highspy are implemented for HIGHS solver.')
+
+
+def _is_optimal(results) -> bool:
+    """ Whether the results of a pyomo SolverFactory prove optimality """
+    from pyomo.opt import SolverStatus, TerminationCondition
+    return (results.solver.status == SolverStatus.ok and
+            results.solver.termination_condition == TerminationCondition.optimal)
+
+
+_highs_scheduler_lock = threading.Lock()
+_highs_scheduler_threads: Optional[int] = None
+
+
+def _prepare_highs_scheduler(threads: int) -> None:
+    """
+    HiGHS refuses to run, if another instance already initialized its (process wide) scheduler with other threads.
+    The scheduler is only reset if the number of threads changes, as this breaks instances solving in other threads.
+    """
+    global _highs_scheduler_threads
+    import highspy
+    with _highs_scheduler_lock:
+        if _highs_scheduler_threads is not None and _highs_scheduler_threads != threads:
+            highspy.Highs.resetGlobalScheduler(True)
+        _highs_scheduler_threads = threads
 
 
 class CbcSolver(Solver):
@@ -848,6 +2290,8 @@ class CbcSolver(Solver):
         time_limit_seconds (int): Time limit for the solver. After this time, the solver takes the currently
         best solution, ignoring the mip_gap.
     """
+    _option_names = ('mip_gap', 'time_limit_seconds')
+
     def __init__(self,
                  mip_gap: float = 0.01,
                  time_limit_seconds: int = 300,
@@ -860,12 +2304,15 @@ class CbcSolver(Solver):
     def solve(self, modeling_language: 'ModelingLanguage'):
         if isinstance(modeling_language, PyomoModel):
             self._solver = pyo.SolverFactory('cbc')
-            self._results = self._solver.solve(
-                modeling_language.model, tee=self.solver_output_to_console, keepfiles=True, logfile=self.logfile_name,
-                options={"ratio": self.mip_gap, "sec": self.time_limit_seconds}
-            )
+            with _LogTail(self, 'cbc'):
+                self._results = self._solver.solve(
+                    modeling_language.model, tee=self.solver_output_to_console, keepfiles=True,
+                    logfile=self.logfile_name, options={"ratio": self.mip_gap, "sec": self.time_limit_seconds},
+                    warmstart=modeling_language.warm_start
+                )
             self.objective = modeling_language.model.objective.expr()
             self.termination_message: Optional[str] = f'Not Implemented for {self.__class__.__name__} yet'
+            self.is_optimal = _is_optimal(self._results)
             self.best_bound = self._results['Problem'][0]['Lower bound']
             self.log = f'Not Implemented for {self.__class__.__name__} yet'
         else:
@@ -891,6 +2338,7 @@ class GlpkSolver(Solver):
 
             self.objective = modeling_language.model.objective.expr()
             self.termination_message = self._results['Solver'][0]['Status']
+            self.is_optimal = _is_optimal(self._results)
             self.best_bound = self._results['Problem'][0]['Lower bound']
             try:
                 self.log = SolverLog('glpk', self.logfile_name)
@@ -901,6 +2349,195 @@ class GlpkSolver(Solver):
             raise NotImplementedError(f'Only Pyomo is implemented for Cbc solver.')
 
 
+class PortfolioSolver(Solver):
+    """
+    Solves the same model with several solver configurations concurrently, each in a separate process.
+    The first optimal result is taken and the other processes are terminated. If no configuration proves optimality
+    (e.g. all hit their time limit), the best solution found is taken.
+    Supports HighsSolver (e.g. with different random_seed or presolve) and CbcSolver (if the executable "cbc" is
+    available, the model is passed as MPS file). All of them solve the model passed to HiGHS otherwise (presolved and
+    scaled, if enabled), so their solutions are restored the same way. Only implemented for the modeling language
+    'highspy'.
+
+    Attributes:
+        solvers (List[Solver]): The solver configurations to race against each other.
+        winner (Optional[Solver]): The configuration, whose result was taken.
+    """
+    def __init__(self,
+                 solvers: List[Solver],
+                 solver_output_to_console: bool = False,
+                 ):
+        super().__init__(min(solver.mip_gap for solver in solvers), solver_output_to_console, None)
+        self.solvers = solvers
+        self.winner: Optional[Solver] = None
+
+    def solve(self, modeling_language: 'ModelingLanguage'):
+        if not isinstance(modeling_language, HighspyModel):
+            raise NotImplementedError(f'Only highspy is implemented for the {self.__class__.__name__}.')
+        import multiprocessing
+        import tempfile
+        from queue import Empty
+        context = multiprocessing.get_context('spawn')  # Forking a process with running HiGHS threads is unsafe
+        queue = context.Queue()
+
+        with tempfile.TemporaryDirectory() as folder:
+            processes = {}
+            for i, solver in enumerate(self.solvers):
+                job = self._create_job(solver, modeling_language, folder, i)
+                if job is not None:
+                    processes[i] = context.Process(target=_solve_in_process, args=(i, job, queue), daemon=True)
+                    processes[i].start()
+            if not processes:
+                raise Exception(f'None of the solvers of the {self.__class__.__name__} can be used')
+
+            t_start = timeit.default_timer()
+            results = {}
+            while len(results) < len(processes):
+                try:
+                    index, result = queue.get(timeout=0.1)
+                except Empty:
+                    for index, process in processes.items():
+                        if index not in results and process.exitcode is not None:  # Ended without a result
+                            results[index] = {'status': f'Process failed with exit code {process.exitcode}',
+                                              'optimal': False, 'objective': None, 'best_bound': None,
+                                              'solution': None}
+                    continue
+                result['time'] = round(timeit.default_timer() - t_start, 2)
+                results[index] = result
+                logger.info(f'{self.solvers[index]!r} finished after {result["time"]} seconds: "{result["status"]}"')
+                if result['optimal']:
+                    break
+
+            for index, process in processes.items():
+                if process.is_alive():
+                    _terminate_process(process)
+                else:
+                    process.join()
+
+        feasible = {i: result for i, result in results.items() if result['solution'] is not None}
+        optimal = [i for i, result in feasible.items() if result['optimal']]
+        winner = optimal[0] if optimal else min(feasible, key=lambda i: feasible[i]['objective'], default=None)
+        self.log = {'Runs': {repr(self.solvers[i]): {'status': result['status'], 'time': result.get('time'),
+                                                    'objective': result['objective']}
+                             for i, result in results.items()}}
+        if winner is None:
+            self.winner, self.solution, self.objective, self.best_bound = None, None, None, None
+            self.termination_message, self.is_optimal = 'No solution found', False
+            logger.warning(f'None of the solvers of the {self.__class__.__name__} found a solution')
+            return
+
+        self.winner = self.solvers[winner]
+        result = results[winner]
+        self.termination_message, self.is_optimal = result['status'], result['optimal']
+        self.objective, self.best_bound = result['objective'], result['best_bound']
+        self.solution = result['solution']  # Of the model passed to the solver (like with HighsSolver)
+        self.log['Winner'] = repr(self.winner)
+        if not result['optimal']:
+            logger.warning(f'Solution is not optimal. Termination Message: "{self.termination_message}"')
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return {'solver': self.__class__.__name__, 'solvers': [solver.settings for solver in self.solvers]}
+
+    def _create_job(self, solver: Solver, modeling_language: 'HighspyModel', folder: str,
+                    index: int) -> Optional[Dict[str, Any]]:
+        """ Returns everything a process needs to solve the model with solver, as picklable dict """
+        if isinstance(solver, HighsSolver):
+            m = modeling_language.solver_model
+            arrays = {name: getattr(m, name) for name in
+                      ('lower_bound', 'upper_bound', 'row_lower', 'row_upper', 'matrix_start', 'matrix_index',
+                       'matrix_value', 'objective_vector', 'integrality')}
+            options = {**solver.options, 'log_to_console': self.solver_output_to_console}
+            options.pop('log_file', None)
+            return {'solver': 'highs', 'options': options, 'offset': m.objective_offset, **arrays}
+        elif isinstance(solver, CbcSolver):
+            import shutil
+            executable = shutil.which('cbc')
+            if executable is None:
+                logger.warning(f'{solver!r} is skipped, as the executable "cbc" was not found')
+                return None
+            m = modeling_language.solver_model  # Like for HiGHS, so the solution is mapped back the same way
+            path = pathlib.Path(folder) / f'model_{index}.mps'
+            with open(path, 'w', encoding='utf-8') as file:
+                _write_mps_file(m, 'Portfolio', file, 10_000)
+            return {'solver': 'cbc', 'executable': executable, 'path': str(path),
+                    'solution_path': str(path.with_suffix('.sol')), 'nr_of_columns': m.nr_of_columns,
+                    'offset': m.objective_offset, 'mip_gap': solver.mip_gap,
+                    'time_limit_seconds': solver.time_limit_seconds, 'output_to_console': self.solver_output_to_console}
+        logger.warning(f'{solver!r} is skipped, as it is not supported by the {self.__class__.__name__}')
+        return None
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(solvers={self.solvers!r}, winner={self.winner!r})'
+
+
+def _solve_in_process(index: int, job: Dict[str, Any], queue) -> None:
+    """ Solves a job of the PortfolioSolver and puts (index, result) into queue. Runs in a separate process """
+    import os
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()  # Allows terminating the process together with its subprocesses (cbc)
+    if job['solver'] == 'highs':
+        import highspy
+        highs = highspy.Highs()
+        for option, value in job['options'].items():
+            highs.setOptionValue(option, value)
+        highs.passModel(len(job['lower_bound']), len(job['row_lower']), len(job['matrix_value']),
+                        int(highspy.MatrixFormat.kRowwise), int(highspy.ObjSense.kMinimize), job['offset'],
+                        job['objective_vector'], job['lower_bound'], job['upper_bound'],
+                        job['row_lower'], job['row_upper'], job['matrix_start'].astype(np.int32),
+                        job['matrix_index'].astype(np.int32), job['matrix_value'], job['integrality'].astype(np.int32))
+        highs.run()
+        model_status, info = highs.getModelStatus(), highs.getInfo()
+        has_solution = bool(info.primal_solution_status)
+        queue.put((index, {
+            'status': highs.modelStatusToString(model_status),
+            'optimal': model_status == highspy.HighsModelStatus.kOptimal,
+            'objective': info.objective_function_value if has_solution else None,
+            'best_bound': info.mip_dual_bound if info.mip_node_count >= 0 else info.objective_function_value,
+            'solution': np.asarray(highs.getSolution().col_value) if has_solution else None}))
+    elif job['solver'] == 'cbc':
+        import subprocess
+        subprocess.run([job['executable'], job['path'], 'ratio', str(job['mip_gap']), 'sec',
+                        str(job['time_limit_seconds']), 'solve', 'solution', job['solution_path']],
+                       stdout=None if job['output_to_console'] else subprocess.DEVNULL, check=False)
+        try:
+            status, objective, solution = _read_solution_file(job['solution_path'], job['nr_of_columns'])
+        except Exception as e:
+            queue.put((index, {'status': f'No solution: {e}', 'optimal': False, 'objective': None,
+                               'best_bound': None, 'solution': None}))
+            return
+        has_solution = not status.lower().startswith(('infeasible', 'unbounded'))
+        queue.put((index, {'status': status, 'optimal': status.lower().startswith('optimal'),
+                           'objective': objective + job['offset'] if has_solution else None, 'best_bound': None,
+                           'solution': solution if has_solution else None}))
+
+
+def _terminate_process(process, timeout: float = 5) -> None:
+    """
+    Terminates a process of the PortfolioSolver including its subprocesses (if supported by the OS) and waits for it.
+    A process, which is still starting up, is not yet the leader of its process group. It is terminated on its own.
+    If it does not end within the timeout, it is killed.
+    """
+    import os
+    import signal
+
+    def send(signal_number: Optional[int], fallback: Callable[[], None]):
+        try:
+            if signal_number is not None and hasattr(os, 'killpg') and os.getpgid(process.pid) == process.pid:
+                os.killpg(process.pid, signal_number)
+                return
+        except ProcessLookupError:
+            pass
+        fallback()
+
+    send(getattr(signal, 'SIGTERM', None), process.terminate)
+    process.join(timeout)
+    if process.is_alive():
+        logger.warning(f'Process {process.pid} did not terminate within {timeout} seconds. It is killed')
+        send(getattr(signal, 'SIGKILL', None), process.kill)
+        process.join(timeout)
+
+
 class ModelingLanguage(ABC):
     """
     Abstract base class for modeling languages.
@@ -915,6 +2552,24 @@ class ModelingLanguage(ABC):
     def solve(self, math_model: MathModel, solver: Solver):
         raise NotImplementedError
 
+    def update_model(self, math_model: MathModel) -> bool:
+        """
+        Updates the already translated model with the data of math_model, which must have the same structure as the
+        MathModel translated before. Returns False if updating is not supported or the structure differs.
+        """
+        return False
+
+    def update_parts(self,
+                     math_model: MathModel,
+                     variables: List[Variable],
+                     constraints: List[Union[Equation, Inequation]]) -> bool:
+        """
+        Updates the bounds of the given Variables and the factors and constants of the given constraints (and the
+        objective) in the already translated math_model, without touching the other parts. The structure of the
+        parts must not have changed. Returns False if updating is not supported or the structure differs.
+        """
+        return False
+
 
 class PyomoModel(ModelingLanguage):
     """
@@ -924,6 +2579,7 @@ class PyomoModel(ModelingLanguage):
     Attributes:
         model: Pyomo model instance.
         mapping (dict): Maps variables and equations to Pyomo components.
+        warm_start (bool): Whether start values were set for the next solve (passed on as warmstart to the solver).
         _counter (int): Counter for naming Pyomo components.
     """
 
@@ -933,11 +2589,13 @@ class PyomoModel(ModelingLanguage):
         self.model = pyo.ConcreteModel(name="(Minimalbeispiel)")
 
         self.mapping: Dict[Union[Variable, Equation], Any] = {}  # Mapping to Pyomo Units
+        self.warm_start = False
         self._counter = 0
 
     def solve(self, math_model: MathModel, solver: Solver):
         if self._counter == 0:
             raise Exception(f' First, call .translate_model(). Else PyomoModel cant solve()')
+        self.warm_start = self._set_start_values(math_model)
         solver.solve(self)
 
         # write results
@@ -956,6 +2614,22 @@ class PyomoModel(ModelingLanguage):
             else:
                 variable.result = result
 
+    def _set_start_values(self, math_model: MathModel) -> bool:
+        """ Sets the start values of the MathModel as values of the (not fixed) pyomo variables. True if any was set """
+        nr_of_values = 0
+        for variable in math_model.variables:
+            if variable.label not in math_model.start_values:
+                continue
+            values = utils.as_vector(math_model.start_values[variable.label], variable.length)
+            pyomo_comp = self.mapping[variable]
+            for i in variable.indices:
+                if np.isnan(values[i]) or pyomo_comp[i].fixed:
+                    continue
+                pyomo_comp[i].set_value(round(values[i]) if variable.is_binary else float(values[i]),
+                                        skip_validation=True)
+                nr_of_values += 1
+        return nr_of_values > 0
+
     def translate_model(self, math_model: MathModel):
         for variable in math_model.variables:   # Variablen erstellen
             logger.debug(f'VAR {variable.label} gets translated to Pyomo')
@@ -982,7 +2656,10 @@ class PyomoModel(ModelingLanguage):
 
         # Register in pyomo-model:
         self._register_pyomo_comp(pyomo_comp, variable)
+        self._set_bounds(variable)
 
+    def _set_bounds(self, variable: Variable):
+        pyomo_comp = self.mapping[variable]
         lower_bound_vector = utils.as_vector(variable.lower_bound, variable.length)
         upper_bound_vector = utils.as_vector(variable.upper_bound, variable.length)
         fixed_value_vector = utils.as_vector(variable.fixed_value, variable.length)
@@ -993,6 +2670,7 @@ class PyomoModel(ModelingLanguage):
                 pyomo_comp[i].value = fixed_value_vector[i]
                 pyomo_comp[i].fix()
             else:
+                pyomo_comp[i].unfix()  # If it was fixed before an update
                 # Boundaries:
                 pyomo_comp[i].setlb(lower_bound_vector[i])  # min
                 pyomo_comp[i].setub(upper_bound_vector[i])  # max
@@ -1006,12 +2684,7 @@ class PyomoModel(ModelingLanguage):
 
         def linear_sum_pyomo_rule(model, i):
             """ This function is needed for pyomoy internal construction of Constraints."""
-            lhs = 0
-            aSummand: Summand
-            for aSummand in equation.summands:
-                lhs += self._summand_math_expression(aSummand, i)  # i-te Gleichung (wenn Skalar, dann wird i ignoriert)
-            rhs = constant_vector[i]
-            return lhs == rhs
+            return self._linear_sum(equation, i) == constant_vector[i]
 
         pyomo_comp = pyo.Constraint(range(equation.length),
                                          rule=linear_sum_pyomo_rule)  # Nebenbedingung erstellen
@@ -1027,13 +2700,7 @@ class PyomoModel(ModelingLanguage):
 
         def linear_sum_pyomo_rule(model, i):
             """ This function is needed for pyomoy internal construction of Constraints."""
-            lhs = 0
-            aSummand: Summand
-            for aSummand in inequation.summands:
-                lhs += self._summand_math_expression(aSummand, i)  # i-te Gleichung (wenn Skalar, dann wird i ignoriert)
-            rhs = constant_vector[i]
-
-            return lhs <= rhs
+            return self._linear_sum(inequation, i) <= constant_vector[i]
 
         pyomo_comp = pyo.Constraint(range(inequation.length),
                                          rule=linear_sum_pyomo_rule)  # Nebenbedingung erstellen
@@ -1058,6 +2725,32 @@ class PyomoModel(ModelingLanguage):
         self.model.objective = pyo.Objective(rule=_rule_linear_sum_skalar, sense=pyo.minimize)
         self.mapping[objective] = self.model.objective
 
+    def update_parts(self,
+                     math_model: MathModel,
+                     variables: List[Variable],
+                     constraints: List[Union[Equation, Inequation]]) -> bool:
+        """ Sets the bounds of the pyomo variables and replaces the expressions of the single pyomo constraints """
+        for variable in variables:
+            self._set_bounds(variable)
+        for constraint in constraints:
+            if constraint is math_model.objective:
+                self.model.objective.set_value(self._linear_sum(constraint))
+                continue
+            pyomo_comp, constant_vector = self.mapping[constraint], constraint.constant_vector
+            for i in range(constraint.length):
+                if isinstance(constraint, Equation):
+                    pyomo_comp[i].set_value(self._linear_sum(constraint, i) == constant_vector[i])
+                else:
+                    pyomo_comp[i].set_value(self._linear_sum(constraint, i) <= constant_vector[i])
+        return True
+
+    def _linear_sum(self, constraint: Union[Equation, Inequation], at_index: int = 0) -> 'pyo.Expression':
+        """ The left side of the constraint number at_index (if all summands are scalars, at_index is ignored) """
+        lhs = 0
+        for summand in constraint.summands:
+            lhs += self._summand_math_expression(summand, at_index)
+        return lhs
+
     def _summand_math_expression(self, summand: Summand, at_index: int = 0) -> 'pyo.Expression':
         pyomo_variable = self.mapping[summand.variable]
         if isinstance(summand, SumOfSummand):
@@ -1075,3 +2768,247 @@ class PyomoModel(ModelingLanguage):
         self._counter += 1  # Counter to guarantee unique names
         self.model.add_component(f'{part.label}__{self._counter}', pyomo_comp)
         self.mapping[part] = pyomo_comp
+
+
+class HighspyModel(ModelingLanguage):
+    """
+    Array based modeling language for the HiGHS solver (highspy).
+    The MathModel is compiled into a MatrixModel, which is passed to HiGHS as a whole via passModel().
+    No expression objects are created, and the solution vector is written back to the Variables by slicing.
+    If MathModel.presolve is True, a PresolvedModel is passed instead and the solution is restored by postsolve().
+    If MathModel.scaling is True, the (presolved) model is scaled by a ScaledModel, which also unscales the solution.
+
+    Attributes:
+        highs (highspy.Highs): The persistent HiGHS instance holding the model.
+        matrix_model (MatrixModel): The compiled model, which maps the columns of HiGHS to the Variables.
+        solver_model (MatrixModel, PresolvedModel or ScaledModel): The model passed to HiGHS.
+    """
+
+    def __init__(self):
+        import highspy
+        self.highs = highspy.Highs()
+        self.matrix_model: Optional[MatrixModel] = None
+        self.solver_model: Optional[Union[MatrixModel, PresolvedModel, ScaledModel]] = None
+
+    def translate_model(self, math_model: MathModel):
+        self.matrix_model = math_model.compile()
+        self.solver_model = self._create_solver_model(math_model)
+        self._pass_model(self.solver_model)
+
+    def _pass_model(self, m: Union[MatrixModel, PresolvedModel, ScaledModel]):
+        import highspy
+        self.highs.passModel(m.nr_of_columns, m.nr_of_rows, m.nr_of_nonzeros,
+                             int(highspy.MatrixFormat.kRowwise), int(highspy.ObjSense.kMinimize), m.objective_offset,
+                             m.objective_vector, m.lower_bound, m.upper_bound, m.row_lower, m.row_upper,
+                             m.matrix_start.astype(np.int32), m.matrix_index.astype(np.int32), m.matrix_value,
+                             m.integrality.astype(np.int32))
+
+    def update_model(self, math_model: MathModel) -> bool:
+        """
+        Compiles math_model and compares it to the MatrixModel passed to HiGHS before. If the structure (dimensions,
+        sparsity pattern and integrality) is identical, only the changed costs, bounds and coefficients are changed in
+        the existing HiGHS instance.
+        """
+        if self.solver_model is None:
+            return False
+        return self._update_solver_model(math_model, math_model.compile())
+
+    def update_parts(self,
+                     math_model: MathModel,
+                     variables: List[Variable],
+                     constraints: List[Union[Equation, Inequation]]) -> bool:
+        """
+        Writes the bounds of the given Variables and the factors and constants of the given constraints into the
+        MatrixModel. Only the columns and rows of these parts are computed, and only the changed values are passed to
+        HiGHS. With presolve or scaling, the model passed to HiGHS is derived again from the MatrixModel and compared.
+        Returns False if the sparsity pattern of a constraint changed.
+        """
+        m = self.matrix_model
+        if m is None:
+            return False
+        changed_columns, changed_rows, changed_entries = [], [], []
+        for variable in variables:
+            column_slice = m.column_slice(variable)
+            lower_bound, upper_bound = _get_bounds(variable)
+            changed = (m.lower_bound[column_slice] != lower_bound) | (m.upper_bound[column_slice] != upper_bound)
+            m.lower_bound[column_slice], m.upper_bound[column_slice] = lower_bound, upper_bound
+            changed_columns.append(column_slice.start + np.flatnonzero(changed))
+        changed_costs = np.zeros(0, dtype=np.int64)
+        for constraint in constraints:
+            if constraint is m.objective:
+                objective_vector = np.zeros(m.nr_of_columns)
+                for summand in constraint.summands:
+                    _, summand_cols, summand_values = _get_summand_entries(
+                        summand, m.column_offsets[summand.variable], 0, 1)
+                    np.add.at(objective_vector, summand_cols, summand_values)
+                changed_costs = np.flatnonzero(m.objective_vector != objective_vector)
+                m.objective_vector = objective_vector
+                continue
+            row_slice = m.row_slice(constraint)
+            constant = np.asarray(constraint.constant_vector, dtype=float)
+            row_lower = constant if isinstance(constraint, Equation) else m.row_lower[row_slice]
+            changed = (m.row_lower[row_slice] != row_lower) | (m.row_upper[row_slice] != constant)
+            m.row_lower[row_slice], m.row_upper[row_slice] = row_lower, constant
+            changed_rows.append(row_slice.start + np.flatnonzero(changed))
+
+            entries = [_get_summand_entries(summand, m.column_offsets[summand.variable], 0, constraint.length)
+                       for summand in constraint.summands]
+            rows, cols, values = (np.concatenate(parts) for parts in zip(*entries)) if entries else \
+                (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+            start, index, value = _coo_to_csr(rows, cols, values, constraint.length, m.nr_of_columns)
+            first, last = m.matrix_start[row_slice.start], m.matrix_start[row_slice.stop]
+            if not (np.array_equal(start, m.matrix_start[row_slice.start:row_slice.stop + 1] - first) and
+                    np.array_equal(index, m.matrix_index[first:last])):
+                return False
+            changed_entries.append(first + np.flatnonzero(m.matrix_value[first:last] != value))
+            m.matrix_value[first:last] = value
+
+        if self.solver_model is not m:  # Presolved or scaled
+            return self._update_solver_model(math_model, m)
+        changed_entries = np.concatenate(changed_entries) if changed_entries else np.zeros(0, dtype=np.int64)
+        if self._pass_again(m, changed_entries):
+            return True
+        if len(changed_costs) > 0:
+            self.highs.changeColsCost(len(changed_costs), changed_costs.astype(np.int32), m.objective_vector[changed_costs])
+        changed = np.concatenate(changed_columns) if changed_columns else np.zeros(0, dtype=np.int64)
+        if len(changed) > 0:
+            self.highs.changeColsBounds(len(changed), changed.astype(np.int32),
+                                        m.lower_bound[changed], m.upper_bound[changed])
+        changed = np.concatenate(changed_rows) if changed_rows else np.zeros(0, dtype=np.int64)
+        if len(changed) > 0:
+            self.highs.changeRowsBounds(len(changed), changed.astype(np.int32), m.row_lower[changed], m.row_upper[changed])
+        self._change_coefficients(m, changed_entries)
+        return True
+
+    def _update_solver_model(self, math_model: MathModel, matrix_model: MatrixModel) -> bool:
+        """
+        Derives the model for HiGHS from matrix_model (presolved and scaled, if set) and compares it to the one passed
+        before. If the structure (dimensions, sparsity pattern and integrality) is identical, only the changed costs,
+        bounds and coefficients are changed in the existing HiGHS instance.
+        """
+        old, new = self.solver_model, self._create_solver_model(math_model, matrix_model)
+        if type(old) is not type(new) or not _has_same_structure(old, new):
+            return False
+        old_unscaled = old.original if isinstance(old, ScaledModel) else old
+        new_unscaled = new.original if isinstance(new, ScaledModel) else new
+        if type(old_unscaled) is not type(new_unscaled):
+            return False
+        if isinstance(new_unscaled, PresolvedModel) and not (
+                np.array_equal(old_unscaled.kept_columns, new_unscaled.kept_columns) and
+                np.array_equal(old_unscaled.kept_rows, new_unscaled.kept_rows)):
+            return False
+
+        self.matrix_model, self.solver_model = matrix_model, new
+        changed_entries = np.flatnonzero(old.matrix_value != new.matrix_value)
+        if self._pass_again(new, changed_entries):
+            return True
+        changed = np.flatnonzero(old.objective_vector != new.objective_vector)
+        if len(changed) > 0:
+            self.highs.changeColsCost(len(changed), changed.astype(np.int32), new.objective_vector[changed])
+        if old.objective_offset != new.objective_offset:
+            self.highs.changeObjectiveOffset(new.objective_offset)
+
+        changed = np.flatnonzero((old.lower_bound != new.lower_bound) | (old.upper_bound != new.upper_bound))
+        if len(changed) > 0:
+            self.highs.changeColsBounds(len(changed), changed.astype(np.int32),
+                                        new.lower_bound[changed], new.upper_bound[changed])
+
+        changed = np.flatnonzero((old.row_lower != new.row_lower) | (old.row_upper != new.row_upper))
+        if len(changed) > 0:
+            self.highs.changeRowsBounds(len(changed), changed.astype(np.int32),
+                                        new.row_lower[changed], new.row_upper[changed])
+
+        self._change_coefficients(new, changed_entries)
+        return True
+
+    def _pass_again(self, model: Union[MatrixModel, PresolvedModel, ScaledModel], entries: np.ndarray) -> bool:
+        """
+        HiGHS can only change single coefficients. If the given entries (positions in model.matrix_value) are a large
+        share of the matrix, passing the whole model again is faster. Returns True if the model was passed again.
+        """
+        if len(entries) <= _SHARE_OF_COEFFICIENTS_TO_PASS_AGAIN * model.nr_of_nonzeros:
+            return False
+        logger.debug(f'{len(entries)} of {model.nr_of_nonzeros} coefficients changed. The model is passed again')
+        self._pass_model(model)
+        return True
+
+    def _change_coefficients(self, model: Union[MatrixModel, PresolvedModel, ScaledModel], entries: np.ndarray):
+        """ Passes the coefficients of the given entries (positions in model.matrix_value) to HiGHS, row by row """
+        rows = np.searchsorted(model.matrix_start, entries, side='right') - 1
+        change_coefficient = self.highs.changeCoeff
+        for row, col, value in zip(rows.tolist(), model.matrix_index[entries].tolist(),
+                                   model.matrix_value[entries].tolist()):
+            change_coefficient(row, col, value)
+
+    def solve(self, math_model: MathModel, solver: Solver):
+        if self.matrix_model is None:
+            raise Exception(f' First, call .translate_model(). Else HighspyModel cant solve()')
+        if math_model.start_values:
+            index, value = self.matrix_model.start_entries(math_model.start_values)
+            if isinstance(self.solver_model, (PresolvedModel, ScaledModel)):
+                index, value = self.solver_model.reduce_entries(index, value)
+            if len(index) > 0:
+                self.highs.setSolution(len(index), index.astype(np.int32), value)
+                logger.info(f'Passed {len(index)} of {self.solver_model.nr_of_columns} start values to HiGHS')
+        checkpoint = math_model.checkpoint
+        if checkpoint is None:
+            solver.solve(self)
+        else:
+            incumbent_callback, progress_callback = solver.incumbent_callback, solver.progress_callback
+
+            def on_incumbent(values: np.ndarray, progress: SolverProgress):
+                checkpoint.update(lambda: self._results_by_label(values), progress)
+                if incumbent_callback is not None:
+                    incumbent_callback(values, progress)
+
+            def on_progress(progress: SolverProgress) -> bool:
+                checkpoint.flush()  # Writes a pending incumbent, once the interval passed
+                return bool(progress_callback(progress)) if progress_callback is not None else False
+
+            solver.incumbent_callback, solver.progress_callback = on_incumbent, on_progress
+            try:
+                solver.solve(self)
+            finally:
+                solver.incumbent_callback, solver.progress_callback = incumbent_callback, progress_callback
+                checkpoint.flush(force=True)
+
+        if solver.solution is None:
+            logger.warning(f'No solution found. Results are not available.')
+            return
+        math_model.result_of_objective = solver.objective
+        solution = solver.solution
+        if isinstance(self.solver_model, (PresolvedModel, ScaledModel)):
+            solution = self.solver_model.postsolve(solution)
+        self.matrix_model.write_results(solution)
+
+    def _results_by_label(self, solution: np.ndarray) -> Dict[str, np.ndarray]:
+        """ Maps a solution vector of the model passed to HiGHS to the labels of the Variables """
+        if isinstance(self.solver_model, (PresolvedModel, ScaledModel)):
+            solution = self.solver_model.postsolve(solution)
+        return {variable.label: solution[self.matrix_model.column_slice(variable)]
+                for variable in self.matrix_model.variables}
+
+    def _create_solver_model(self, math_model: MathModel, matrix_model: Optional[MatrixModel] = None
+                             ) -> Union[MatrixModel, PresolvedModel, ScaledModel]:
+        model = matrix_model or self.matrix_model
+        math_model.presolved_model, math_model.scaled_model = None, None
+        if math_model.presolve:
+            t_start = timeit.default_timer()
+            model = math_model.presolved_model = PresolvedModel(model)
+            math_model.duration['Presolve'] = round(timeit.default_timer() - t_start, 2)
+            logger.info(f'Presolved model: {math_model.presolved_model}')
+        if math_model.scaling:
+            t_start = timeit.default_timer()
+            model = math_model.scaled_model = ScaledModel(model)
+            math_model.duration['Scaling'] = round(timeit.default_timer() - t_start, 2)
+            logger.info(f'Scaled model: {math_model.scaled_model.report}')
+        return model
+
+
+def _has_same_structure(matrix_model: MatrixModel, other: MatrixModel) -> bool:
+    """ True if both models have the same dimensions, sparsity pattern and integrality """
+    return (matrix_model.nr_of_columns == other.nr_of_columns and
+            matrix_model.nr_of_rows == other.nr_of_rows and
+            np.array_equal(matrix_model.matrix_start, other.matrix_start) and
+            np.array_equal(matrix_model.matrix_index, other.matrix_index) and
+            np.array_equal(matrix_model.integrality, other.integrality))
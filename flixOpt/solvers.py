@@ -2,4 +2,4 @@
 This module contains the solvers of the flixOpt framework, making them available to the end user in a compact way.
 """
 
-from .math_modeling import Solver, HighsSolver, GurobiSolver, CbcSolver, CplexSolver, GlpkSolver
\ No newline at end of file
+from .math_modeling import Solver, HighsSolver, GurobiSolver, CbcSolver, CplexSolver, GlpkSolver, PortfolioSolver
\ No newline at end of file
@@ -3,20 +3,23 @@ This module contains the core structure of the flixOpt framework.
 These classes are not directly used by the end user, but are used by other modules.
 """
 
-from typing import List, Dict, Union, Optional, Literal, TYPE_CHECKING, Any
+from typing import List, Dict, Union, Optional, Literal, TYPE_CHECKING, Any, Callable
 import logging
 import inspect
 import textwrap
+import threading
 
 import numpy as np
 
 from . import utils
-from .math_modeling import MathModel, Variable, Equation, Inequation, VariableTS, Solver
+from .math_modeling import MathModel, Variable, Equation, Inequation, VariableTS, Solver, CoefficientDiagnostics
+from .cache import DiskCache
 from .core import TimeSeries, Skalar, Numeric, Numeric_TS, TimeSeriesData
 
 if TYPE_CHECKING:  # for type checking and preventing circular imports
     from .flow_system import FlowSystem
     from .elements import ComponentModel, BusModel
+    import pandas as pd
 
 logger = logging.getLogger('flixOpt')
 
@@ -28,21 +31,68 @@ class SystemModel(MathModel):
 
     def __init__(self,
                  label: str,
-                 modeling_language: Literal['pyomo', 'cvxpy'],
+                 modeling_language: Literal['pyomo', 'highspy', 'cvxpy'],
                  flow_system: 'FlowSystem',
                  time_indices: Optional[Union[List[int], range]]):
         super().__init__(label, modeling_language)
         self.flow_system = flow_system
+        self.time_indices = time_indices
         # Zeitdaten generieren:
         self.time_series, self.time_series_with_end, self.dt_in_hours, self.dt_in_hours_total = (
             flow_system.get_time_data_from_indices(time_indices))
         self.nr_of_time_steps = len(self.time_series)
         self.indices = range(self.nr_of_time_steps)
+        # How often each time step occurs in the modeled horizon. Only differs from 1 with typical periods
+        self.time_step_weights: np.ndarray = np.ones(self.nr_of_time_steps)
+        self.period_length: Optional[int] = None
+        self.period_order: Optional[np.ndarray] = None
 
         self.effect_collection_model = flow_system.effect_collection.create_model(self)
         self.component_models: List['ComponentModel'] = []
         self.bus_models: List['BusModel'] = []
         self.other_models: List[ElementModel] = []
+        self._index: Optional[ModelIndex] = None
+
+    def use_typical_periods(self, period_length: int, period_order: np.ndarray, occurrences: np.ndarray,
+                            dt_in_hours: Numeric):
+        """
+        Models only typical periods, which represent the full horizon. Must be called before do_modeling().
+        The time steps are the typical periods one after the other. Sums over time (like effects or flow hours) are
+        weighted by the number of occurrences of each period, and Storages are linked across the periods in
+        the order of the original horizon.
+
+        Parameters
+        ----------
+        period_length : int
+            The number of time steps per typical period.
+        period_order : np.ndarray
+            The typical period of each period of the original horizon.
+        occurrences : np.ndarray
+            How often each typical period occurs in the original horizon. Might be fractional (e.g. a shorter last period).
+        dt_in_hours : Numeric
+            The duration of the time steps. The time steps of different periods are not consecutive,
+            so the durations can't be taken from the time series.
+        """
+        if self.nr_of_time_steps != period_length * len(occurrences):
+            raise ValueError(f'{len(occurrences)} typical periods of length {period_length} dont match the '
+                             f'{self.nr_of_time_steps} time steps of the SystemModel')
+        self.period_length = period_length
+        self.period_order = np.asarray(period_order)
+        self.time_step_weights = np.repeat(np.asarray(occurrences, dtype=float), period_length)
+        self.dt_in_hours = utils.as_vector(dt_in_hours, self.nr_of_time_steps)
+        self.dt_in_hours_total = float(np.sum(self.dt_in_hours * self.time_step_weights))
+
+    @property
+    def nr_of_periods(self) -> int:
+        """ The number of (typical) periods in the model. 1 if the time steps are a continuous horizon """
+        return 1 if self.period_length is None else self.nr_of_time_steps // self.period_length
+
+    @property
+    def period_starts(self) -> np.ndarray:
+        """ The first time step of every (typical) period. Constraints linking a time step to the prior one skip them """
+        if self.period_length is None:
+            return np.array([0])
+        return np.arange(0, self.nr_of_time_steps, self.period_length)
 
     def do_modeling(self):
         self.effect_collection_model.do_modeling(self)
@@ -52,8 +102,182 @@ class SystemModel(MathModel):
             component_model.do_modeling(self)
         for bus_model in self.bus_models:  # Buses after Components, because FlowModels are created in ComponentModels
             bus_model.do_modeling(self)
+        self._index = self._create_index()
+
+    def _create_index(self) -> 'ModelIndex':
+        direct_models = [self.effect_collection_model] + self.component_models + self.bus_models + self.other_models
+        return ModelIndex(direct_models, (_modifications.state, len(self.other_models)))
 
-    def solve(self, solver: Solver, excess_threshold: Union[int, float] = 0.1):
+    @property
+    def index(self) -> 'ModelIndex':
+        """ Registry of all Variables, Constraints and sub models. Rebuilt only if the model was modified """
+        if self._index is None or self._index.state != (_modifications.state, len(self.other_models)):
+            self._index = self._create_index()
+        return self._index
+
+    def coefficient_diagnostics(self, owners: Optional[Dict[str, str]] = None) -> CoefficientDiagnostics:
+        """ See MathModel.coefficient_diagnostics(). By default, the owners are the Elements of the models """
+        if owners is None:
+            owners = {label: model.element.label_full for model in self.sub_models
+                      for label in list(model.variables) + list(model.constraints)}
+        return super().coefficient_diagnostics(owners)
+
+    def update_initial_state(self) -> bool:
+        """
+        Updates the model after the initial states of Elements (like previous_flow_rate or initial_charge_state)
+        were changed. Only the updated constraints are passed on to the translated model.
+        Returns False if the structure of the model would change. The model must be created again then.
+        """
+        updated_constraints = []
+        for model in self.sub_models:  # Models before their sub models, as these might depend on them
+            constraints = model.update_initial_state()
+            if constraints is None:
+                return False
+            updated_constraints.extend(constraints)
+        self.update_translation([], updated_constraints)
+        return True
+
+    def update_data(self,
+                    time_series: Optional[List[TimeSeries]] = None,
+                    time_indices: Optional[Union[List[int], range]] = None) -> bool:
+        """
+        Updates the model after the data of TimeSeries was changed, or shifts it to other time_indices of the
+        FlowSystem with the same number of time steps. The TimeSeries must already be activated accordingly.
+        Only the Elements using the changed TimeSeries (all Elements, if time_series is None or the model is shifted)
+        are modeled again in a temporary SystemModel. The own Variables and constraints take over their bounds,
+        factors and constants, and only the changed ones are passed on to the translated model.
+        Returns False if the structure of the model would change. The model must be created again then.
+
+        Parameters
+        ----------
+        time_series : list of TimeSeries, optional
+            The TimeSeries with changed data. If None, the data of all TimeSeries might have changed.
+        time_indices : list of int or range, optional
+            The new time steps of the model. If None, the time steps stay the same.
+        """
+        apply_data_update = self.prepare_data_update(time_series, time_indices)
+        if apply_data_update is None:
+            return False
+        apply_data_update()
+        return True
+
+    def prepare_data_update(self,
+                            time_series: Optional[List[TimeSeries]] = None,
+                            time_indices: Optional[Union[List[int], range]] = None,
+                            flow_system: Optional['FlowSystem'] = None) -> Optional[Callable[[], None]]:
+        """
+        The first part of update_data(): Models the Elements with the new data in a temporary SystemModel and pairs
+        their Variables and constraints with the own ones. This model isn't changed, so this can be done while it is
+        solved. Returns a function taking over the new data, or None if the structure of the model would change.
+
+        Parameters
+        ----------
+        flow_system : FlowSystem, optional
+            A copy of the own FlowSystem (see FlowSystem.copy()) with the TimeSeries activated for the new time steps.
+            All Elements of the copy are modeled, and neither the own FlowSystem nor this model are changed.
+            This allows to prepare the update in a background thread (e.g. while this model is solved).
+            If None, the own FlowSystem is modeled, and its TimeSeries must already be activated accordingly.
+        """
+        from .features import SingleShareModel  # Avoiding circular imports
+        is_copy = flow_system is not None and flow_system is not self.flow_system
+        flow_system = self.flow_system if flow_system is None else flow_system
+        if time_indices is not None:
+            if self.period_length is not None:
+                return None  # Typical periods can't be shifted
+            time_data = flow_system.get_time_data_from_indices(time_indices)
+            if len(time_data[0]) != self.nr_of_time_steps:
+                return None
+
+        changed_ts = (None if time_series is None or time_indices is not None or is_copy
+                      else {id(ts) for ts in time_series})
+
+        def uses_changed_data(element: Element) -> bool:
+            return any(id(ts) in changed_ts for ts in element.used_time_series)
+
+        model_all = changed_ts is None or any(uses_changed_data(effect) for effect in flow_system.effect_collection.effects)
+        if model_all:
+            components, buses = flow_system.components, flow_system.all_buses
+        else:
+            components = [component for component in flow_system.components if uses_changed_data(component) or
+                          any(uses_changed_data(flow) for flow in component.inputs + component.outputs)]
+            buses = [bus for bus in flow_system.all_buses if uses_changed_data(bus)]
+            if not components and not buses:
+                return lambda: None
+
+        # Modeling with the new data. The models of the Elements are restored afterward
+        index_is_valid = self._index is not None and self._index.state == (_modifications.state, len(self.other_models))
+        saved_models = [(element, element.model) for element in [flow_system.effect_collection] + flow_system.all_elements]
+        try:
+            if not model_all:  # Unchanged Components keep the own FlowModels, which are used by the Buses
+                for component_model in self.component_models:
+                    flows = component_model.element.inputs + component_model.element.outputs
+                    for sub_model in component_model.sub_models:
+                        if sub_model.element in flows:
+                            sub_model.element.model = sub_model
+            temporary = SystemModel(self.label, self.modeling_language, flow_system,
+                                    self.time_indices if time_indices is None else time_indices)
+            if time_indices is None:
+                temporary.dt_in_hours, temporary.dt_in_hours_total = self.dt_in_hours, self.dt_in_hours_total
+                temporary.time_step_weights = self.time_step_weights
+                temporary.period_length, temporary.period_order = self.period_length, self.period_order
+            temporary.effect_collection_model.do_modeling(temporary)
+            temporary.component_models = [component.create_model() for component in components]
+            temporary.bus_models = [bus.create_model() for bus in buses]
+            for model in temporary.component_models + temporary.bus_models:
+                model.do_modeling(temporary)
+            temporary._index = temporary._create_index()
+            fixed_values = {label: value for label, value in self.fixed_values.items()
+                            if label in temporary.index.variables}
+            if fixed_values:
+                temporary.fix_variables(fixed_values)
+        finally:
+            for element, model in saved_models:
+                element.model = model
+
+        # Pairing the own models with the new ones
+        own_models = {model.label_full: model for model in self.component_models + self.bus_models}
+        pairs = [(own_models.get(model.label_full), model) for model in temporary.component_models + temporary.bus_models]
+        if model_all:
+            pairs.append((self.effect_collection_model, temporary.effect_collection_model))
+        else:  # Only the shares of the Elements modeled again
+            prefixes = tuple(f'{model.element.label_full}__' for model in temporary.component_models + temporary.bus_models)
+            own_shares, new_shares = ({model.label_full: model for model in ModelIndex([effect_model], None).models
+                                       if isinstance(model, SingleShareModel) and model.label.startswith(prefixes)}
+                                      for effect_model in (self.effect_collection_model,
+                                                           temporary.effect_collection_model))
+            if own_shares.keys() != new_shares.keys():
+                return None
+            pairs.extend((own_shares[label], model) for label, model in new_shares.items())
+
+        part_pairs = []
+        for own, new in pairs:
+            if own is None:
+                return None
+            own_index, new_index = ModelIndex([own], None), new.index  # Not cached, this might run in another thread
+            if (own_index.variables.keys() != new_index.variables.keys() or
+                    own_index.constraints.keys() != new_index.constraints.keys()):
+                return None
+            part_pairs.extend((own_index.variables[label], variable) for label, variable in new_index.variables.items())
+            part_pairs.extend((own_index.constraints[label], constraint)
+                              for label, constraint in new_index.constraints.items())
+        if not all(own.matches(new) for own, new in part_pairs):
+            return None
+
+        def apply_data_update():
+            changed_parts = [own for own, new in part_pairs if own.take_data_from(new)]
+            if time_indices is not None:
+                self.time_indices = time_indices
+                self.time_series, self.time_series_with_end, self.dt_in_hours, self.dt_in_hours_total = time_data
+            if index_is_valid:  # The own model wasn't modified
+                self._index.state = (_modifications.state, len(self.other_models))
+            self.update_translation([part for part in changed_parts if isinstance(part, Variable)],
+                                    [part for part in changed_parts if not isinstance(part, Variable)])
+            logger.debug(f'Took over the data of {len(part_pairs)} Variables and constraints, '
+                         f'{len(changed_parts)} changed')
+
+        return apply_data_update
+
+    def solve(self, solver: Solver, excess_threshold: Union[int, float] = 0.1, cache: Optional[DiskCache] = None):
         """
         Parameters
         ----------
@@ -61,12 +285,15 @@ class SystemModel(MathModel):
             An Instance of the class Solver. Choose from flixOpt.solvers
         excess_threshold : float, positive!
             threshold for excess: If sum(Excess)>excess_threshold a warning is raised, that an excess occurs
+        cache : DiskCache, optional
+            Cache of solutions. If the same model was solved with the same solver settings before, the results are
+            loaded from it instead of solving.
         """
 
         logger.info(f'{" starting solving ":#^80}')
         logger.info(f'{self.describe_size()}')
 
-        super().solve(solver)
+        super().solve(solver, cache)
 
         logger.info(f'Termination message: "{self.solver.termination_message}"')
 
@@ -99,21 +326,21 @@ class SystemModel(MathModel):
         logger.info(f'{" End of Main Results ":#^80}')
 
     def description_of_variables(self, structured: bool = True) -> Dict[str, Union[str, List[str]]]:
-        return {'Components': {comp.label: comp.model.description_of_variables(structured)
-                               for comp in self.flow_system.components},
-                'Buses': {bus.label: bus.model.description_of_variables(structured)
-                          for bus in self.flow_system.all_buses},
-                'Effects': self.flow_system.effect_collection.model.description_of_variables(structured),
+        return {'Components': {model.element.label: model.description_of_variables(structured)
+                               for model in self.component_models},
+                'Buses': {model.element.label: model.description_of_variables(structured)
+                          for model in self.bus_models},
+                'Effects': self.effect_collection_model.description_of_variables(structured),
                 'Others': {model.element.label: model.description_of_variables(structured)
                            for model in self.other_models}}
 
     def description_of_constraints(self, structured: bool = True) -> Dict[str, Union[str, List[str]]]:
-        return {'Components': {comp.label: comp.model.description_of_constraints(structured)
-                               for comp in self.flow_system.components},
-                'Buses': {bus.label: bus.model.description_of_constraints(structured)
-                          for bus in self.flow_system.all_buses},
+        return {'Components': {model.element.label: model.description_of_constraints(structured)
+                               for model in self.component_models},
+                'Buses': {model.element.label: model.description_of_constraints(structured)
+                          for model in self.bus_models},
                 'Objective': self.objective.description(),
-                'Effects': self.flow_system.effect_collection.model.description_of_constraints(structured),
+                'Effects': self.effect_collection_model.description_of_constraints(structured),
                 'Others': {model.element.label: model.description_of_constraints(structured)
                            for model in self.other_models}}
 
@@ -129,23 +356,28 @@ class SystemModel(MathModel):
 
     @property
     def main_results(self) -> Dict[str, Union[Skalar, Dict]]:
+        # The own models are used instead of Element.model, which might belong to another SystemModel of the Elements
+        from flixOpt.effects import EffectModel
         main_results = {}
         effect_results = {}
         main_results['Effects'] = effect_results
-        for effect in self.flow_system.effect_collection.effects:
-            effect_results[f'{effect.label} [{effect.unit}]'] = {
-                'operation': float(effect.model.operation.sum.result),
-                'invest': float(effect.model.invest.sum.result),
-                'sum': float(effect.model.all.sum.result)}
+        for effect_model in self.effect_collection_model.sub_models:
+            if isinstance(effect_model, EffectModel):
+                effect = effect_model.element
+                effect_results[f'{effect.label} [{effect.unit}]'] = {
+                    'operation': float(effect_model.operation.sum.result),
+                    'invest': float(effect_model.invest.sum.result),
+                    'sum': float(effect_model.all.sum.result)}
         main_results['penalty'] = float(self.effect_collection_model.penalty.sum.result)
         main_results['Objective'] = self.result_of_objective
         main_results['lower bound'] = self.solver.best_bound
         buses_with_excess = []
         main_results['buses with excess'] = buses_with_excess
-        for bus in self.flow_system.all_buses:
-            if bus.with_excess:
-                if np.sum(bus.model.excess_input.result) > 1e-3 or np.sum(bus.model.excess_output.result) > 1e-3:
-                    buses_with_excess.append(bus.label)
+        for bus_model in self.bus_models:
+            if bus_model.element.with_excess:
+                if (np.sum(bus_model.excess_input.result) > 1e-3 or
+                        np.sum(bus_model.excess_output.result) > 1e-3):
+                    buses_with_excess.append(bus_model.element.label)
 
         invest_decisions = {'invested': {}, 'not invested': {}}
         main_results['Invest-Decisions'] = invest_decisions
@@ -166,57 +398,95 @@ class SystemModel(MathModel):
         infos['Constraints'] = self.description_of_constraints()
         infos['Variables'] = self.description_of_variables()
         infos['Main Results'] = self.main_results
+        infos['Model Size per Element'] = self.size_profile(per_element=True).to_dict(orient='index')
         return infos
 
+    def size_profile(self, per_element: bool = False) -> 'pd.DataFrame':
+        """
+        Size of the model per sub model (or per Element, if per_element is True), sorted by the number of nonzeros.
+        Counted are the own Variables and Constraints of each sub model (not those of its sub models), so the rows
+        add up to the whole model. Memory is the estimated size of the array form passed to a solver (see MatrixModel).
+        """
+        import pandas as pd
+        matrix_model = self.matrix_model or self.compile()
+        nonzeros_per_row = np.diff(matrix_model.matrix_start)
+        profile = []
+        for model in self.sub_models:
+            variables, constraints = list(model.variables.values()), list(model.constraints.values())
+            nr_of_rows = sum(constraint.length for constraint in constraints)
+            nr_of_columns = sum(variable.length for variable in variables)
+            nr_of_nonzeros = sum(int(np.sum(nonzeros_per_row[matrix_model.row_slice(constraint)]))
+                                 for constraint in constraints)
+            profile.append({'Model': model.label_full,
+                            'Element': model.element.label_full,
+                            'Type': model.__class__.__name__,
+                            'Variables': len(variables),
+                            'Single variables': nr_of_columns,
+                            'Binaries': sum(variable.length for variable in variables if variable.is_binary),
+                            'Constraints': len(constraints),
+                            'Rows': nr_of_rows,
+                            'Nonzeros': nr_of_nonzeros,
+                            # Per nonzero: value and index. Per row: 2 bounds and start. Per column: 3 floats, 1 flag
+                            'Memory [kB]': (12 * nr_of_nonzeros + 24 * nr_of_rows + 25 * nr_of_columns) / 1e3})
+        profile = pd.DataFrame(profile).set_index('Model')
+        if per_element:
+            profile = profile.drop(columns='Type').groupby('Element').sum()
+        return profile.sort_values('Nonzeros', ascending=False)
+
     @property
     def all_variables(self) -> Dict[str, Variable]:
-        all_vars = {}
-        for model in self.sub_models:
-            for label, variable in model.variables.items():
-                if label in all_vars:
-                    raise KeyError(f"Duplicate Variable found in SystemModel:{model=} {label=}; {variable=}")
-                all_vars[label] = variable
-        return all_vars
+        return self.index.variables
 
     @property
     def all_constraints(self) -> Dict[str, Union[Equation, Inequation]]:
-        all_constr = {}
-        for model in self.sub_models:
-            for label, constr in model.constraints.items():
-                if label in all_constr:
-                    raise KeyError(f"Duplicate Constraint found in SystemModel: {label=}; {constr=}")
-                else:
-                    all_constr[label] = constr
-        return all_constr
+        return self.index.constraints
 
     @property
     def all_equations(self) -> Dict[str, Equation]:
-        return {key: value for key, value in self.all_constraints.items() if isinstance(value, Equation)}
+        return self.index.equations
 
     @property
     def all_inequations(self) -> Dict[str, Inequation]:
-        return {key: value for key, value in self.all_constraints.items() if isinstance(value, Inequation)}
+        return self.index.inequations
 
     @property
     def sub_models(self) -> List['ElementModel']:
-        direct_models = [self.effect_collection_model] + self.component_models + self.bus_models + self.other_models
-        sub_models = [sub_model for direct_model in direct_models for sub_model in direct_model.all_sub_models]
-        return direct_models + sub_models
+        return self.index.models
 
     @property
     def variables(self) -> List[Variable]:
         """ Needed for Mother class """
-        return list(self.all_variables.values())
+        return self.index.variable_list
 
     @property
     def equations(self) -> List[Equation]:
         """ Needed for Mother class """
-        return list(self.all_equations.values())
+        return self.index.equation_list
 
     @property
     def inequations(self) -> List[Inequation]:
         """ Needed for Mother class """
-        return list(self.all_inequations.values())
+        return self.index.inequation_list
+
+    @property
+    def ts_variables(self) -> List[VariableTS]:
+        return self.index.ts_variables
+
+    @property
+    def nr_of_constraints(self) -> int:
+        return len(self.index.constraints)
+
+    @property
+    def nr_of_single_variables(self) -> int:
+        return self.index.nr_of_single_variables
+
+    @property
+    def nr_of_single_equations(self) -> int:
+        return self.index.nr_of_single_equations
+
+    @property
+    def nr_of_single_inequations(self) -> int:
+        return self.index.nr_of_single_inequations
 
     @property
     def objective(self) -> Equation:
@@ -277,6 +547,25 @@ class Element:
         return self.label
 
 
+class _ModificationCount(threading.local):
+    """
+    Incremented whenever a Variable or Constraint is added to any ElementModel, so the cached indices are only rebuilt
+    if necessary. Counted per thread: Modeling in a background thread (see SystemModel.prepare_data_update()) doesn't
+    invalidate the indices used by the main thread.
+    """
+
+    def __init__(self):
+        self.token = object()  # Distinguishes the counts of different threads
+        self.count = 0
+
+    @property
+    def state(self) -> tuple:
+        return self.token, self.count
+
+
+_modifications = _ModificationCount()
+
+
 class ElementModel:
     """ Interface to create the mathematical Models for Elements """
 
@@ -287,8 +576,10 @@ class ElementModel:
         self.constraints = {}
         self.sub_models = []
         self._label = label
+        self._index: Optional[ModelIndex] = None
 
     def add_variables(self, *variables: Variable) -> None:
+        _modifications.count += 1
         for variable in variables:
             if variable.label not in self.variables.keys():
                 self.variables[variable.label] = variable
@@ -298,12 +589,29 @@ class ElementModel:
                 raise Exception(f'A Variable with the label "{variable.label}" already exists')
 
     def add_constraints(self, *constraints: Union[Equation, Inequation]) -> None:
+        _modifications.count += 1
         for constraint in constraints:
             if constraint.label not in self.constraints.keys():
                 self.constraints[constraint.label] = constraint
             else:
                 raise Exception(f'Constraint "{constraint.label}" already exists')
 
+    def update_initial_state(self) -> Optional[List[Union[Equation, Inequation]]]:
+        """
+        Updates the parts of the model which depend on the initial state of the Element (like previous_flow_rate or
+        initial_charge_state) after the Element was changed, without modeling again. Returns the updated constraints,
+        or None if the new initial state changes the structure of the model (which must be created again then).
+        Models without such parts don't need to override this.
+        """
+        return []
+
+    @property
+    def index(self) -> 'ModelIndex':
+        """ Registry of all Variables and Constraints of this model and its sub models """
+        if self._index is None or self._index.state != _modifications.state:
+            self._index = ModelIndex([self], _modifications.state)
+        return self._index
+
     def description_of_variables(self, structured: bool = True) -> Union[Dict[str, Union[List[str], Dict]], List[str]]:
         if structured:
             # Gather descriptions of this model's variables
@@ -332,13 +640,14 @@ class ElementModel:
 
     @property
     def overview_of_model_size(self) -> Dict[str, int]:
-        all_vars, all_eqs, all_ineqs = self.all_variables, self.all_equations, self.all_inequations
-        return {'no of Euations': len(all_eqs),
-                'no of Equations single': sum(eq.nr_of_single_equations for eq in all_eqs.values()),
-                'no of Inequations': len(all_ineqs),
-                'no of Inequations single': sum(ineq.nr_of_single_equations for ineq in all_ineqs.values()),
-                'no of Variables': len(all_vars),
-                'no of Variables single': sum(var.length for var in all_vars.values())}
+        index = self.index
+        return {'no of Euations': len(index.equations),
+                'no of Equations single': index.nr_of_single_equations,
+                'no of Inequations': len(index.inequations),
+                'no of Inequations single': index.nr_of_single_inequations,
+                'no of Variables': len(index.variables),
+                'no of Variables single': index.nr_of_single_variables,
+                'no of Binaries single': sum(var.length for var in index.variable_list if var.is_binary)}
 
     @property
     def inequations(self) -> Dict[str, Inequation]:
@@ -350,51 +659,23 @@ class ElementModel:
 
     @property
     def all_variables(self) -> Dict[str, Variable]:
-        all_vars = self.variables.copy()
-        for sub_model in self.sub_models:
-            for key, value in sub_model.all_variables.items():
-                if key in all_vars:
-                    raise KeyError(f"Duplicate key found: '{key}' in both main model and submodel!")
-                all_vars[key] = value
-        return all_vars
+        return self.index.variables
 
     @property
     def all_constraints(self) -> Dict[str, Union[Equation, Inequation]]:
-        all_constr = self.constraints.copy()
-        for sub_model in self.sub_models:
-            for key, value in sub_model.all_constraints.items():
-                if key in all_constr:
-                    raise KeyError(f"Duplicate key found: '{key}' in both main model and submodel!")
-                all_constr[key] = value
-        return all_constr
+        return self.index.constraints
 
     @property
     def all_equations(self) -> Dict[str, Equation]:
-        all_eqs = self.equations.copy()
-        for sub_model in self.sub_models:
-            for key, value in sub_model.all_equations.items():
-                if key in all_eqs:
-                    raise KeyError(f"Duplicate key found: '{key}' in both main model and submodel!")
-                all_eqs[key] = value
-        return all_eqs
+        return self.index.equations
 
     @property
     def all_inequations(self) -> Dict[str, Inequation]:
-        all_ineqs = self.inequations.copy()
-        for sub_model in self.sub_models:
-            for key, value in sub_model.all_inequations.items():
-                if key in all_ineqs:
-                    raise KeyError(f"Duplicate key found: '{key}' in both main model and submodel!")
-        return all_ineqs
+        return self.index.inequations
 
     @property
     def all_sub_models(self) -> List['ElementModel']:
-        all_subs = []
-        to_process = self.sub_models.copy()
-        for model in to_process:
-            all_subs.append(model)
-            to_process.extend(model.sub_models)
-        return all_subs
+        return self.index.models[1:]
 
     def results(self) -> Dict:
         return {**{variable.label_short: variable.result for variable in self.variables.values()},
@@ -409,6 +690,47 @@ class ElementModel:
         return self._label or self.element.label
 
 
+class ModelIndex:
+    """
+    Registry of the Variables, Constraints and ElementModels of a tree of ElementModels, built with a single walk.
+    Offers lookup by label, lists per type and the size of the model. The state is used to detect modifications.
+    """
+
+    def __init__(self, direct_models: List[ElementModel], state: Any):
+        self.state = state
+        self.models: List[ElementModel] = list(direct_models)  # Direct models first, then their sub models
+        for direct_model in direct_models:
+            to_process = direct_model.sub_models.copy()
+            for model in to_process:
+                self.models.append(model)
+                to_process.extend(model.sub_models)
+
+        self.variables: Dict[str, Variable] = {}
+        self.constraints: Dict[str, Union[Equation, Inequation]] = {}
+        for model in self.models:
+            for label, variable in model.variables.items():
+                if label in self.variables:
+                    raise KeyError(f"Duplicate Variable found: {model=} {label=}; {variable=}")
+                self.variables[label] = variable
+            for label, constraint in model.constraints.items():
+                if label in self.constraints:
+                    raise KeyError(f"Duplicate Constraint found: {label=}; {constraint=}")
+                self.constraints[label] = constraint
+
+        self.equations: Dict[str, Equation] = {label: constraint for label, constraint in self.constraints.items()
+                                               if isinstance(constraint, Equation)}
+        self.inequations: Dict[str, Inequation] = {label: constraint for label, constraint in self.constraints.items()
+                                                   if isinstance(constraint, Inequation)}
+        self.variable_list: List[Variable] = list(self.variables.values())
+        self.equation_list: List[Equation] = list(self.equations.values())
+        self.inequation_list: List[Inequation] = list(self.inequations.values())
+        self.ts_variables: List[VariableTS] = [var for var in self.variable_list if isinstance(var, VariableTS)]
+
+        self.nr_of_single_variables = sum(var.length for var in self.variable_list)
+        self.nr_of_single_equations = sum(eq.length for eq in self.equation_list)
+        self.nr_of_single_inequations = sum(ineq.length for ineq in self.inequation_list)
+
+
 def _create_time_series(label: str, data: Optional[Union[Numeric_TS, TimeSeries]], element: Element) -> Optional[TimeSeries]:
     """Creates a TimeSeries from Numeric Data and adds it to the list of time_series of an Element.
     If the data already is a TimeSeries, nothing happens and the TimeSeries gets cleaned and returned"""
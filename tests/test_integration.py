@@ -1,7 +1,10 @@
 import unittest
 import os
 import datetime
-from typing import Literal
+import time
+import unittest.mock
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional
 
 import numpy as np
 import pandas as pd
@@ -11,6 +14,7 @@ from flixOpt import *
 from flixOpt.components import Transmission
 from flixOpt.linear_converters import Boiler, CHP
 from flixOpt.aggregation import AggregationParameters
+from flixOpt.math_modeling import Checkpoint, MathModel
 
 np.random.seed(45)
 
@@ -86,6 +90,21 @@ class TestSimple(BaseTest):
                                       df['Wärmelast__Q_th_Last'],
                                       "Loaded Results and directly used results dont match, or loading didnt work properly")
 
+    def test_size_profile(self):
+        system_model = self.model().system_model
+        profile = system_model.size_profile()
+        self.assertEqual(profile['Single variables'].sum(), system_model.nr_of_single_variables)
+        self.assertEqual(profile['Rows'].sum(),
+                         system_model.nr_of_single_equations + system_model.nr_of_single_inequations)
+        self.assertEqual(profile['Nonzeros'].sum(), system_model.matrix_model.nr_of_nonzeros)
+        self.assertEqual(profile.loc['Boiler__Q_th__OnOff', 'Type'], 'OnOffModel')
+
+        per_element = system_model.size_profile(per_element=True)
+        self.assertEqual(per_element['Binaries'].sum(),
+                         sum(variable.length for variable in system_model.variables if variable.is_binary))
+        self.assertIn('Boiler', per_element.index)
+        self.assertEqual(set(system_model.infos['Model Size per Element']), set(per_element.index))
+
     def model(self, save_results=False) -> FullCalculation:
         # Define the components and flow_system
         Strom = Bus('Strom')
@@ -255,6 +274,9 @@ class TestComplex(BaseTest):
         self.aTimeSeries = self.aTimeSeries.astype('datetime64')
         self.excessCosts = None
         self.useCHPwithLinearSegments = False
+        self.modeling_language = 'pyomo'
+        self.presolve = False
+        self.scaling = False
 
     def test_basic(self):
         calculation = self.basic_model()
@@ -392,7 +414,7 @@ class TestComplex(BaseTest):
         print(es)
         es.visualize_network()
 
-        aCalc = FullCalculation('Sim1', es, 'pyomo', None)
+        aCalc = FullCalculation('Sim1', es, self.modeling_language, None, self.presolve, self.scaling)
         aCalc.do_modeling()
 
         aCalc.solve(self.get_solver())
@@ -437,7 +459,7 @@ class TestComplex(BaseTest):
         print(es)
         es.visualize_network()
 
-        aCalc = FullCalculation('Sim1', es, 'pyomo', None)
+        aCalc = FullCalculation('Sim1', es, self.modeling_language, None, self.presolve, self.scaling)
         aCalc.do_modeling()
 
         aCalc.solve(self.get_solver())
@@ -445,6 +467,451 @@ class TestComplex(BaseTest):
         return aCalc
 
 
+class TestComplexHighspy(TestComplex):
+    """ Same models as TestComplex, but passed to HiGHS directly via highspy instead of pyomo """
+
+    def setUp(self):
+        super().setUp()
+        self.modeling_language = 'highspy'
+
+
+class TestComplexPresolve(TestComplex):
+    """ Same models as TestComplex, but reduced by the PresolvedModel before passing them to HiGHS """
+
+    def setUp(self):
+        super().setUp()
+        self.modeling_language = 'highspy'
+        self.presolve = True
+
+
+class TestComplexScaled(TestComplex):
+    """ Same models as TestComplex, but presolved and scaled by the ScaledModel before passing them to HiGHS """
+
+    def setUp(self):
+        super().setUp()
+        self.modeling_language = 'highspy'
+        self.presolve = True
+        self.scaling = True
+
+    def test_coefficient_diagnostics(self):
+        calculation = self.basic_model()
+        diagnostics = calculation.system_model.coefficient_diagnostics()
+        self.assertIn('Kessel', diagnostics.owners)
+        self.assertEqual(diagnostics.largest_bounds(1)[0][0], 'Einspeisung__P_el_flow_rate')  # Config.BIG_M
+
+        scaled = calculation.system_model.scaled_model
+        ratio = lambda values: np.max(np.abs(values[values != 0])) / np.min(np.abs(values[values != 0]))
+        self.assertLess(ratio(scaled.matrix_value), ratio(scaled.original.matrix_value))
+
+
+class TestUpdateData(BaseTest):
+    """ Re-solving a FullCalculation with new data must give the same results as a newly built Calculation """
+
+    def setUp(self):
+        super().setUp()
+        self.prices = [np.array([20., 30., 60., 60., 10., 40.]), np.array([50., 10., 10., 70., 20., 20.])]
+        self.loads = [np.array([30., 0., 90., 50., 40., 20.]), np.array([10., 80., 20., 40., 60., 0.])]
+
+    def test_update_data(self):
+        for modeling_language in ['highspy', 'pyomo']:
+            with self.subTest(modeling_language=modeling_language):
+                calculation, price, _ = self.calculation(self.prices[0], self.loads[0], modeling_language)
+                calculation.do_modeling()
+                calculation.solve(self.get_solver())
+                previous_model = calculation.system_model.model
+
+                previous_system_model = calculation.system_model
+                calculation.update_data({price: self.prices[1], 'Wärmelast__Q_th_Last__fixed_relative_profile': self.loads[1]})
+                self.assertIs(calculation.system_model, previous_system_model)
+                self.assertIs(calculation.system_model.model, previous_model)
+                np.testing.assert_array_equal(price.data, self.prices[0], 'The data of the user was modified')
+                calculation.solve(self.get_solver())
+
+                reference, _, _ = self.calculation(self.prices[1], self.loads[1], modeling_language)
+                reference.do_modeling()
+                reference.solve(self.get_solver())
+                self.assertAlmostEqualNumeric(calculation.system_model.result_of_objective,
+                                              reference.system_model.result_of_objective,
+                                              'Objective of updated model doesnt match')
+
+    def calculation(self, price, load, modeling_language):
+        time_series = (datetime.datetime(2020, 1, 1) + np.arange(len(load)) * datetime.timedelta(hours=1)).astype('datetime64')
+        Fernwaerme, Gas = Bus('Fernwärme'), Bus('Gas')
+        costs = Effect('costs', '€', 'Kosten', is_standard=True, is_objective=True)
+        price, load = TimeSeriesData(price), TimeSeriesData(load)
+        aBoiler = Boiler('Boiler', eta=0.9,
+                         Q_th=Flow('Q_th', bus=Fernwaerme, size=100, relative_minimum=0.2,
+                                   can_be_off=OnOffParameters(effects_per_switch_on=5)),
+                         Q_fu=Flow('Q_fu', bus=Gas))
+        aSpeicher = Storage('Speicher', charging=Flow('Q_th_load', bus=Fernwaerme, size=50),
+                            discharging=Flow('Q_th_unload', bus=Fernwaerme, size=50),
+                            capacity_in_flow_hours=100, initial_charge_state=0)
+        aWaermeLast = Sink('Wärmelast', sink=Flow('Q_th_Last', bus=Fernwaerme, size=1, fixed_relative_profile=load))
+        aGasTarif = Source('Gastarif', source=Flow('Q_Gas', bus=Gas, effects_per_flow_hour=price))
+
+        es = FlowSystem(time_series)
+        es.add_elements(costs, aBoiler, aSpeicher, aWaermeLast, aGasTarif)
+        return FullCalculation('Test_Update', es, modeling_language), price, load
+
+
+class TestRollingHorizon(BaseTest):
+    """ Each horizon must equal a FullCalculation of its time steps with the carried over states """
+
+    def test_steps(self):
+        for modeling_language in ['highspy', 'pyomo']:
+            with self.subTest(modeling_language=modeling_language):
+                es = self.flow_system()
+                calculation = RollingHorizonCalculation('rollingHorizon', es, horizon_length=4, step_length=2,
+                                                        modeling_language=modeling_language)
+                calculation.do_modeling()
+                calculation.solve(self.get_solver())
+                previous_system_model, previous_model = calculation.system_model, calculation.system_model.model
+                calculation.step(forecasts={self.price: [10., 10., 50., 50.]}, realized={'Speicher': 10})
+                self.assertIs(calculation.system_model, previous_system_model)  # Shifted in place
+                self.assertIs(calculation.system_model.model, previous_model)
+                np.testing.assert_array_equal(self.price.data, [20., 30., 60., 60., 10., 40., 30., 20.])
+                calculation.solve(self.get_solver())
+                self.assertEqual(list(calculation.horizon_indices), [2, 3, 4, 5])
+                self.assertAlmostEqualNumeric(calculation.results(horizon=True)['Components']['Speicher']['charge_state'][0], 10, 'realized charge_state not used')
+
+                reference = FullCalculation('reference', es, modeling_language, time_indices=calculation.horizon_indices)
+                reference.do_modeling()
+                reference.solve(self.get_solver())
+                self.assertAlmostEqualNumeric(calculation.system_model.result_of_objective, reference.system_model.result_of_objective, 'Objective doesnt match the FullCalculation of the horizon')
+
+                calculation.step()
+                calculation.solve(self.get_solver())
+                with self.assertRaises(Exception):
+                    calculation.step()
+                self.assertEqual(len(calculation.results()['Components']['Boiler']['Q_th']['flow_rate']), 6)
+                self.assertEqual(len(calculation.infos['Durations']), 3)
+                calculation.reset_initial_states()
+                self.assertEqual(es.components[1].initial_charge_state, 0)
+
+    def test_latency_of_steps(self):
+        # The model of a mid-size system is shifted without compiling or translating it again
+        for modeling_language in ['highspy', 'pyomo']:
+            with self.subTest(modeling_language=modeling_language):
+                es = self.mid_size_flow_system()
+                calculation = RollingHorizonCalculation('rollingHorizon', es, horizon_length=96, step_length=24,
+                                                        modeling_language=modeling_language)
+                calculation.do_modeling()
+                calculation.solve(self.get_solver())
+                system_model = calculation.system_model
+                with unittest.mock.patch.object(MathModel, 'compile', side_effect=AssertionError('Compiled again')), \
+                        unittest.mock.patch.object(MathModel, 'translate_to_modeling_language',
+                                                   side_effect=AssertionError('Translated again')):
+                    for _ in range(3):
+                        calculation.step()
+                        self.assertIs(calculation.system_model, system_model)
+                        calculation.solve(self.get_solver())
+                mean_duration_of_steps = np.mean([info['modeling'] for info in calculation.step_infos[1:]])
+                self.assertLess(mean_duration_of_steps, calculation.step_infos[0]['modeling'])
+
+    def mid_size_flow_system(self, nr_of_boilers: int = 20, nr_of_time_steps: int = 168) -> FlowSystem:
+        hours = np.arange(nr_of_time_steps)
+        Fernwaerme, Gas = Bus('Fernwärme'), Bus('Gas')
+        costs = Effect('costs', '€', 'Kosten', is_standard=True, is_objective=True)
+        boilers = [Boiler(f'Kessel{i}', eta=0.8 + 0.005 * i, Q_th=Flow('Q_th', bus=Fernwaerme, size=50, relative_minimum=0.2),
+                          Q_fu=Flow('Q_fu', bus=Gas)) for i in range(nr_of_boilers)]
+        aSpeicher = Storage('Speicher', charging=Flow('Q_th_load', bus=Fernwaerme, size=100),
+                            discharging=Flow('Q_th_unload', bus=Fernwaerme, size=100),
+                            capacity_in_flow_hours=400, initial_charge_state=0)
+        load = TimeSeriesData(500 + 300 * np.sin(hours / 24 * 2 * np.pi))
+        aWaermeLast = Sink('Wärmelast', sink=Flow('Q_th_Last', bus=Fernwaerme, size=1, fixed_relative_profile=load))
+        price = TimeSeriesData(30 + 10 * np.cos(hours / 12 * 2 * np.pi))
+        aGasTarif = Source('Gastarif', source=Flow('Q_Gas', bus=Gas, effects_per_flow_hour=price))
+
+        es = FlowSystem((datetime.datetime(2020, 1, 1) + hours * datetime.timedelta(hours=1)).astype('datetime64'))
+        es.add_elements(costs, *boilers, aSpeicher, aWaermeLast, aGasTarif)
+        return es
+
+    def flow_system(self) -> FlowSystem:
+        time_series = (datetime.datetime(2020, 1, 1) + np.arange(8) * datetime.timedelta(hours=1)).astype('datetime64')
+        self.price = TimeSeriesData(np.array([20., 30., 60., 60., 10., 40., 30., 20.]))
+        load = TimeSeriesData(np.array([30., 0., 90., 50., 40., 20., 10., 60.]))
+        Fernwaerme, Gas = Bus('Fernwärme'), Bus('Gas')
+        costs = Effect('costs', '€', 'Kosten', is_standard=True, is_objective=True)
+        aBoiler = Boiler('Boiler', eta=0.9,
+                         Q_th=Flow('Q_th', bus=Fernwaerme, size=100, relative_minimum=0.2,
+                                   can_be_off=OnOffParameters(effects_per_switch_on=5)),
+                         Q_fu=Flow('Q_fu', bus=Gas))
+        aSpeicher = Storage('Speicher', charging=Flow('Q_th_load', bus=Fernwaerme, size=50),
+                            discharging=Flow('Q_th_unload', bus=Fernwaerme, size=50),
+                            capacity_in_flow_hours=100, initial_charge_state=0)
+        aWaermeLast = Sink('Wärmelast', sink=Flow('Q_th_Last', bus=Fernwaerme, size=1, fixed_relative_profile=load))
+        aGasTarif = Source('Gastarif', source=Flow('Q_Gas', bus=Gas, effects_per_flow_hour=self.price))
+
+        es = FlowSystem(time_series)
+        es.add_elements(costs, aBoiler, aSpeicher, aWaermeLast, aGasTarif)
+        return es
+
+
+class TestCheckpoint(BaseTest):
+    """ The incumbents must be written during the solve and be usable to restart it """
+    flow_system = TestRollingHorizon.flow_system
+
+    def test_checkpoint(self):
+        calculation = FullCalculation('checkpointed', self.flow_system(), 'highspy', presolve=True)
+        calculation.do_modeling()
+        solver = self.get_solver()
+        calculation.solve(solver, save_results=True, time_budget=60, checkpoint=True)
+        self.assertEqual(solver.time_limit_seconds, 3600)
+        path = calculation._paths['checkpoint']
+        self.assertTrue(path.exists())
+
+        start_values = Checkpoint.load(path)
+        self.assertEqual(set(start_values), {variable.label for variable in calculation.system_model.variables})
+        restarted = FullCalculation('restarted', self.flow_system(), 'highspy')
+        restarted.do_modeling()
+        restarted.solve(self.get_solver(), warm_start=path)
+        self.assertAlmostEqualNumeric(restarted.system_model.result_of_objective, calculation.system_model.result_of_objective, 'Objective of the restarted solve doesnt match')
+
+        with self.assertRaises(ValueError):
+            restarted.solve(self.get_solver(), checkpoint=10)
+
+
+class TestSegmentedFailure(BaseTest):
+    """ The initial states of the Elements must be restored, even if the solve of a segment fails """
+    flow_system = TestRollingHorizon.flow_system
+
+    def test_pipelined(self):
+        es = self.flow_system()
+        es.components[1].initial_charge_state = None
+        calculation = SegmentedCalculation('failing', es, segment_length=3, overlap_length=1,
+                                           modeling_language='highspy', pipelined=True)
+        solve = FullCalculation.solve
+
+        def failing_solve(calc, *args, **kwargs):
+            if calc.name != 'Segment_1':
+                raise RuntimeError('Solver failed')
+            solve(calc, *args, **kwargs)
+
+        with unittest.mock.patch.object(FullCalculation, 'solve', failing_solve):
+            with self.assertRaises(RuntimeError):
+                calculation.do_modeling_and_solve(self.get_solver(), save_results=False)
+        self.assertIsNone(es.components[1].initial_charge_state)
+        self.assertIsNone(es.components[0].Q_fu.previous_flow_rate)
+        self.assertEqual(len(calculation.sub_calculations), 2)
+
+
+class TestSegmentPreparation(BaseTest):
+    """ Preparing the next segment in a background thread must not change the FlowSystem or the model being solved """
+    flow_system = TestRollingHorizon.flow_system
+
+    def test_background_preparation(self):
+        es = self.flow_system()
+        calculation = FullCalculation('segment', es, 'highspy', time_indices=range(0, 4))
+        calculation.do_modeling()
+        index = calculation.system_model.index
+        models = [element.model for element in es.all_elements]
+        active_indices = [time_series.active_indices for time_series in es.all_time_series]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            apply_data_update = executor.submit(calculation._prepare_shift, range(2, 6), es.copy()).result()
+        self.assertIsNotNone(apply_data_update)
+        self.assertEqual(calculation.time_indices, range(0, 4))
+        self.assertEqual([time_series.active_indices for time_series in es.all_time_series], active_indices)
+        self.assertTrue(all(element.model is model for element, model in zip(es.all_elements, models)))
+        self.assertIs(calculation.system_model.index, index)
+
+        calculation._finish_shift(range(2, 6), apply_data_update)
+        calculation.solve(self.get_solver())
+        reference = FullCalculation('reference', es, 'highspy', time_indices=range(2, 6))
+        reference.do_modeling()
+        reference.solve(self.get_solver())
+        self.assertAlmostEqualNumeric(calculation.system_model.result_of_objective, reference.system_model.result_of_objective, 'Objective doesnt match the FullCalculation of the segment')
+
+
+class TestTwoStage(BaseTest):
+    """ The sizes of stage two must be fixed to the results of stage one """
+
+    def setUp(self):
+        super().setUp()
+        hours = np.arange(48)
+        self.Q_th_Last = 60 + 40 * np.sin(hours / 24 * 2 * np.pi) + 10 * np.cos(hours / 6 * 2 * np.pi)
+        self.gas_price = 0.04 + 0.02 * (hours % 24 >= 12)
+        self.aTimeSeries = (datetime.datetime(2020, 1, 1) + hours * datetime.timedelta(hours=1)).astype('datetime64')
+
+    def test_full(self):
+        calculation = self.calculate()
+        self.assertIsInstance(calculation.stage_two, FullCalculation)
+        self.assert_design_is_fixed(calculation, calculation.stage_two.system_model)
+        self.assertEqual(set(calculation.objectives), {'Stage one', 'Stage two'})
+        self.assertIn('Stages', calculation.infos)
+
+    def test_segmented(self):
+        calculation = self.calculate(segment_length=12, overlap_length=2)
+        self.assertIsInstance(calculation.stage_two, SegmentedCalculation)
+        self.assertEqual(len(calculation.objectives['Stage two']), 4)
+        for segment in calculation.stage_two.sub_calculations:
+            self.assert_design_is_fixed(calculation, segment.system_model)
+
+    def test_undersized(self):
+        Q_th_Last = self.Q_th_Last.copy()
+        Q_th_Last[[8, 30, 44]] = [180, 190, 170]  # Peaks, which are averaged out by the aggregation
+        for modeling_language in ['highspy', 'pyomo']:
+            with self.subTest(modeling_language=modeling_language):
+                calculation = self.calculate(modeling_language=modeling_language, Q_th_Last=Q_th_Last, storage=False)
+                self.assertEqual(calculation.undersized_elements(), {'Fernwärme': ['Kessel__Q_th']})
+                with self.assertRaisesRegex(Exception, 'no feasible solution.*Kessel__Q_th'):
+                    self.calculate(modeling_language=modeling_language, Q_th_Last=Q_th_Last, storage=False,
+                                   excess_penalty_per_flow_hour=None)
+
+    def assert_design_is_fixed(self, calculation, system_model):
+        variables = {variable.label: variable for variable in system_model.variables}
+        self.assertEqual(len(calculation.fixed_values), 3)  # Two sizes and one isInvested
+        for label, value in calculation.fixed_values.items():
+            self.assertTrue(variables[label].fixed)
+            self.assertAlmostEqualNumeric(variables[label].result, value, f'{label} is not fixed to stage one')
+
+    def calculate(self, segment_length=None, overlap_length=0, modeling_language='pyomo', Q_th_Last=None,
+                  storage=True, excess_penalty_per_flow_hour=1e5) -> TwoStageCalculation:
+        Fernwaerme = Bus('Fernwärme', excess_penalty_per_flow_hour=excess_penalty_per_flow_hour)
+        Gas = Bus('Gas', excess_penalty_per_flow_hour=excess_penalty_per_flow_hour)
+        costs = Effect('costs', '€', 'Kosten', is_standard=True, is_objective=True)
+        aGaskessel = Boiler('Kessel', eta=0.9,
+                            Q_th=Flow('Q_th', bus=Fernwaerme, size=InvestParameters(fix_effects=100, specific_effects=10, maximum_size=200)),
+                            Q_fu=Flow('Q_fu', bus=Gas))
+        aSpeicher = Storage('Speicher', charging=Flow('Q_th_load', bus=Fernwaerme, size=100), discharging=Flow('Q_th_unload', bus=Fernwaerme, size=100),
+                            capacity_in_flow_hours=InvestParameters(specific_effects=1, optional=False, maximum_size=500),
+                            initial_charge_state=0, relative_loss_per_hour=0.01)
+        aWaermeLast = Sink('Wärmelast', sink=Flow('Q_th_Last', bus=Fernwaerme, size=1, fixed_relative_profile=TimeSeriesData(self.Q_th_Last if Q_th_Last is None else Q_th_Last)))
+        aGasTarif = Source('Gastarif', source=Flow('Q_Gas', bus=Gas, size=1000, effects_per_flow_hour={costs: TimeSeriesData(self.gas_price)}))
+
+        es = FlowSystem(self.aTimeSeries, last_time_step_hours=None)
+        es.add_effects(costs)
+        es.add_components(aGaskessel, aWaermeLast, aGasTarif, *([aSpeicher] if storage else []))
+
+        calc = TwoStageCalculation('twoStage', es,
+                                   AggregationParameters(hours_per_period=6, nr_of_periods=4, fix_storage_flows=False,
+                                                         aggregate_data_and_fix_non_binary_vars=True,
+                                                         percentage_of_period_freedom=0, penalty_of_period_freedom=0),
+                                   segment_length=segment_length, overlap_length=overlap_length,
+                                   modeling_language=modeling_language)
+        calc.do_modeling_and_solve(self.get_solver())
+        return calc
+
+class TestBenders(BaseTest):
+    """ The decomposition must converge to the optimum of the FullCalculation """
+
+    def setUp(self):
+        super().setUp()
+        hours = np.arange(48)
+        self.Q_th_Last = 60 + 40 * np.sin(hours / 24 * 2 * np.pi) + 10 * np.cos(hours / 6 * 2 * np.pi)
+        self.gas_price = 0.04 + 0.02 * (hours % 24 >= 12)
+        self.aTimeSeries = (datetime.datetime(2020, 1, 1) + hours * datetime.timedelta(hours=1)).astype('datetime64')
+
+    def test_full_horizon(self):
+        full = FullCalculation('full', self.flow_system(), 'highspy')
+        full.do_modeling()
+        full.solve(self.get_solver())
+        calculation = BendersCalculation('benders', self.flow_system(), max_workers=2)
+        calculation.do_modeling_and_solve(self.get_solver())
+        lower_bound, upper_bound = calculation.bounds
+        self.assertLessEqual(calculation.iterations[-1]['gap'], calculation.gap)
+        self.assertAlmostEqualNumeric(upper_bound, full.system_model.result_of_objective, 'upper bound doesnt match the FullCalculation')
+        self.assertAlmostEqualNumeric(calculation.sub_calculations['base'].system_model.result_of_objective, full.system_model.result_of_objective, 'objective doesnt match the FullCalculation')
+        self.assertEqual(set(calculation.design), {'Kessel__Q_th__Investment_size', 'Kessel__Q_th__Investment_isInvested', 'Speicher__Investment_size'})
+
+    def test_windows_and_scenarios(self):
+        calculation = BendersCalculation('benders', self.flow_system(), segment_length=24, scenarios={'cheap': self.flow_system(), 'expensive': self.flow_system(2)}, weights={'cheap': 0.5, 'expensive': 0.5}, max_workers=2)
+        calculation.do_modeling_and_solve(self.get_solver())
+        self.assertEqual(list(calculation.sub_calculations), ['cheap_1', 'cheap_2', 'expensive_1', 'expensive_2'])
+        self.assertLessEqual(calculation.iterations[-1]['gap'], calculation.gap)
+        for sub_calculation in calculation.sub_calculations.values():
+            variables = {variable.label: variable for variable in sub_calculation.system_model.variables}
+            for label, value in calculation.design.items():
+                self.assertTrue(variables[label].fixed)
+                self.assertAlmostEqualNumeric(variables[label].result, value, f'{label} is not fixed to the design')
+
+    def flow_system(self, price_factor: float = 1) -> FlowSystem:
+        Fernwaerme, Gas = Bus('Fernwärme'), Bus('Gas')
+        costs = Effect('costs', '€', 'Kosten', is_standard=True, is_objective=True)
+        aGaskessel = Boiler('Kessel', eta=0.9,
+                            Q_th=Flow('Q_th', bus=Fernwaerme, size=InvestParameters(fix_effects=100, specific_effects=10, maximum_size=200)),
+                            Q_fu=Flow('Q_fu', bus=Gas))
+        aSpeicher = Storage('Speicher', charging=Flow('Q_th_load', bus=Fernwaerme, size=100), discharging=Flow('Q_th_unload', bus=Fernwaerme, size=100),
+                            capacity_in_flow_hours=InvestParameters(specific_effects=1, optional=False, maximum_size=500),
+                            initial_charge_state=0, relative_loss_per_hour=0.01)
+        aWaermeLast = Sink('Wärmelast', sink=Flow('Q_th_Last', bus=Fernwaerme, size=1, fixed_relative_profile=TimeSeriesData(self.Q_th_Last)))
+        aGasTarif = Source('Gastarif', source=Flow('Q_Gas', bus=Gas, size=1000, effects_per_flow_hour={costs: TimeSeriesData(self.gas_price * price_factor)}))
+
+        es = FlowSystem(self.aTimeSeries, last_time_step_hours=None)
+        es.add_effects(costs)
+        es.add_components(aGaskessel, aSpeicher, aWaermeLast, aGasTarif)
+        return es
+
+
+def create_batch_flow_system(gas_price: float, sleep_seconds: float = 0) -> FlowSystem:
+    """ FlowSystem of the scenarios of TestBatch. Defined on module level to be picklable """
+    if gas_price < 0:
+        raise ValueError('Negative gas price')
+    time.sleep(sleep_seconds)
+    Fernwaerme, Gas = Bus('Fernwärme'), Bus('Gas')
+    costs = Effect('costs', '€', 'Kosten', is_standard=True, is_objective=True)
+    aGaskessel = Boiler('Kessel', eta=0.5, Q_th=Flow('Q_th', bus=Fernwaerme), Q_fu=Flow('Q_fu', bus=Gas))
+    aWaermeLast = Sink('Wärmelast', sink=Flow('Q_th_Last', bus=Fernwaerme, size=1, fixed_relative_profile=np.array([30., 0., 90., 110])))
+    aGasTarif = Source('Gastarif', source=Flow('Q_Gas', bus=Gas, size=1000, effects_per_flow_hour={costs: gas_price}))
+    es = FlowSystem((datetime.datetime(2020, 1, 1) + np.arange(4) * datetime.timedelta(hours=1)).astype('datetime64'), last_time_step_hours=None)
+    es.add_effects(costs)
+    es.add_components(aGaskessel, aWaermeLast, aGasTarif)
+    return es
+
+
+class TestBatch(BaseTest):
+
+    def test_batch(self):
+        batch = BatchCalculation('batch', create_batch_flow_system,
+                                 {'cheap': {'gas_price': 0.04}, 'expensive': {'gas_price': 0.08},
+                                  'broken': {'gas_price': -1}, 'slow': {'gas_price': 0.04, 'sleep_seconds': 60}},
+                                 calculation_kwargs={'modeling_language': 'highspy'})
+        table = batch.run(self.get_solver(), max_workers=2, timeout=10, result_arrays=['Kessel__Q_fu_flow_rate'])
+        self.assertEqual(list(table.index), ['cheap', 'expensive', 'broken', 'slow'])
+        self.assertEqual(list(table['status']), ['solved', 'solved', 'failed', 'timeout'])
+        self.assertIn('Negative gas price', table.loc['broken', 'error'])
+        self.assertAlmostEqualNumeric(table.loc['cheap', 'Effects|costs [€]|sum'], 230 * 2 * 0.04, 'costs doesnt match expected value')
+        self.assertAlmostEqualNumeric(table.loc['expensive', 'Effects|costs [€]|sum'], 230 * 2 * 0.08, 'costs doesnt match expected value')
+        self.assertAlmostEqualNumeric(table.loc['cheap', 'Kessel__Q_fu_flow_rate'], [60, 0, 180, 220], 'Q_fu doesnt match expected value')
+        self.assertEqual(list(batch.result_array('Kessel__Q_fu_flow_rate').columns), ['cheap', 'expensive'])
+
+
+class TestNrOfPeriodsSelection(BaseTest):
+
+    def test_selection(self):
+        hours = np.arange(96)
+        Q_th_Last = 60 + 40 * np.sin(hours / 24 * 2 * np.pi) + 10 * np.random.default_rng(0).random(96)
+        Fernwaerme, Gas = Bus('Fernwärme'), Bus('Gas')
+        costs = Effect('costs', '€', 'Kosten', is_standard=True, is_objective=True)
+        aGaskessel = Boiler('Kessel', eta=0.9, Q_th=Flow('Q_th', bus=Fernwaerme), Q_fu=Flow('Q_fu', bus=Gas))
+        aSpeicher = Storage('Speicher', charging=Flow('Q_th_load', bus=Fernwaerme, size=100), discharging=Flow('Q_th_unload', bus=Fernwaerme, size=100),
+                            capacity_in_flow_hours=InvestParameters(specific_effects=1, optional=False, maximum_size=500),
+                            initial_charge_state=0)
+        aWaermeLast = Sink('Wärmelast', sink=Flow('Q_th_Last', bus=Fernwaerme, size=1, fixed_relative_profile=TimeSeriesData(Q_th_Last)))
+        aGasTarif = Source('Gastarif', source=Flow('Q_Gas', bus=Gas, size=1000, effects_per_flow_hour={costs: TimeSeriesData(0.04 + 0.04 * (hours % 24 >= 12))}))
+        es = FlowSystem((datetime.datetime(2020, 1, 1) + hours * datetime.timedelta(hours=1)).astype('datetime64'), last_time_step_hours=None)
+        es.add_effects(costs)
+        es.add_components(aGaskessel, aSpeicher, aWaermeLast, aGasTarif)
+
+        selection = NrOfPeriodsSelection('selection', es,
+                                         AggregationParameters(hours_per_period=6, nr_of_periods=0, fix_storage_flows=False,
+                                                               aggregate_data_and_fix_non_binary_vars=True,
+                                                               typical_periods_only=True),
+                                         candidates=[8, 2, 4, 100], modeling_language='highspy')
+        table = selection.run(self.get_solver(), max_workers=2)
+        self.assertEqual(list(table.index), [2, 4, 8, 100])
+        self.assertEqual(list(table['status']), ['solved', 'solved', 'solved', 'failed'])
+        self.assertIn('clusters', table.loc[100, 'error'])  # More typical periods than periods
+        table = table.loc[[2, 4, 8]]
+        self.assertEqual(list(table['typical time steps']), [12, 24, 48])
+        self.assertEqual(set(selection.errors[2].index), {ts.label for ts in es.all_time_series if ts.is_array})
+        self.assertTrue(np.all(np.diff(table['RMSE (mean)']) < 0))
+        self.assertEqual(table.loc[8, 'objective deviation'], 0)
+        self.assertTrue(np.all(table['single variables'] > 0))
+        self.assertEqual(selection.recommend(), 2)  # The storage balances the errors of the heat demand
+        self.assertEqual(selection.recommend(tolerance=0.02, criterion='RMSE (max)'), 8)
+        self.assertEqual(selection.recommend(tolerance=0, criterion='RMSE (max)'), 8)
+
+
 class TestModelingTypes(BaseTest):
 
     def setUp(self):
@@ -465,11 +932,121 @@ class TestModelingTypes(BaseTest):
         effects = {effect.label: effect for effect in calculation.flow_system.effect_collection.effects}
         self.assertAlmostEqualNumeric(effects['costs'].model.all.sum.result, 342967.0, "costs doesnt match expected value")
 
+    def test_typical_periods_only(self):
+        for modeling_language in ['pyomo', 'highspy']:
+            with self.subTest(modeling_language=modeling_language):
+                calculation = self.calculate("aggregated", modeling_language, typical_periods_only=True)
+                self.assertEqual(calculation.system_model.nr_of_time_steps, 6 * 24)  # 6 of 12 periods
+                results = calculation.results()
+                self.assertEqual(len(results['Time']), 289)
+                self.assertEqual(len(results['Components']['Kessel']['Q_th']['flow_rate']), 288)
+                charge_state = results['Components']['Speicher']['charge_state']
+                self.assertEqual(len(charge_state), 289)
+                self.assertAlmostEqualNumeric(charge_state[0], 137, 'initial charge state doesnt match')
+                self.assertTrue(np.all((charge_state > -1e-6) & (charge_state < 684 + 1e-6)))
+                self.assert_expanded_sums(results)
+                # The storage is linked across the periods in their original order
+                storage = calculation.system_model.results()['Components']['Speicher']
+                np.testing.assert_allclose(charge_state[::24], storage['charge_state_of_periods'][:13], atol=1e-6)
+
+    def test_typical_periods_durations(self):
+        # The typical periods dont follow each other. Consecutive on hours restart at every period start
+        hours = np.arange(48)
+        Fernwaerme, Gas = Bus('Fernwärme'), Bus('Gas')
+        costs = Effect('costs', '€', 'Kosten', is_standard=True, is_objective=True)
+        aGaskessel = Boiler('Kessel', eta=0.9, Q_fu=Flow('Q_fu', bus=Gas),
+                            Q_th=Flow('Q_th', bus=Fernwaerme, size=100, can_be_off=OnOffParameters(consecutive_on_hours_max=8)))
+        aWaermeLast = Sink('Wärmelast', sink=Flow('Q_th_Last', bus=Fernwaerme, size=1, fixed_relative_profile=TimeSeriesData(50 + 10 * (hours % 6 == 0))))
+        aGasTarif = Source('Gastarif', source=Flow('Q_Gas', bus=Gas, size=1000, effects_per_flow_hour={costs: TimeSeriesData(0.04 + 0.01 * (hours % 12 >= 6))}))
+        es = FlowSystem((datetime.datetime(2020, 1, 1) + hours * datetime.timedelta(hours=1)).astype('datetime64'), last_time_step_hours=None)
+        es.add_effects(costs)
+        es.add_components(aGaskessel, aWaermeLast, aGasTarif)
+
+        calculation = AggregatedCalculation('durations', es,
+                                            AggregationParameters(hours_per_period=6, nr_of_periods=2, fix_storage_flows=False,
+                                                                  aggregate_data_and_fix_non_binary_vars=True,
+                                                                  typical_periods_only=True),
+                                            modeling_language='highspy')
+        calculation.do_modeling()
+        calculation.solve(self.get_solver())
+        on_off = calculation.system_model.results()['Components']['Kessel']['Q_th']['OnOff']
+        self.assertEqual(calculation.system_model.nr_of_time_steps, 12)
+        np.testing.assert_array_equal(on_off['on'], 1)  # The demand can only be covered by the boiler
+        np.testing.assert_allclose(on_off['consecutiveOnHours'], np.tile(np.arange(1, 7), 2))
+        self.assertAlmostEqual(calculation.system_model.main_results['penalty'], 0)
+
+    def test_typical_periods_segmented(self):
+        for modeling_language in ['pyomo', 'highspy']:
+            with self.subTest(modeling_language=modeling_language):
+                calculation = self.calculate("aggregated", modeling_language, typical_periods_only=True, nr_of_segments=6)
+                self.assertEqual(calculation.system_model.nr_of_time_steps, 6 * 6)  # 6 segments of 6 periods
+                self.assertAlmostEqual(calculation.system_model.dt_in_hours_total, 72)
+                results = calculation.results()
+                self.assertEqual(len(results['Components']['Kessel']['Q_th']['flow_rate']), 288)
+                charge_state = results['Components']['Speicher']['charge_state']
+                self.assertEqual(len(charge_state), 289)
+                self.assertAlmostEqualNumeric(charge_state[0], 137, 'initial charge state doesnt match')
+                self.assertTrue(np.all((charge_state > -1e-6) & (charge_state < 684 + 1e-6)))
+                self.assert_expanded_sums(results)
+
+    def test_numpy_clustering(self):
+        for typical_periods_only in [False, True]:
+            with self.subTest(typical_periods_only=typical_periods_only):
+                calculation = self.calculate("aggregated", 'highspy', typical_periods_only=typical_periods_only,
+                                             clustering_backend='numpy')
+                self.assertEqual(len(calculation.aggregation.occurrences), 6)  # 4 clusters and 2 extreme periods
+                self.assertEqual(calculation.aggregation.occurrences.sum(), 12)
+                expected = 343613 - 25000 if typical_periods_only else 343613
+                self.assertAlmostEqualNumeric(calculation.system_model.result_of_objective, expected,
+                                              "costs doesnt match expected value", relative_error_range_in_percent=1)
+
+    def assert_expanded_sums(self, results):
+        """ The expanded results must have the same sums over time as the model of the typical periods """
+        for effect in ['costs', 'CO2']:
+            operation = results['Effects'][effect]['operation']
+            self.assertAlmostEqual(np.sum(operation['operation_sum_TS']), operation['operation_sum'], delta=1e-3)
+        for component, flow in [('Kessel', 'Q_fu'), ('BHKW2', 'Q_fu'), ('Speicher', 'Q_th_load')]:
+            flow_results = results['Components'][component][flow]
+            self.assertAlmostEqual(np.sum(flow_results['flow_rate'] * results['Time intervals in hours']),
+                                   flow_results['sumFlowHours'], delta=1e-3)
+
+    def test_warm_start(self):
+        aggregated = self.calculate("aggregated")
+        for modeling_language in ['pyomo', 'highspy']:
+            with self.subTest(modeling_language=modeling_language):
+                calculation = FullCalculation('warmStarted', aggregated.flow_system, modeling_language)
+                calculation.do_modeling()
+                start_values = calculation.warm_start_values(aggregated)
+                self.assertEqual(len(start_values), len(calculation.system_model.variables))
+                calculation.solve(self.get_solver(), warm_start=aggregated)
+                effects = {effect.label: effect for effect in calculation.flow_system.effect_collection.effects}
+                self.assertAlmostEqualNumeric(effects['costs'].model.all.sum.result, 343613,
+                                              "costs doesnt match expected value")
+
     def test_segmented(self):
         calculation = self.calculate("segmented")
         self.assertAlmostEqualNumeric(sum(calculation.results(combined_arrays=True)['Effects']['costs']['operation']['operation_sum_TS']), 343613, "costs doesnt match expected value")
 
-    def calculate(self, modeling_type: Literal["full", "segmented", "aggregated"]):
+    def test_segmented_highspy(self):
+        calculation = self.calculate("segmented", 'highspy')
+        self.assertIs(calculation.sub_calculations[0].system_model, calculation.sub_calculations[1].system_model)
+        # The results of each segment are kept, although the segments share the model
+        segment_results = calculation.results(individual_results=True)
+        self.assertEqual(segment_results['Segment_2']['Time'][0], calculation.flow_system.time_series[96])
+        self.assertNotEqual(segment_results['Segment_1']['Objective'], segment_results['Segment_2']['Objective'])
+        self.assertEqual([main_results['Objective'] for main_results in calculation.main_results_of_segments],
+                         [segment_results[f'Segment_{i + 1}']['Objective'] for i in range(3)])
+        self.assertAlmostEqualNumeric(sum(calculation.results(combined_arrays=True)['Effects']['costs']['operation']['operation_sum_TS']), 343613, "costs doesnt match expected value")
+
+    def test_segmented_pipelined(self):
+        for modeling_language in ['pyomo', 'highspy']:
+            with self.subTest(modeling_language=modeling_language):
+                calculation = self.calculate("segmented", modeling_language, pipelined=True)
+                self.assertIs(calculation.sub_calculations[0].system_model, calculation.sub_calculations[1].system_model)
+                self.assertEqual(calculation.start_values_of_segments['Segment_1']['Speicher'], 137)
+                self.assertAlmostEqualNumeric(sum(calculation.results(combined_arrays=True)['Effects']['costs']['operation']['operation_sum_TS']), 343613, "costs doesnt match expected value")
+
+    def calculate(self, modeling_type: Literal["full", "segmented", "aggregated"], modeling_language: Literal['pyomo', 'highspy'] = 'pyomo', pipelined: bool = False, typical_periods_only: bool = False, nr_of_segments: Optional[int] = None, clustering_backend: Literal['tsam', 'numpy'] = 'tsam'):
         doFullCalc, doSegmentedCalc, doAggregatedCalc = modeling_type == "full", modeling_type == "segmented", modeling_type == "aggregated"
         if not any([doFullCalc, doSegmentedCalc, doAggregatedCalc]): raise Exception("Unknown modeling type")
 
@@ -505,7 +1082,7 @@ class TestModelingTypes(BaseTest):
             calc.do_modeling()
             calc.solve(self.get_solver(), save_results=True)
         elif doSegmentedCalc:
-            calc = SegmentedCalculation('segModel', es, segment_length=96, overlap_length=1, modeling_language='pyomo')
+            calc = SegmentedCalculation('segModel', es, segment_length=96, overlap_length=1, modeling_language=modeling_language, pipelined=pipelined)
             calc.do_modeling_and_solve(self.get_solver(), save_results=True)
         elif doAggregatedCalc:
             calc = AggregatedCalculation('aggModel', es,
@@ -516,7 +1093,11 @@ class TestModelingTypes(BaseTest):
                                                                percentage_of_period_freedom=0,
                                                                penalty_of_period_freedom=0,
                                                                time_series_for_low_peaks=[TS_P_el_Last, TS_Q_th_Last],
-                                                               time_series_for_high_peaks=[TS_Q_th_Last]))
+                                                               time_series_for_high_peaks=[TS_Q_th_Last],
+                                                               typical_periods_only=typical_periods_only,
+                                                               nr_of_segments=nr_of_segments,
+                                                               clustering_backend=clustering_backend),
+                                         modeling_language=modeling_language)
             calc.do_modeling()
             print(es)
             es.visualize_network()
@@ -0,0 +1,505 @@
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+import highspy
+import numpy as np
+import pandas as pd
+
+from flixOpt.aggregation import Aggregation, cluster_periods
+from flixOpt.cache import DiskCache
+from flixOpt.math_modeling import (MathModel, MatrixModel, Variable, VariableTS, Equation, Inequation, PresolvedModel,
+                                   SolverLog, SolverProgress, HighsSolver, CbcSolver, PortfolioSolver, ScaledModel)
+
+
+class TestMatrixModel(unittest.TestCase):
+    def setUp(self):
+        self.model = MathModel('Test')
+        self.x = VariableTS('x', 3, lower_bound=0, upper_bound=np.array([1., 2., 3.]))
+        self.y = Variable('y', 1, fixed_value=1.5)
+        self.on = VariableTS('on', 3, is_binary=True)
+
+        eq = Equation('eq')  # x[t] + 2 * y = 4
+        eq.add_summand(self.x, 1)
+        eq.add_summand(self.y, 2)
+        eq.add_constant(4)
+
+        ineq = Inequation('ineq')  # sum(x) - on[0] <= 10
+        ineq.add_summand(self.x, np.array([1., 2., 3.]), as_sum=True)
+        ineq.add_summand(self.on, -1, 0)
+        ineq.add_constant(10)
+
+        obj = Equation('obj', is_objective=True)
+        obj.add_summand(self.x, np.array([1., 1., 2.]), as_sum=True)
+        obj.add_summand(self.y, 3)
+        obj.add_summand(self.on, 1, as_sum=True)
+
+        self.model.add(self.x, self.y, self.on, eq, ineq, obj)
+
+    def test_compile(self):
+        matrix_model = self.model.compile()
+        self.assertEqual(matrix_model.nr_of_columns, 7)
+        self.assertEqual(matrix_model.nr_of_rows, 4)
+
+        dense = np.zeros((matrix_model.nr_of_rows, matrix_model.nr_of_columns))
+        rows = np.repeat(np.arange(matrix_model.nr_of_rows), np.diff(matrix_model.matrix_start))
+        dense[rows, matrix_model.matrix_index] = matrix_model.matrix_value
+        np.testing.assert_array_equal(dense, [[1, 0, 0, 2, 0, 0, 0],
+                                              [0, 1, 0, 2, 0, 0, 0],
+                                              [0, 0, 1, 2, 0, 0, 0],
+                                              [1, 2, 3, 0, -1, 0, 0]])
+        np.testing.assert_array_equal(matrix_model.row_lower, [4, 4, 4, -np.inf])
+        np.testing.assert_array_equal(matrix_model.row_upper, [4, 4, 4, 10])
+        np.testing.assert_array_equal(matrix_model.lower_bound, [0, 0, 0, 1.5, 0, 0, 0])
+        np.testing.assert_array_equal(matrix_model.upper_bound, [1, 2, 3, 1.5, 1, 1, 1])
+        np.testing.assert_array_equal(matrix_model.integrality, [0, 0, 0, 0, 1, 1, 1])
+        np.testing.assert_array_equal(matrix_model.objective_vector, [1, 1, 2, 3, 1, 1, 1])
+
+        start, index, value = matrix_model.to_csc()
+        np.testing.assert_array_equal(start, [0, 2, 4, 6, 9, 10, 10, 10])
+        np.testing.assert_array_equal(index, [0, 3, 1, 3, 2, 3, 0, 1, 2, 3])
+
+    def test_write_results(self):
+        matrix_model = self.model.compile()
+        matrix_model.write_results(np.array([0.5, 1., 1.5, 1.5, 0.9999999, 0., 1.]))
+        np.testing.assert_array_equal(self.x.result, [0.5, 1., 1.5])
+        self.assertEqual(self.y.result, 1.5)
+        self.assertEqual(self.on.result.dtype, np.int8)
+        np.testing.assert_array_equal(self.on.result, [1, 0, 1])
+
+    def test_write_and_read_solution(self):
+        for file_format in ['lp', 'mps']:
+            with self.subTest(file_format=file_format), tempfile.TemporaryDirectory() as folder:
+                model_path = os.path.join(folder, f'model.{file_format}')
+                solution_path = os.path.join(folder, 'model.sol')
+                with unittest.mock.patch.object(MatrixModel, 'to_csc', side_effect=AssertionError('Copied column-wise')):
+                    self.model.write(model_path, file_format, chunk_size=2)
+
+                highs = highspy.Highs()
+                highs.setOptionValue('output_flag', False)
+                highs.readModel(model_path)
+                highs.run()
+                highs.writeSolution(solution_path, 0)
+
+                self.model.read_solution(solution_path)
+                np.testing.assert_allclose(self.x.result, [1., 1., 1.])
+                self.assertAlmostEqual(self.y.result, 1.5)
+                np.testing.assert_array_equal(self.on.result, [0, 0, 0])
+                self.assertAlmostEqual(self.model.result_of_objective, 8.5)
+
+    def test_presolve(self):
+        matrix_model = self.model.compile()
+        presolved = PresolvedModel(matrix_model)
+        # y is fixed, which turns eq into bounds that fix x, which turns ineq into a bound of on[0]
+        self.assertEqual(presolved.nr_of_columns, 3)
+        self.assertEqual(presolved.nr_of_rows, 0)
+        np.testing.assert_array_equal(presolved.kept_columns, [4, 5, 6])
+        self.assertAlmostEqual(presolved.objective_offset, 8.5)
+        self.assertEqual(presolved.report['Fixed variables'], {'x': 3, 'y': 1})
+        self.assertEqual(presolved.report['Rows turned into bounds'], {'eq': 3, 'ineq': 1})
+
+        np.testing.assert_array_equal(presolved.postsolve(np.array([1., 0., 1.])), [1, 1, 1, 1.5, 1, 0, 1])
+
+    def test_presolve_infeasible(self):
+        self.x.upper_bound = np.array([1., 2., 0.5])  # x[2] must be 1 by eq
+        with self.assertRaises(Exception):
+            PresolvedModel(self.model.compile())
+
+    def test_scaling(self):
+        matrix_model = self.model.compile()
+        scaled = ScaledModel(matrix_model)
+        np.testing.assert_array_equal(np.log2(scaled.row_scale) % 1, 0)  # Powers of 2
+        np.testing.assert_array_equal(np.log2(scaled.column_scale) % 1, 0)
+        np.testing.assert_array_equal(scaled.column_scale[4:], 1)  # Binary columns are not scaled
+        rows = np.repeat(np.arange(matrix_model.nr_of_rows), np.diff(matrix_model.matrix_start))
+        np.testing.assert_array_equal(scaled.matrix_value, matrix_model.matrix_value * scaled.row_scale[rows] *
+                                      scaled.column_scale[matrix_model.matrix_index])
+        np.testing.assert_array_equal(scaled.upper_bound * scaled.column_scale, matrix_model.upper_bound)
+
+        solution = np.array([1., 1., 1., 1.5, 1., 0., 1.])
+        index, value = scaled.reduce_entries(np.arange(7), solution)
+        np.testing.assert_array_equal(scaled.postsolve(value), solution)
+
+        scaled_presolved = ScaledModel(PresolvedModel(matrix_model))
+        index, value = scaled_presolved.reduce_entries(np.arange(7), solution)
+        np.testing.assert_array_equal(index, [0, 1, 2])
+        np.testing.assert_array_equal(scaled_presolved.postsolve(value), solution)
+
+    def test_coefficient_diagnostics(self):
+        diagnostics = self.model.coefficient_diagnostics(owners={'x': 'A', 'eq': 'A', 'ineq': 'B'})
+        self.assertEqual(diagnostics.ranges, {'Matrix': (1, 3), 'Bounds': (1, 3), 'RHS': (4, 10), 'Objective': (1, 3)})
+        self.assertEqual(diagnostics.constraints['ineq'], {'Matrix': (1, 3), 'RHS': (10, 10)})
+        self.assertEqual(diagnostics.variables['y']['Bounds'], (1.5, 1.5))
+        self.assertEqual(diagnostics.owners['A'], {'Matrix': (1, 2), 'Bounds': (1, 3), 'RHS': (4, 4)})
+        self.assertEqual(diagnostics.worst_constraints(1), [('ineq', 3)])
+        self.assertEqual(diagnostics.largest_bounds(1), [('x', 3)])
+        self.assertIn('Coefficient Ranges', str(diagnostics))
+
+
+class TestSolverLog(unittest.TestCase):
+    highs_log = """MIP has 535 rows; 464 cols; 1544 nonzeros; 128 integer variables (128 binary)
+Presolving model
+Presolve reductions: rows 219(-316); columns 136(-328); nonzeros 721(-823)
+
+Solving MIP model with:
+   219 rows
+   136 cols (69 binary, 0 integer, 0 implied int., 67 continuous, 0 domain fixed)
+   721 nonzeros
+
+         0       0         0   0.00%   -19965          inf                  inf        0      0      0         0     0.0s
+ L       0       0         0   0.00%   -15670.737797   -11483.696164     36.46%      603     21      0      2923     1.0s
+ T     401       8       191  85.06%   -12504.991563   -11598.873624      7.81%      922     37   1008     25041     2.8s
+
+Solving report
+  Status            Optimal
+  Gap               0.446% (tolerance: 0.5%)
+  Timing            2.98
+                    0.04 (Presolve)
+                    2.93 (Solve)
+  Nodes             461
+  LP iterations     26698
+"""
+
+    def test_highs(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'highs.log')
+            with open(path, 'w') as file:
+                file.write('LP has 1 rows; 1 cols\n  Nodes             1\n' + self.highs_log)  # Only the last run counts
+            log = SolverLog('highs', path)
+
+        self.assertEqual(log.infos['presolved'], {'cols': 136, 'continuous': 67, 'integer': 69, 'binary': 69,
+                                                  'rows': 219, 'nonzeros': 721})
+        self.assertEqual(log.nodes, 461)
+        self.assertEqual(log.lp_iterations, 26698)
+        self.assertAlmostEqual(log.gap, 0.00446)
+        self.assertEqual((log.time_total, log.time_presolve, log.time_root), (2.98, 0.04, 1.0))
+        self.assertAlmostEqual(log.time_branch_and_bound, 1.98)
+
+
+class TestSolverProgress(unittest.TestCase):
+    def knapsack(self, modeling_language: str = 'highspy') -> MathModel:
+        rng = np.random.default_rng(0)
+        weights, values = rng.integers(1, 50, 40).astype(float), rng.integers(1, 50, 40).astype(float)
+        model = MathModel('Knapsack', modeling_language)
+        x = VariableTS('x', 40, is_binary=True)
+        capacity = Inequation('capacity')
+        capacity.add_summand(x, weights, as_sum=True)
+        capacity.add_constant(300)
+        objective = Equation('objective', is_objective=True)
+        objective.add_summand(x, -values, as_sum=True)
+        model.add(x, capacity, objective)
+        model.translate_to_modeling_language()
+        return model
+
+    def test_highspy_progress(self):
+        model = self.knapsack()
+        solver = HighsSolver(mip_gap=0, logfile_name=None, solver_output_to_console=False)
+        events = []
+        solver.progress_callback = events.append
+        model.solve(solver)
+
+        self.assertGreater(len(events), 0)
+        self.assertLessEqual(len(solver.progress), len(events))
+        self.assertAlmostEqual(solver.progress[-1].objective, model.result_of_objective)
+        self.assertEqual(model.infos['Solver Progress'][-1]['objective'], solver.progress[-1].objective)
+
+    def test_highspy_interrupt(self):
+        model = self.knapsack()
+        solver = HighsSolver(mip_gap=0, logfile_name=None, solver_output_to_console=False)
+        solver.progress_callback = lambda event: True
+        model.solve(solver)
+        self.assertEqual(solver.termination_message, 'Interrupted by user')
+
+    def test_highs_scheduler_reset_on_thread_change(self):
+        def solve(threads: int):
+            self.knapsack().solve(HighsSolver(mip_gap=0, threads=threads, logfile_name=None,
+                                              solver_output_to_console=False))
+
+        solve(2)
+        with unittest.mock.patch.object(highspy.Highs, 'resetGlobalScheduler') as reset:
+            solve(2)
+            reset.assert_not_called()
+            solve(1)
+            reset.assert_called_once_with(True)
+
+    def test_from_log_line(self):
+        event = SolverProgress.from_log_line(
+            'highs', ' L       0       0         0   0.00%   -15670.737797   -11483.696164     36.46%      603     21'
+                     '      0      2923     1.0s')
+        self.assertEqual((event.time, event.objective, event.best_bound, event.nodes),
+                         (1.0, -11483.696164, -15670.737797, 0))
+        self.assertAlmostEqual(event.gap, 0.3646)
+        self.assertIsNone(SolverProgress.from_log_line('highs', 'Src  Proc. InQueue |  Leaves   Expl. | BestBound'))
+
+
+class TestHighspyUpdate(unittest.TestCase):
+    def test_update_coefficients(self):
+        # Few changed coefficients are changed one by one, many are passed with the whole model again
+        weights = np.random.default_rng(1).integers(1, 50, 40).astype(float)
+        for nr_of_changes, passed_again in [(1, False), (40, True)]:
+            with self.subTest(nr_of_changes=nr_of_changes):
+                model, reference = TestSolverProgress().knapsack(), TestSolverProgress().knapsack()
+                for math_model in (model, reference):
+                    summand = math_model.inequations[0].summands[0]
+                    summand.factor_vec = summand.factor = np.concatenate([weights[:nr_of_changes],
+                                                                          summand.factor[nr_of_changes:]])
+                with unittest.mock.patch.object(model.model, '_pass_model', wraps=model.model._pass_model) as pass_model, \
+                        unittest.mock.patch.object(model.model.highs, 'changeCoeff',
+                                                   wraps=model.model.highs.changeCoeff) as change_coefficient:
+                    model.update_translation([], [model.inequations[0]])
+                self.assertEqual(pass_model.called, passed_again)
+                self.assertEqual(change_coefficient.call_count, 0 if passed_again else nr_of_changes)
+
+                reference.translate_to_modeling_language()
+                for math_model in (model, reference):
+                    math_model.solve(HighsSolver(mip_gap=0, logfile_name=None, solver_output_to_console=False))
+                self.assertAlmostEqual(model.result_of_objective, reference.result_of_objective)
+
+
+class TestPortfolioSolver(unittest.TestCase):
+    def test_portfolio(self):
+        for presolve in [False, True]:
+            with self.subTest(presolve=presolve):
+                model = TestSolverProgress().knapsack()
+                model.presolve = presolve
+                model.translate_to_modeling_language()
+                reference = TestSolverProgress().knapsack()
+                reference.solve(HighsSolver(mip_gap=0, logfile_name=None, solver_output_to_console=False))
+
+                solver = PortfolioSolver([HighsSolver(mip_gap=0, logfile_name=None, random_seed=seed, presolve=False)
+                                          for seed in range(2)])
+                model.solve(solver)
+                self.assertIn(solver.winner, solver.solvers)
+                self.assertEqual(solver.termination_message, 'Optimal')
+                self.assertAlmostEqual(model.result_of_objective, reference.result_of_objective)
+                self.assertEqual(len(model.variables[0].result), 40)  # Alternative optima are possible
+
+    def test_cbc_with_presolve_and_scaling(self):
+        # A fake cbc solves the MPS file with HiGHS and writes a solution file in the format of CBC
+        with tempfile.TemporaryDirectory() as folder:
+            executable = os.path.join(folder, 'cbc')
+            with open(executable, 'w') as file:
+                file.write(f'#!{sys.executable}\n'
+                           'import sys, highspy\n'
+                           'highs = highspy.Highs()\n'
+                           'highs.setOptionValue("output_flag", False)\n'
+                           'highs.readModel(sys.argv[1])\n'
+                           'highs.run()\n'
+                           'with open(sys.argv[-1], "w") as file:\n'
+                           '    file.write(f"Optimal - objective value {highs.getInfo().objective_function_value}\\n")\n'
+                           '    for i, value in enumerate(highs.getSolution().col_value):\n'
+                           '        file.write(f"{i} {highs.getColName(i)[1]} {value} 0\\n")\n')
+            os.chmod(executable, 0o755)
+            for presolve, scaling in [(False, False), (False, True), (True, False), (True, True)]:
+                with self.subTest(presolve=presolve, scaling=scaling), \
+                        unittest.mock.patch('shutil.which', return_value=executable):
+                    model = self.mixed_model()
+                    model.presolve, model.scaling = presolve, scaling
+                    model.translate_to_modeling_language()
+                    solver = PortfolioSolver([CbcSolver(mip_gap=0, logfile_name=None)])
+                    model.solve(solver)
+                    self.assertIs(solver.winner, solver.solvers[0])
+                    reference = self.mixed_model()
+                    reference.translate_to_modeling_language()
+                    reference.solve(HighsSolver(mip_gap=0, logfile_name=None, solver_output_to_console=False))
+                    self.assertAlmostEqual(model.result_of_objective, reference.result_of_objective)
+                    x, y, z = model.variables
+                    self.assertAlmostEqual(y.result, 4)
+                    self.assertAlmostEqual(z.result, 2)
+                    self.assertAlmostEqual(-x.result @ self.values - 10 * y.result + 5 * z.result,
+                                           reference.result_of_objective)
+
+    def mixed_model(self) -> MathModel:
+        """ A knapsack with a fixed Variable (removed by the presolve) and a continuous one (scaled) """
+        rng = np.random.default_rng(0)
+        weights, self.values = rng.integers(1, 50, 40).astype(float), rng.integers(1, 50, 40).astype(float)
+        model = MathModel('Mixed', 'highspy')
+        x = VariableTS('x', 40, is_binary=True)
+        y = Variable('y', 1, lower_bound=0, upper_bound=1000)
+        z = Variable('z', 1, fixed_value=2)
+        capacity = Inequation('capacity')
+        capacity.add_summand(x, weights, as_sum=True)
+        capacity.add_summand(z, 1000)
+        capacity.add_constant(2300)
+        limit = Inequation('limit')
+        limit.add_summand(y, 1000)
+        limit.add_constant(4000)
+        objective = Equation('objective', is_objective=True)
+        objective.add_summand(x, -self.values, as_sum=True)
+        objective.add_summand(y, -10)
+        objective.add_summand(z, 5)
+        model.add(x, y, z, capacity, limit, objective)
+        return model
+
+    def test_terminate_starting_process(self):
+        import multiprocessing
+        import time
+        from flixOpt.math_modeling import _terminate_process
+        process = multiprocessing.get_context('spawn').Process(target=time.sleep, args=(60,), daemon=True)
+        process.start()  # Still starting up, so it is not yet the leader of a process group
+        t_start = time.perf_counter()
+        _terminate_process(process, timeout=2)
+        self.assertFalse(process.is_alive())
+        self.assertLess(time.perf_counter() - t_start, 10)
+
+
+class TestDiskCache(unittest.TestCase):
+    def test_put_get_evict(self):
+        with tempfile.TemporaryDirectory() as folder:
+            cache = DiskCache(folder, max_size_mb=0.015)
+            cache.put('a', {'values': np.zeros(1000)}, {'name': 'a'})
+            arrays, metadata = cache.get('a')
+            np.testing.assert_array_equal(arrays['values'], np.zeros(1000))
+            self.assertEqual(metadata, {'name': 'a'})
+            self.assertIsNone(cache.get('b'))
+
+            os.utime(os.path.join(folder, 'a.npz'), (0, 0))  # a is the least recently used entry
+            cache.put('b', {'values': np.ones(1000)}, {})
+            self.assertIsNone(cache.get('a'))
+            self.assertIsNotNone(cache.get('b'))
+
+    def test_solution_cache(self):
+        for modeling_language in ['highspy', 'pyomo']:
+            with self.subTest(modeling_language=modeling_language), tempfile.TemporaryDirectory() as folder:
+                cache = DiskCache(folder)
+                solver = HighsSolver(mip_gap=0, logfile_name=None, solver_output_to_console=False)
+                model = TestSolverProgress().knapsack(modeling_language)
+                model.solve(solver, cache=cache)
+                self.assertEqual(len(os.listdir(folder)), 1)
+                if modeling_language == 'pyomo':
+                    self.assertIsNone(model.matrix_model)  # The key is computed without compiling the model
+
+                cached_model = TestSolverProgress().knapsack(modeling_language)
+                cached_solver = HighsSolver(mip_gap=0, logfile_name=None, solver_output_to_console=False)
+                cached_model.model.solve = None  # Solving is not allowed
+                cached_model.solve(cached_solver, cache=cache)
+                np.testing.assert_array_equal(cached_model.variables[0].result, model.variables[0].result)
+                self.assertEqual(cached_model.result_of_objective, model.result_of_objective)
+                self.assertEqual(cached_solver.termination_message, solver.termination_message)
+
+                other_solver = HighsSolver(mip_gap=0.1, logfile_name=None, solver_output_to_console=False)
+                TestSolverProgress().knapsack(modeling_language).solve(other_solver, cache=cache)
+                self.assertEqual(len(os.listdir(folder)), 2)  # Other settings, other entry
+
+                interrupted_solver = HighsSolver(mip_gap=0, time_limit_seconds=10, logfile_name=None,
+                                                 solver_output_to_console=False)
+                interrupted_solver.progress_callback = lambda event: True
+                TestSolverProgress().knapsack('highspy').solve(interrupted_solver, cache=cache)
+                self.assertFalse(interrupted_solver.is_optimal)
+                self.assertEqual(len(os.listdir(folder)), 2)  # Solutions, which are not optimal, are not stored
+
+    def test_solution_cache_with_reused_solver(self):
+        # The results of the first solve (like is_optimal) must not change the key of the second one
+        with tempfile.TemporaryDirectory() as folder:
+            cache = DiskCache(folder)
+            solver = HighsSolver(mip_gap=0, logfile_name=None, solver_output_to_console=False)
+            settings = solver.settings
+            model = TestSolverProgress().knapsack('highspy')
+            model.solve(solver, cache=cache)
+            self.assertEqual(solver.settings, settings)
+
+            cached_model = TestSolverProgress().knapsack('highspy')
+            cached_model.model.solve = None  # Solving is not allowed
+            cached_model.solve(solver, cache=cache)
+            self.assertEqual(cached_model.result_of_objective, model.result_of_objective)
+            self.assertEqual(len(os.listdir(folder)), 1)
+
+    def test_clustering_cache(self):
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame({'b': rng.random(100), 'a': rng.random(100)},
+                            index=pd.date_range('2020-01-01', periods=100, freq='h'))
+
+        def aggregation(nr_of_periods=3):
+            return Aggregation(data, 1, 24, nr_of_periods, weights={'a': 1, 'b': 0.5},
+                               time_series_for_high_peaks=['a'], time_series_for_low_peaks=['b'])
+
+        with tempfile.TemporaryDirectory() as folder:
+            cache = DiskCache(folder)
+            clustered = aggregation()
+            clustered.cluster(cache)
+            self.assertEqual(len(os.listdir(folder)), 1)
+
+            cached = aggregation()
+            with unittest.mock.patch('tsam.timeseriesaggregation.TimeSeriesAggregation') as tsam:
+                cached.cluster(cache)  # Clustering is not allowed
+                tsam.assert_not_called()
+            np.testing.assert_array_equal(cached.tsam.clusterOrder, clustered.tsam.clusterOrder)
+            np.testing.assert_array_equal(cached.occurrences, clustered.occurrences)
+            pd.testing.assert_frame_equal(cached.aggregated_data, clustered.aggregated_data, check_freq=False)
+            for label, values in clustered.get_typical_periods()[0].items():
+                np.testing.assert_array_equal(cached.get_typical_periods()[0][label], values)
+            np.testing.assert_array_equal(cached.get_equation_indices(), clustered.get_equation_indices())
+            self.assertIn('b min.', cached.describe_clusters())
+
+            aggregation(nr_of_periods=2).cluster(cache)
+            self.assertEqual(len(os.listdir(folder)), 2)  # Other parameters, other entry
+
+    def test_numpy_clustering_cache(self):
+        data = pd.DataFrame({'a': np.random.default_rng(0).random(100)},
+                            index=pd.date_range('2020-01-01', periods=100, freq='h'))
+        with tempfile.TemporaryDirectory() as folder:
+            cache = DiskCache(folder)
+            clustered = Aggregation(data, 1, 24, 2, clustering_backend='numpy')
+            clustered.cluster(cache)
+            cached = Aggregation(data, 1, 24, 2, clustering_backend='numpy')
+            with unittest.mock.patch('flixOpt.aggregation.cluster_periods') as clustering:
+                cached.cluster(cache)
+                clustering.assert_not_called()
+            np.testing.assert_array_equal(cached.tsam.clusterOrder, clustered.tsam.clusterOrder)
+            pd.testing.assert_frame_equal(cached.aggregated_data, clustered.aggregated_data, check_freq=False)
+
+            Aggregation(data, 1, 24, 2).cluster(cache)  # tsam is another entry
+            self.assertEqual(len(os.listdir(folder)), 2)
+
+
+class TestNumpyClustering(unittest.TestCase):
+    def setUp(self):
+        # Two kinds of days with noise, one of them with a high peak
+        rng = np.random.default_rng(0)
+        hours = np.arange(24)
+        days = [np.sin(hours / 24 * 2 * np.pi), np.cos(hours / 24 * 2 * np.pi)] * 5
+        days.insert(3, np.sin(hours / 24 * 2 * np.pi) + 2 * (hours == 6))
+        values = np.concatenate(days) + rng.normal(0, 0.01, 24 * 11)
+        self.data = pd.DataFrame({'a': values, 'b': -values},
+                                 index=pd.date_range('2020-01-01', periods=len(values), freq='h'))
+
+    def test_k_means(self):
+        clustering = cluster_periods(self.data, 24, 2, time_series_for_high_peaks=['a'])
+        order = clustering.clusterOrder
+        self.assertEqual(len(order), 11)
+        self.assertEqual(len(set(order[[0, 2, 5, 7, 9]])), 1)
+        self.assertEqual(len(set(order[[1, 4, 6, 8, 10]])), 1)
+        self.assertEqual(set(order[[0, 1, 3]]), {0, 1, 2})
+        self.assertEqual(clustering.extremePeriods['a max.']['stepNo'], 3)
+        self.assertEqual(clustering.clusterPeriodNoOccur[order[3]], 1)
+        self.assertEqual(sum(clustering.clusterPeriodNoOccur.values()), 11)
+
+        predicted = clustering.predictOriginalData()
+        self.assertEqual(predicted.shape, self.data.shape)
+        np.testing.assert_allclose(predicted['a'].to_numpy()[72:96], self.data['a'].to_numpy()[72:96])
+        np.testing.assert_allclose(predicted.to_numpy(), self.data.to_numpy(), atol=0.1)
+        self.assertEqual(len(clustering.typicalPeriods), 3 * 24)
+        self.assertEqual(len(clustering.stepIdx), 24)
+
+        shorter = cluster_periods(self.data.iloc[:-12], 24, 2)  # The shorter last period counts partly
+        self.assertEqual(sum(shorter.clusterPeriodNoOccur.values()), 10.5)
+        self.assertEqual(len(shorter.predictOriginalData()), 24 * 10 + 12)
+
+    def test_k_medoids(self):
+        clustering = cluster_periods(self.data, 24, 2, method='k_medoids', nr_of_restarts=4)
+        order = clustering.clusterOrder
+        self.assertEqual(len(set(order[[0, 2, 3, 5, 7, 9]])), 1)
+        self.assertEqual(len(set(order[[1, 4, 6, 8, 10]])), 1)
+        self.assertNotEqual(order[0], order[1])
+        # The typical periods are periods of the data (up to the rescaling), not their means
+        peak_of_typical_period = clustering.typicalPeriods.loc[order[0], 'a'].to_numpy()[6]
+        self.assertLess(peak_of_typical_period, 1.5)
+        for max_workers in [1, 3]:  # The restarts give the same result, independent of the threads
+            parallel = cluster_periods(self.data, 24, 2, method='k_medoids', nr_of_restarts=4, max_workers=max_workers)
+            np.testing.assert_array_equal(parallel.clusterOrder, order)
+
+
+if __name__ == '__main__':
+    unittest.main()